@@ -195,6 +195,8 @@ class NodePostprocessorMixer(BaseNodePostprocessor):
     Methods:
         _postprocess_nodes(nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
             Postprocesses a list of nodes with the mixed processors.
+        _apostprocess_nodes(nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+            Postprocesses a list of nodes with the mixed processors without blocking the event loop.
         get_filter() -> MetadataFilters: Gets the metadata filters used for processing nodes.
         get_unauthorized_nodes() -> List[NodeWithScore]: Retrieves nodes that are unauthorized for access.
         get_authorized_nodes() -> List[NodeWithScore]: Retrieves nodes that are authorized for access.
@@ -232,6 +234,23 @@ class NodePostprocessorMixer(BaseNodePostprocessor):
 
         return self.node_processor.filter(nodes)
 
+    async def _apostprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        """Applies postprocessing to a list of nodes, awaiting all the mixed node processors concurrently.
+
+        Args:
+            nodes (List[NodeWithScore]): The nodes to be postprocessed.
+            query_bundle (Optional[QueryBundle]): Query context for processing. Defaults to None.
+
+        Returns:
+            List[NodeWithScore]: The list of postprocessed nodes.
+        """
+
+        return await self.node_processor.afilter(nodes)
+
     def get_filter(
         self,
     ) -> MetadataFilters:
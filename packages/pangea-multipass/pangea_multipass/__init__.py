@@ -1,7 +1,11 @@
 # Copyright 2021 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
+from .acl_snapshot import AclDelta, AclSnapshot, AclSnapshotStore
+from .cache import AuthorizationCache, InMemoryAuthorizationCache, SQLiteAuthorizationCache
 from .core import (
+    AsyncPangeaGenericNodeProcessor,
+    AsyncPangeaNodeProcessorMixer,
     Constant,
     DocumentReader,
     FilterOperator,
@@ -19,7 +23,10 @@ from .core import (
 from .dropbox_reader import DropboxReader
 from .github_reader import GitHubReader
 from .gitlab_reader import GitLabReader
+from .http_cache import CachedResponse, HttpResponseCache
 from .oauth import OauthFlow
+from .rate_limit import RateLimitBudget, RateLimitError, RateLimitScheduler, TokenBucket
 from .slack_reader import SlackReader
 from .sources import *
+from .transport import HttpTransport, get_default_transport, set_default_transport
 from .utils import *
@@ -0,0 +1,142 @@
+# Copyright 2021 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import dataclasses
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from .cache import AuthorizationCache, InMemoryAuthorizationCache
+
+
+@dataclasses.dataclass
+class AclSnapshot:
+    """Allow-list of a principal on a data source, with the cursor to request changes since it was taken."""
+
+    ids: List[Any]
+    cursor: Optional[str]
+    synced_at: float
+    full_synced_at: float
+
+
+@dataclasses.dataclass
+class AclDelta:
+    """Changes on an allow-list since a sync cursor."""
+
+    added: List[Any]
+    removed: List[Any]
+    cursor: Optional[str]
+
+
+FullSync = Callable[[], Tuple[List[Any], Optional[str]]]
+"""Builds the whole allow-list. Returns the IDs and the cursor to request later changes."""
+
+DeltaSync = Callable[[str], Optional[AclDelta]]
+"""Requests the allow-list changes since the given cursor. Returns `None` if they could not be computed."""
+
+
+class AclSnapshotStore:
+    """Keeps allow-lists used by processors `get_filter()` and refreshes them incrementally.
+
+    Snapshots are saved in an `AuthorizationCache`, so a persistent backend shares them between processes and
+    restarts. Sources could only report some of the changes (e.g. access revoked without the resource being
+    updated), so snapshots are fully rebuilt after `full_sync_interval`.
+
+    Attributes:
+        full_sync_interval (float): Seconds after which the allow-list is rebuilt from scratch.
+        min_sync_interval (float): Seconds during which a snapshot is used without requesting changes.
+    """
+
+    _CACHE_KEY = "acl_snapshot"
+
+    full_sync_interval: float
+    min_sync_interval: float
+    _cache: AuthorizationCache
+
+    def __init__(
+        self,
+        cache: Optional[AuthorizationCache] = None,
+        full_sync_interval: float = 24 * 3600,
+        min_sync_interval: float = 60,
+    ):
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
+        self.full_sync_interval = full_sync_interval
+        self.min_sync_interval = min_sync_interval
+
+    def load(self, source: str, principal: str) -> Optional[AclSnapshot]:
+        """Returns the saved snapshot, if any."""
+
+        data = self._cache.get(source, principal, AclSnapshotStore._CACHE_KEY)
+        if data is None:
+            return None
+
+        return AclSnapshot(**data)
+
+    def save(
+        self, source: str, principal: str, snapshot: AclSnapshot, full_sync_interval: Optional[float] = None
+    ) -> None:
+        """Saves a snapshot. It expires once a full sync would be due anyway."""
+
+        self._cache.set(
+            source,
+            principal,
+            AclSnapshotStore._CACHE_KEY,
+            dataclasses.asdict(snapshot),
+            ttl=full_sync_interval if full_sync_interval is not None else self.full_sync_interval,
+        )
+
+    def sync(
+        self,
+        source: str,
+        principal: str,
+        full_sync: FullSync,
+        delta_sync: DeltaSync,
+        full_sync_interval: Optional[float] = None,
+    ) -> List[Any]:
+        """Returns an up to date allow-list, requesting only the changes since the last sync when possible.
+
+        Args:
+            source (str): Data source of the allow-list.
+            principal (str): User or credential the allow-list belongs to.
+            full_sync (FullSync): Builds the whole allow-list.
+            delta_sync (DeltaSync): Requests changes since a cursor.
+            full_sync_interval (Optional[float]): Overrides the store `full_sync_interval` for this allow-list, for
+                sources whose changes could not report revoked access.
+
+        Returns:
+            List[Any]: Allowed IDs.
+        """
+
+        if full_sync_interval is None:
+            full_sync_interval = self.full_sync_interval
+
+        now = time.time()
+        snapshot = self.load(source, principal)
+
+        if snapshot is not None and now - snapshot.synced_at < self.min_sync_interval:
+            return snapshot.ids
+
+        delta: Optional[AclDelta] = None
+        if snapshot is not None and snapshot.cursor is not None and now - snapshot.full_synced_at < full_sync_interval:
+            delta = delta_sync(snapshot.cursor)
+
+        if snapshot is None or delta is None:
+            ids, cursor = full_sync()
+            snapshot = AclSnapshot(ids=list(ids), cursor=cursor, synced_at=now, full_synced_at=now)
+        else:
+            removed = set(_hashable(id) for id in delta.removed)
+            ids = [id for id in snapshot.ids if _hashable(id) not in removed]
+            known = set(_hashable(id) for id in ids)
+            for id in delta.added:
+                if _hashable(id) not in known:
+                    known.add(_hashable(id))
+                    ids.append(id)
+
+            snapshot = AclSnapshot(ids=ids, cursor=delta.cursor, synced_at=now, full_synced_at=snapshot.full_synced_at)
+
+        self.save(source, principal, snapshot, full_sync_interval)
+        return snapshot.ids
+
+
+def _hashable(value: Any) -> Any:
+    # Tuples are saved as lists by JSON backends
+    return tuple(value) if isinstance(value, list) else value
@@ -0,0 +1,255 @@
+# Copyright 2021 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+def credential_fingerprint(*secrets: Optional[str]) -> str:
+    """Returns a short non-reversible identifier of a credential, to be used as cache principal."""
+
+    digest = hashlib.sha256("\0".join(secret or "" for secret in secrets).encode()).hexdigest()
+    return f"credential:{digest[:32]}"
+
+
+class AuthorizationCache(ABC):
+    """Interface for storing authorization decisions.
+
+    Entries are namespaced by data source and principal (user or credential the decision was taken for), so
+    decisions never leak between users. Values should be JSON serializable.
+    """
+
+    @abstractmethod
+    def get(self, source: str, principal: str, key: str) -> Optional[Any]:
+        """Returns the cached value or `None` if it is missing or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, source: str, principal: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value. `ttl` in seconds overrides the cache default time to live."""
+        pass
+
+    @abstractmethod
+    def delete(self, source: str, principal: str, key: str) -> None:
+        """Removes a value."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes every value."""
+        pass
+
+    def get_many(self, source: str, principal: str, keys: Iterable[str]) -> dict[str, Any]:
+        """Returns the cached values found for the given keys."""
+
+        values: dict[str, Any] = {}
+        for key in keys:
+            value = self.get(source, principal, key)
+            if value is not None:
+                values[key] = value
+
+        return values
+
+    def set_many(self, source: str, principal: str, values: dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Stores several values at once."""
+
+        for key, value in values.items():
+            self.set(source, principal, key, value, ttl)
+
+
+class InMemoryAuthorizationCache(AuthorizationCache):
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL.
+
+    Attributes:
+        max_entries (int): Max number of entries. Least recently used entries are evicted first.
+        default_ttl (Optional[float]): Time to live in seconds for entries set without one. `None` never expires.
+    """
+
+    max_entries: int
+    default_ttl: Optional[float]
+    _entries: "OrderedDict[Tuple[str, str, str], Tuple[Optional[float], Any]]"
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int = 100_000, default_ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: str, principal: str, key: str) -> Optional[Any]:
+        entry_key = (source, principal, key)
+        with self._lock:
+            entry = self._entries.get(entry_key, None)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[entry_key]
+                return None
+
+            self._entries.move_to_end(entry_key)
+            return value
+
+    def set(self, source: str, principal: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        entry_key = (source, principal, key)
+        with self._lock:
+            self._entries[entry_key] = (expires_at, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, source: str, principal: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((source, principal, key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteAuthorizationCache(AuthorizationCache):
+    """Cache stored in a local SQLite file, shared by every process on the same host.
+
+    Uses WAL journal mode so several workers could read and write concurrently. Entries are evicted once
+    `max_entries` is exceeded, approximately least recently used first: reads refresh the access time of an entry
+    only once per `touch_interval`, so cache hits do not turn into write transactions.
+
+    Attributes:
+        filepath (str): Path to the SQLite database file.
+        max_entries (int): Max number of entries. Least recently used entries are evicted first.
+        default_ttl (Optional[float]): Time to live in seconds for entries set without one. `None` never expires.
+        touch_interval (float): Min seconds between updates of the access time of an entry on reads.
+    """
+
+    _EVICTION_CHECK_INTERVAL = 100
+    """Number of writes between checks of the number of entries."""
+
+    filepath: str
+    max_entries: int
+    default_ttl: Optional[float]
+    touch_interval: float
+    _local: threading.local
+    _writes: int
+
+    def __init__(
+        self,
+        filepath: str = "multipass_authz_cache.db",
+        max_entries: int = 1_000_000,
+        default_ttl: Optional[float] = 3600,
+        touch_interval: Optional[float] = None,
+    ):
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        # Defaults to a tenth of the time to live, so entries read often are never evicted before they expire
+        self.touch_interval = touch_interval if touch_interval is not None else (default_ttl or 600) / 10
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS authz_cache ("
+                "source TEXT NOT NULL, principal TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL, PRIMARY KEY (source, principal, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS authz_cache_accessed_at ON authz_cache (accessed_at)")
+
+    def get(self, source: str, principal: str, key: str) -> Optional[Any]:
+        return self.get_many(source, principal, [key]).get(key, None)
+
+    def get_many(self, source: str, principal: str, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(dict.fromkeys(keys))
+        values: dict[str, Any] = {}
+        now = time.time()
+        with self._connection() as conn:
+            # Keep queries under SQLite max number of variables
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    "SELECT key, value, accessed_at FROM authz_cache "
+                    f"WHERE source = ? AND principal = ? AND key IN ({placeholders}) "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (source, principal, *chunk, now),
+                ).fetchall()
+                stale: List[str] = []
+                for key, value, accessed_at in rows:
+                    values[key] = json.loads(value)
+                    if now - accessed_at >= self.touch_interval:
+                        stale.append(key)
+
+                if stale:
+                    conn.execute(
+                        f"UPDATE authz_cache SET accessed_at = ? WHERE source = ? AND principal = ? "
+                        f"AND key IN ({', '.join('?' * len(stale))})",
+                        (now, source, principal, *stale),
+                    )
+
+        return values
+
+    def set(self, source: str, principal: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many(source, principal, {key: value}, ttl)
+
+    def set_many(self, source: str, principal: str, values: dict[str, Any], ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        rows = [(source, principal, key, json.dumps(value), expires_at, now) for key, value in values.items()]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO authz_cache (source, principal, key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+        self._writes += len(rows)
+        if self._writes >= SQLiteAuthorizationCache._EVICTION_CHECK_INTERVAL:
+            self._writes = 0
+            self._evict()
+
+    def delete(self, source: str, principal: str, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM authz_cache WHERE source = ? AND principal = ? AND key = ?", (source, principal, key)
+            )
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM authz_cache")
+
+    def _evict(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM authz_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            (count,) = conn.execute("SELECT COUNT(*) FROM authz_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM authz_cache WHERE rowid IN "
+                    "(SELECT rowid FROM authz_cache ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread. Used as context manager it commits on success."""
+
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.filepath, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
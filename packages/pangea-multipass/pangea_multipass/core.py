@@ -1,12 +1,17 @@
 # Copyright 2021 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
+import asyncio
 import dataclasses
 import enum
 import hashlib
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from secrets import token_hex
-from typing import Any, Callable, Generic, List, Sequence, TypeVar
+from typing import Any, Callable, Generic, Iterable, List, Optional, Sequence, TypeVar
+
+from .utils import batched
 
 T = TypeVar("T")
 _PANGEA_METADATA_KEY_PREFIX = "_pangea_"
@@ -32,6 +37,7 @@ class FilterOperator(str, enum.Enum):
     ALL = "all"  # Contains all (array of strings)
     TEXT_MATCH = "text_match"  # full text match (allows you to search for a specific substring, token or phrase within the text field)
     IS_EMPTY = "is_empty"  # the field is not exist or empty (null or empty array)
+    PREFIX = "prefix"  # path equal to or under any path of the array, split on "/" (array of strings)
 
 
 class PangeaMetadataKeys(str, enum.Enum):
@@ -104,8 +110,29 @@ class DocumentReader(ABC):
         pass
 
 
-class PangeaGenericNodeProcessor(ABC, Generic[T]):
-    """Abstract processor for handling nodes with filtering and processing methods."""
+class AsyncPangeaGenericNodeProcessor(ABC, Generic[T]):
+    """Abstract asyncio processor for handling nodes with filtering and processing methods."""
+
+    _data_source: Optional[str] = None
+    """Value of `PangeaMetadataKeys.DATA_SOURCE` handled by this processor. `None` means any source."""
+
+    @abstractmethod
+    async def afilter(self, nodes: List[T]) -> List[T]:
+        """Processes nodes and applies filtering without blocking the event loop."""
+        pass
+
+    @abstractmethod
+    async def aget_filter(self) -> MetadataFilter:
+        """Returns a filter based on the processed nodes' metadata without blocking the event loop."""
+        pass
+
+
+class PangeaGenericNodeProcessor(AsyncPangeaGenericNodeProcessor[T], Generic[T]):
+    """Abstract processor for handling nodes with filtering and processing methods.
+
+    Async methods run the blocking implementation in a worker thread. Processors with a native asyncio
+    client could override them.
+    """
 
     @abstractmethod
     def filter(self, nodes: List[T]) -> List[T]:
@@ -117,6 +144,14 @@ class PangeaGenericNodeProcessor(ABC, Generic[T]):
         """Returns a filter based on the processed nodes' metadata."""
         pass
 
+    async def afilter(self, nodes: List[T]) -> List[T]:
+        """Runs `filter` in a worker thread."""
+        return await asyncio.to_thread(self.filter, nodes)
+
+    async def aget_filter(self) -> MetadataFilter:
+        """Runs `get_filter` in a worker thread."""
+        return await asyncio.to_thread(self.get_filter)
+
 
 class MetadataEnricher(ABC):
     """Interface for generating additional metadata for documents."""
@@ -135,6 +170,15 @@ class MetadataEnricher(ABC):
         """Generates metadata based on document and its content."""
         pass
 
+    def prepare(self, documents: Sequence[Any]) -> None:
+        """Called by `enrich_metadata()` once per batch, before extracting its metadata, to fetch in bulk what the
+        batch needs. Does nothing by default."""
+        pass
+
+    def extract_metadata_batch(self, docs: Sequence[Any], contents: Sequence[str]) -> List[dict[str, Any]]:
+        """Generates metadata for a batch of documents, in the same order. Calls `extract_metadata()` by default."""
+        return [self.extract_metadata(doc, content) for doc, content in zip(docs, contents)]
+
 
 class MetadataUpdater(ABC):
     """Interface for updating document metadata."""
@@ -160,6 +204,12 @@ class HasherSHA256(MetadataEnricher):
         """Returns SHA-256 hash of the document content."""
         return {self._key: hashlib.sha256(file_content.encode()).hexdigest()}
 
+    def extract_metadata_batch(self, docs: Sequence[Any], contents: Sequence[str]) -> List[dict[str, Any]]:
+        """Returns SHA-256 hash of each document content."""
+        key = self._key
+        sha256 = hashlib.sha256
+        return [{key: sha256(content.encode()).hexdigest()} for content in contents]
+
 
 class Constant(MetadataEnricher):
     """Sets a constant value as metadata for the document."""
@@ -180,41 +230,48 @@ def enrich_metadata(
     metadata_enrichers: List[MetadataEnricher],
     reader: DocumentReader,
     updater: MetadataUpdater = GenericMetadataUpdater(),
+    batch_size: int = 100,
 ) -> None:
     """Enriches metadata of documents by applying specified enrichers.
 
+    Documents are processed in batches. Each enricher is prepared with the whole batch, so it could fetch in bulk
+    what it needs, and then extracts the metadata of the batch at once.
+
     Args:
         documents: A sequence of documents to enrich.
         metadata_enrichers: List of metadata enrichers to apply.
         reader: A reader instance to obtain document content.
         updater: Optional updater instance to apply metadata changes.
+        batch_size: Number of documents per batch.
     """
 
-    for doc in documents:
-        file_content = reader.read(doc)
+    for batch in batched(documents, batch_size):
+        contents = [reader.read(doc) for doc in batch]
 
         # Add Pangea Node Random ID
-        updater.update_metadata(doc, {PangeaMetadataKeys.NODE_ID: generate_id()})
+        for doc in batch:
+            updater.update_metadata(doc, {PangeaMetadataKeys.NODE_ID: generate_id()})
 
         for enricher in metadata_enrichers:
-            updater.update_metadata(doc, enricher.extract_metadata(doc, file_content))
-
-        reader.read(doc)
+            enricher.prepare(batch)
+            for doc, metadata in zip(batch, enricher.extract_metadata_batch(batch, contents)):
+                updater.update_metadata(doc, metadata)
 
 
-class PangeaNodeProcessorMixer(Generic[T]):
-    """Combines multiple node processors for authorization filtering.
+class AsyncPangeaNodeProcessorMixer(Generic[T]):
+    """Combines multiple asyncio node processors for authorization filtering.
 
-    Aggregates results from various node processors to create a unified view of authorized and unauthorized nodes.
+    Nodes are grouped by data source and every processor receives only the nodes of its own source, so all the
+    processors are awaited at the same time.
 
     Attributes:
-        _node_processors (List[PangeaGenericNodeProcessor]): List of node processors.
+        _node_processors (Sequence[AsyncPangeaGenericNodeProcessor]): List of node processors.
         _get_node_metadata (Callable): Function to get node metadata.
         _unauthorized_nodes (List[T]): Cached list of unauthorized nodes.
         _authorized_nodes (List[T]): Cached list of authorized nodes.
     """
 
-    _node_processors: List[PangeaGenericNodeProcessor[T]] = []
+    _node_processors: Sequence[AsyncPangeaGenericNodeProcessor[T]] = []
     _get_node_metadata: Callable[[T], dict[str, Any]]
     _unauthorized_nodes: List[T] = []
     _authorized_nodes: List[T] = []
@@ -222,16 +279,16 @@ class PangeaNodeProcessorMixer(Generic[T]):
     def __init__(
         self,
         get_node_metadata: Callable[[T], dict[str, Any]],
-        node_processors: List[PangeaGenericNodeProcessor[T]],
+        node_processors: Sequence[AsyncPangeaGenericNodeProcessor[T]],
     ):
         self._node_processors = node_processors
         self._get_node_metadata = get_node_metadata
 
-    def filter(
+    async def afilter(
         self,
         nodes: List[T],
     ) -> List[T]:
-        """Process nodes through each processor to filter authorized nodes.
+        """Process nodes through each processor concurrently to filter authorized nodes.
 
         Args:
             nodes (List[T]): List of nodes to process.
@@ -240,14 +297,141 @@ class PangeaNodeProcessorMixer(Generic[T]):
             List[T]: Nodes that have been authorized across all processors.
         """
 
-        authorized: dict[str, T] = {}
-        unauthorized: dict[str, T] = {}
+        unauthorized = self._index_nodes(nodes)
+        partitions = self._partition_nodes(unauthorized)
+
+        tasks = []
+        for npp in self._node_processors:
+            partition = partitions.get(npp._data_source, [])
+            if partition:
+                tasks.append(npp.afilter(partition))
+
+        results = await asyncio.gather(*tasks)
+        return self._merge_results(unauthorized, results)
+
+    async def aget_filters(self) -> List[MetadataFilter]:
+        """Retrieve filters from all node processors concurrently.
+
+        Returns:
+            List[MetadataFilter]: List of filters from each processor.
+        """
+
+        return list(await asyncio.gather(*[np.aget_filter() for np in self._node_processors]))
+
+    def get_unauthorized_nodes(
+        self,
+    ) -> List[T]:
+        """Retrieve nodes that were unauthorized after processing.
+
+        Returns:
+            List[T]: Unauthorized nodes.
+        """
+
+        return self._unauthorized_nodes
+
+    def get_authorized_nodes(
+        self,
+    ) -> List[T]:
+        """Retrieve nodes that were authorized after processing.
+
+        Returns:
+            List[T]: Authorized nodes.
+        """
+
+        return self._authorized_nodes
+
+    def _index_nodes(self, nodes: List[T]) -> dict[str, T]:
+        indexed: dict[str, T] = {}
         for node in nodes:
             id = self._get_node_metadata(node).get(PangeaMetadataKeys.NODE_ID, None)
             if not id:
                 raise Exception(f"{PangeaMetadataKeys.NODE_ID} key should be set in node metadata")
 
-            unauthorized[id] = node
+            indexed[id] = node
+
+        return indexed
+
+    def _partition_nodes(self, nodes: dict[str, T]) -> dict[Optional[str], List[T]]:
+        """Groups nodes by data source. Key `None` holds every node, for processors that do not declare a source."""
+
+        partitions: dict[Optional[str], List[T]] = {None: list(nodes.values())}
+        for node in nodes.values():
+            source = self._get_node_metadata(node).get(PangeaMetadataKeys.DATA_SOURCE, None)
+            if source is not None:
+                partitions.setdefault(source, []).append(node)
+
+        return partitions
+
+    def _merge_results(self, unauthorized: dict[str, T], results: Iterable[List[T]]) -> List[T]:
+        # This works as an OR operator among all node post processors
+        authorized_ids: set[str] = set()
+        for result in results:
+            for node in result:
+                authorized_ids.add(self._get_node_metadata(node).get(PangeaMetadataKeys.NODE_ID))  # type: ignore
+
+        # Keep original nodes order
+        self._authorized_nodes = [node for id, node in unauthorized.items() if id in authorized_ids]
+        self._unauthorized_nodes = [node for id, node in unauthorized.items() if id not in authorized_ids]
+        return self._authorized_nodes
+
+
+class PangeaNodeProcessorMixer(AsyncPangeaNodeProcessorMixer[T], Generic[T]):
+    """Combines multiple node processors for authorization filtering.
+
+    Aggregates results from various node processors to create a unified view of authorized and unauthorized nodes.
+
+    Attributes:
+        _node_processors (List[PangeaGenericNodeProcessor]): List of node processors.
+        _get_node_metadata (Callable): Function to get node metadata.
+        _unauthorized_nodes (List[T]): Cached list of unauthorized nodes.
+        _authorized_nodes (List[T]): Cached list of authorized nodes.
+        _concurrent (bool): Run processors concurrently, each one over the nodes of its own data source.
+        _max_workers (Optional[int]): Max number of threads used in concurrent mode.
+        _executor (Optional[ThreadPoolExecutor]): Executor of concurrent mode. Kept between `filter()` calls, so
+            per-thread clients (e.g. Google API services) are reused. Created on first use if not given.
+    """
+
+    _node_processors: List[PangeaGenericNodeProcessor[T]] = []
+    _concurrent: bool = False
+    _max_workers: Optional[int] = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _owns_executor: bool = False
+    _executor_lock: threading.Lock
+
+    def __init__(
+        self,
+        get_node_metadata: Callable[[T], dict[str, Any]],
+        node_processors: List[PangeaGenericNodeProcessor[T]],
+        concurrent: bool = False,
+        max_workers: Optional[int] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        super().__init__(get_node_metadata, node_processors)
+        self._node_processors = node_processors
+        self._concurrent = concurrent
+        self._max_workers = max_workers
+        self._executor = executor
+        self._owns_executor = False
+        self._executor_lock = threading.Lock()
+
+    def filter(
+        self,
+        nodes: List[T],
+    ) -> List[T]:
+        """Process nodes through each processor to filter authorized nodes.
+
+        Args:
+            nodes (List[T]): List of nodes to process.
+
+        Returns:
+            List[T]: Nodes that have been authorized across all processors.
+        """
+
+        unauthorized = self._index_nodes(nodes)
+        if self._concurrent:
+            return self._filter_concurrent(unauthorized)
+
+        authorized: dict[str, T] = {}
 
         # This works as an OR operator among all node post processors
         for npp in self._node_processors:
@@ -272,24 +456,34 @@ class PangeaNodeProcessorMixer(Generic[T]):
 
         return filters
 
-    def get_unauthorized_nodes(
-        self,
-    ) -> List[T]:
-        """Retrieve nodes that were unauthorized after processing.
+    def _filter_concurrent(self, unauthorized: dict[str, T]) -> List[T]:
+        partitions = self._partition_nodes(unauthorized)
 
-        Returns:
-            List[T]: Unauthorized nodes.
-        """
+        jobs: List[tuple[PangeaGenericNodeProcessor[T], List[T]]] = []
+        for npp in self._node_processors:
+            partition = partitions.get(npp._data_source, [])
+            if partition:
+                jobs.append((npp, partition))
 
-        return self._unauthorized_nodes
+        if not jobs:
+            return self._merge_results(unauthorized, [])
 
-    def get_authorized_nodes(
-        self,
-    ) -> List[T]:
-        """Retrieve nodes that were authorized after processing.
+        results = list(self._get_executor().map(lambda job: job[0].filter(job[1]), jobs))
+        return self._merge_results(unauthorized, results)
 
-        Returns:
-            List[T]: Authorized nodes.
-        """
+    def close(self) -> None:
+        """Shuts down the executor of concurrent mode, if it was created by the mixer."""
 
-        return self._authorized_nodes
+        with self._executor_lock:
+            if self._owns_executor and self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                self._owns_executor = False
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers or len(self._node_processors) or 1)
+                self._owns_executor = True
+
+            return self._executor
@@ -1,11 +1,12 @@
+import functools
 import json
 import logging
-from typing import List, Optional
-
-import requests
+from typing import Any, Iterator, List, Optional
 
 from .core import MultipassDocument, PangeaMetadataKeys, PangeaMetadataValues, generate_id
 from .sources import DropboxClient
+from .transport import HttpTransport, get_default_transport
+from .utils import iter_prefetched
 
 _actor = "dropbox_reader"
 
@@ -19,12 +20,20 @@ class DropboxReader:
     _folder_path: str
     _recursive: bool
 
-    def __init__(self, token: str, folder_path: str = "", recursive: bool = True, logger_name: str = "multipass"):
+    def __init__(
+        self,
+        token: str,
+        folder_path: str = "",
+        recursive: bool = True,
+        logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+    ):
         self._token = token
         self._folder_path = folder_path
         self._recursive = recursive
         self.logger = logging.getLogger(logger_name)
-        self._client = DropboxClient(logger_name)
+        self._transport = transport if transport is not None else get_default_transport()
+        self._client = DropboxClient(logger_name, transport=self._transport)
         self.restart()
 
     def restart(self):
@@ -44,12 +53,21 @@ class DropboxReader:
         It download and return just files, skipping folders.
         """
 
-        documents: List[MultipassDocument] = []
+        return list(self.iter_documents())
 
-        while self._has_more:
-            documents.extend(self.read_page(page_size=50))
+    def iter_documents(self, prefetch: int = 4, page_size: int = 50) -> Iterator[MultipassDocument]:
+        """
+        Yield the files in Dropbox as they are downloaded, skipping folders.
+        Up to `prefetch` files are downloaded in background threads ahead of the consumer, so memory usage stays
+        flat no matter the number of files. Continues from the last page read, like `read_page`.
 
-        return documents
+        Args:
+            prefetch (int): Number of files to download ahead. Set to 0 to download each file when requested.
+            page_size (int): Approximate number of entries requested per page.
+        """
+
+        tasks = (functools.partial(self._read_file, entry) for entry in self._iter_file_entries(page_size))
+        yield from iter_prefetched(tasks, prefetch)
 
     def read_page(self, page_size: int = 50) -> List[MultipassDocument]:
         """
@@ -58,7 +76,14 @@ class DropboxReader:
         It could be more due to Drobox API limitations or it could be less due to folders being skipped.
         """
 
-        documents: List[MultipassDocument] = []
+        return [self._read_file(entry) for entry in self._list_page(page_size)]
+
+    def _iter_file_entries(self, page_size: int) -> Iterator[dict[str, Any]]:
+        while self._has_more:
+            yield from self._list_page(page_size)
+
+    def _list_page(self, page_size: int) -> List[dict[str, Any]]:
+        """Requests the next page of entries and returns its files."""
 
         url = DropboxClient.LIST_FILES_URL if self._cursor is None else DropboxClient.LIST_CONTINUE_URL
         data = {"path": self._folder_path, "recursive": self._recursive, "limit": page_size}
@@ -66,7 +91,7 @@ class DropboxReader:
             data = {"cursor": self._cursor}
 
         headers = {"Authorization": f"Bearer {self._token}", "Content-Type": "application/json"}
-        response = requests.post(url, json=data, headers=headers)
+        response = self._transport.post(url, json=data, headers=headers)
         if response.status_code != 200:
             self.logger.error(
                 json.dumps(
@@ -87,28 +112,22 @@ class DropboxReader:
         result = response.json()
         entries = result.get("entries", [])
 
-        for entrie in entries:
-            if entrie.get(".tag", "") != "file":
-                continue
-
-            file_path: str = entrie.get("path_lower", None)
-            if not file_path:
-                continue
-
-            name = entrie.get("name", "")
-            path = file_path.removesuffix(f"/{name}")
-
-            file = self._client.download_file(token=self._token, file_path=file_path)
-            metadata: dict[str, str] = {
-                PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_DROPBOX,
-                PangeaMetadataKeys.DROPBOX_ID: entrie.get("id", ""),
-                PangeaMetadataKeys.DROPBOX_PATH: path,
-                PangeaMetadataKeys.DROPBOX_FILE_PATH: file_path,
-                PangeaMetadataKeys.FILE_PATH: file_path,
-                PangeaMetadataKeys.FILE_NAME: name,
-            }
-            documents.append(MultipassDocument(id=generate_id(), content=file, metadata=metadata))
-
         self._has_more = result.get("has_more", False)
         self._cursor = result.get("cursor")
-        return documents
+        return [entrie for entrie in entries if entrie.get(".tag", "") == "file" and entrie.get("path_lower", None)]
+
+    def _read_file(self, entrie: dict[str, Any]) -> MultipassDocument:
+        file_path: str = entrie["path_lower"]
+        name = entrie.get("name", "")
+        path = file_path.removesuffix(f"/{name}")
+
+        file = self._client.download_file(token=self._token, file_path=file_path)
+        metadata: dict[str, str] = {
+            PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_DROPBOX,
+            PangeaMetadataKeys.DROPBOX_ID: entrie.get("id", ""),
+            PangeaMetadataKeys.DROPBOX_PATH: path,
+            PangeaMetadataKeys.DROPBOX_FILE_PATH: file_path,
+            PangeaMetadataKeys.FILE_PATH: file_path,
+            PangeaMetadataKeys.FILE_NAME: name,
+        }
+        return MultipassDocument(id=generate_id(), content=file, metadata=metadata)
@@ -1,8 +1,14 @@
+import functools
+import json
 import logging
-from typing import Any, List, Optional
+from typing import Any, Iterator, List, Optional, Sequence
 
 from .core import MultipassDocument, PangeaMetadataKeys, PangeaMetadataValues, generate_id
 from .sources.github import GitHubClient
+from .transport import HttpTransport
+from .utils import iter_prefetched, iter_tar_files
+
+_actor = "github_reader"
 
 
 class GitHubReader:
@@ -12,11 +18,22 @@ class GitHubReader:
     _current_file: int = 0
     _repo_files: Optional[List[dict]] = None
     _current_repository: dict = {}
+    _failed_files: List[dict[str, str]]
+    max_workers: int
+    """Number of files downloaded concurrently by read_repo_files"""
 
-    def __init__(self, token: str, logger_name: str = "multipass"):
+    def __init__(
+        self,
+        token: str,
+        logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+        max_workers: int = 8,
+    ):
         self._token = token
+        self.max_workers = max_workers
+        self._failed_files = []
         self.logger = logging.getLogger(logger_name)
-        self._client = GitHubClient(logger_name)
+        self._client = GitHubClient(logger_name, transport=transport)
         self._restart()
 
     def load_data(
@@ -26,49 +43,88 @@ class GitHubReader:
         Load all the data from the repositories
         This will read all the files from all the repositories the token has access to.
         This process is blocking and can take a long time. If working with a large number of repositories,
-        consider using the read_repo_files method.
+        consider using the iter_documents or read_repo_files methods.
         """
-        documents: List[MultipassDocument] = []
+        return list(self.iter_documents())
 
-        # Get repositories
-        repos = self._client.get_user_repos(self._token)
+    def iter_documents(self, prefetch: int = 4) -> Iterator[MultipassDocument]:
+        """
+        Yield the files from all the repositories the token has access to, as they are downloaded.
+        Up to `prefetch` files are downloaded in background threads ahead of the consumer, so memory usage stays
+        flat no matter the size of the repositories.
+
+        Args:
+            prefetch (int): Number of files to download ahead. Set to 0 to download each file when requested.
+        """
 
-        for repo in repos:
+        for repo in self._client.get_user_repos(self._token):
             owner = repo["owner"]["login"]
             repo_name = repo["name"]
 
             # Get all files recursively
             files = self._client.get_repo_files(self._token, owner, repo_name)
+            tasks = (functools.partial(self._read_file, owner, repo_name, file) for file in files)
+            yield from iter_prefetched(tasks, prefetch)
 
-            for file in files:
-                file_path = file["path"]
-                download_url = file["url"]
-
-                # Fetch the file content
-                content = self._client.download_file_content(self._token, download_url)
-
-                # Create metadata
-                metadata: dict[str, Any] = {
-                    PangeaMetadataKeys.GITHUB_REPOSITORY_NAME: repo_name,
-                    PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER: owner,
-                    PangeaMetadataKeys.FILE_PATH: file_path,
-                    PangeaMetadataKeys.FILE_NAME: file_path,
-                    PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_GITHUB,
-                    PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER_AND_NAME: (owner, repo_name),
-                }
+    def iter_archive_documents(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        max_file_size: Optional[int] = None,
+    ) -> Iterator[MultipassDocument]:
+        """
+        Yield the files from all the repositories the token has access to, downloading one archive per repository.
+        See read_repo_archive.
+        """
 
-                doc = MultipassDocument(id=generate_id(), content=content, metadata=metadata)
-                documents.append(doc)
+        for repo in self._client.get_user_repos(self._token):
+            yield from self.read_repo_archive(repo, include=include, exclude=exclude, max_file_size=max_file_size)
 
-        return documents
+    def read_repo_archive(
+        self,
+        repository: dict,
+        ref: Optional[str] = None,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        max_file_size: Optional[int] = None,
+    ) -> Iterator[MultipassDocument]:
+        """
+        Yield the files of a repository from its tarball.
+        The tarball is requested once and streamed without being extracted to disk, so a whole repository costs
+        a single API request instead of one per file. Documents carry the same metadata as read_repo_files.
+
+        Args:
+            repository (dict): Repository, as returned by get_repos.
+            ref (Optional[str]): Branch, tag or commit. Defaults to the repository default branch.
+            include (Optional[Sequence[str]]): Glob patterns of the file paths to read, e.g. `["*.md", "docs/*"]`.
+            exclude (Optional[Sequence[str]]): Glob patterns of the file paths to skip.
+            max_file_size (Optional[int]): Files bigger than this number of bytes are skipped.
+        """
+
+        owner = repository["owner"]["login"]
+        repo_name = repository["name"]
+
+        response = self._client.download_repo_archive(self._token, owner, repo_name, ref=ref)
+        try:
+            response.raw.decode_content = True
+            for file_path, content in iter_tar_files(
+                response.raw, include=include, exclude=exclude, max_file_size=max_file_size
+            ):
+                # Same text as read_repo_files
+                yield self._build_document(owner, repo_name, file_path, GitHubClient.decode_content(content))
+        finally:
+            response.close()
 
     def read_repo_files(self, repository: dict, page_size: int = 100) -> List[MultipassDocument]:
         """
         Read files from a given repository
         If the repository is different from the last one, it will restart the reader.
         If the repository is the same, it will continue reading from the last file.
+        Files of the page are downloaded concurrently. Files that could not be downloaded are skipped and reported
+        in failed_files, so the rest of the page is still returned.
         """
         documents: List[MultipassDocument] = []
+        self._failed_files = []
 
         self._read_repo_files_checks(repository)
         if self._repo_files is None:
@@ -77,30 +133,17 @@ class GitHubReader:
         owner = self._current_repository["owner"]["login"]
         repo_name = self._current_repository["name"]
 
-        i = 0
-        while i < page_size and self._current_file < len(self._repo_files):
-            file = self._repo_files[self._current_file]
-            i += 1
-            self._current_file += 1
+        files = self._repo_files[self._current_file : self._current_file + page_size]
+        self._current_file += len(files)
 
-            file_path = file["path"]
-            download_url = file["url"]
+        tasks = (functools.partial(self._read_file, owner, repo_name, file) for file in files)
+        results = iter_prefetched(tasks, self.max_workers, return_exceptions=True)
+        for file, result in zip(files, results):
+            if isinstance(result, Exception):
+                self._add_failed_file(file["path"], result)
+                continue
 
-            # Fetch the file content
-            content = self._client.download_file_content(self._token, download_url)
-
-            # Create metadata
-            metadata: dict[str, Any] = {
-                PangeaMetadataKeys.GITHUB_REPOSITORY_NAME: repo_name,
-                PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER: owner,
-                PangeaMetadataKeys.FILE_PATH: file_path,
-                PangeaMetadataKeys.FILE_NAME: file_path,
-                PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_GITHUB,
-                PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER_AND_NAME: (owner, repo_name),
-            }
-
-            doc = MultipassDocument(id=generate_id(), content=content, metadata=metadata)
-            documents.append(doc)
+            documents.append(result)
 
         return documents
 
@@ -113,6 +156,45 @@ class GitHubReader:
         """Check if there are more files to read"""
         return self._repo_files is not None and self._current_file < len(self._repo_files)
 
+    @property
+    def failed_files(self) -> List[dict[str, str]]:
+        """Files that could not be downloaded on the last read_repo_files call, with their error"""
+        return self._failed_files
+
+    def _add_failed_file(self, file_path: str, error: Exception) -> None:
+        self.logger.error(
+            json.dumps(
+                {
+                    "actor": _actor,
+                    "fn": "read_repo_files",
+                    "repository": self._current_repository.get("full_name", self._current_repository.get("name")),
+                    "file_path": file_path,
+                    "error": str(error),
+                }
+            )
+        )
+        self._failed_files.append({"path": file_path, "error": str(error)})
+
+    def _read_file(self, owner: str, repo_name: str, file: dict) -> MultipassDocument:
+        file_path = file["path"]
+        download_url = file["url"]
+
+        # Fetch the file content
+        content = self._client.download_file_content(self._token, download_url)
+        return self._build_document(owner, repo_name, file_path, content)
+
+    def _build_document(self, owner: str, repo_name: str, file_path: str, content: str) -> MultipassDocument:
+        metadata: dict[str, Any] = {
+            PangeaMetadataKeys.GITHUB_REPOSITORY_NAME: repo_name,
+            PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER: owner,
+            PangeaMetadataKeys.FILE_PATH: file_path,
+            PangeaMetadataKeys.FILE_NAME: file_path,
+            PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_GITHUB,
+            PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER_AND_NAME: (owner, repo_name),
+        }
+
+        return MultipassDocument(id=generate_id(), content=content, metadata=metadata)
+
     def _restart(self) -> None:
         self._current_file = 0
         self._repo_files = None
@@ -0,0 +1,182 @@
+# Copyright 2021 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import base64
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+@dataclasses.dataclass
+class CachedResponse:
+    """Response body and validators saved to send conditional requests."""
+
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    def validators(self) -> dict[str, str]:
+        """Returns the headers to make a request conditional on this response."""
+
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, not_modified: requests.Response) -> requests.Response:
+        """Builds the response to return in place of a `304 Not Modified` one."""
+
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        return response
+
+    @staticmethod
+    def from_response(response: requests.Response) -> Optional["CachedResponse"]:
+        """Returns the cacheable version of a response, or `None` if it has no validators."""
+
+        etag = response.headers.get("ETag", None)
+        last_modified = response.headers.get("Last-Modified", None)
+        if not etag and not last_modified:
+            return None
+
+        return CachedResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            etag=etag,
+            last_modified=last_modified,
+        )
+
+
+class HttpResponseCache:
+    """Cache of responses with `ETag` or `Last-Modified`, used by `HttpTransport` to send conditional requests.
+
+    Servers answer `304 Not Modified` when the resource did not change, which is cheaper and, on GitHub, does not
+    count against the rate limit. Entries are kept in memory, bounded by total size, and optionally in a directory
+    so they are reused between runs.
+
+    Attributes:
+        max_memory_bytes (int): Max size of the bodies kept in memory. Least recently used entries are evicted first.
+        max_entry_bytes (int): Responses with a bigger body are not cached.
+        directory (Optional[str]): Directory to persist entries in. Not bounded in size.
+    """
+
+    max_memory_bytes: int
+    max_entry_bytes: int
+    directory: Optional[str]
+    _entries: "OrderedDict[str, CachedResponse]"
+    _memory_bytes: int
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 8 * 1024 * 1024,
+        directory: Optional[str] = None,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(method: str, url: str, params: Any, credential: str, accept: Optional[str] = None) -> str:
+        """Returns the cache key of a request. Responses are never shared between credentials."""
+
+        prepared_url = requests.Request(method, url, params=params).prepare().url or url
+        return hashlib.sha256("\0".join([method.upper(), prepared_url, credential, accept or ""]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+
+        return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        if len(entry.content) > self.max_entry_bytes:
+            return
+
+        self._remember(key, entry)
+        self._save(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+        if self.directory:
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".json"):
+                    os.remove(os.path.join(self.directory, filename))
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous.content)
+
+            self._entries[key] = entry
+            self._memory_bytes += len(entry.content)
+            while self._memory_bytes > self.max_memory_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted.content)
+
+    def _path(self, key: str) -> Optional[str]:
+        return os.path.join(self.directory, f"{key}.json") if self.directory else None
+
+    def _load(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            data["content"] = base64.b64decode(data["content"])
+            return CachedResponse(**data)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def _save(self, key: str, entry: CachedResponse) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+
+        data = dataclasses.asdict(entry)
+        data["content"] = base64.b64encode(entry.content).decode()
+        # Write to a temporary file first, so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
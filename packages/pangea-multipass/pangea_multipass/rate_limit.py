@@ -0,0 +1,287 @@
+# Copyright 2021 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import dataclasses
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+import requests
+
+
+class RateLimitError(Exception):
+    """Raised when a request could not be sent within the max wait time allowed by the rate limit."""
+
+    pass
+
+
+@dataclasses.dataclass
+class RateLimitBudget:
+    """Rate limit budget of a host and credential, as last reported by the server."""
+
+    limit: Optional[int]
+    remaining: Optional[int]
+    reset_at: Optional[float]
+    """Epoch time at which the budget is restored."""
+    retry_at: Optional[float] = None
+    """Epoch time before which requests should not be sent, after a rate limited response."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Allows bursts of `capacity` requests and `rate` requests per second after that.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Max number of tokens.
+    """
+
+    rate: float
+    capacity: float
+    _tokens: float
+    _updated_at: float
+    _lock: threading.Lock
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns the seconds to wait before using it."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Blocks until a token is available."""
+
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_Key = Tuple[str, str]
+
+
+class RateLimitScheduler:
+    """Schedules requests to stay within the rate limits of each host and credential.
+
+    Reads the rate limit headers sent by GitHub, GitLab, Jira and Confluence (`X-RateLimit-*`, `RateLimit-*` and
+    `Retry-After`), keeps a budget per host and credential, and spreads the remaining requests over the time left
+    until the budget is restored, so heavy jobs slow down instead of failing. Rate limited responses are retried
+    with jittered exponential backoff. Optional token buckets cap the request rate of a host.
+
+    Attributes:
+        max_retries (int): Max number of retries of a rate limited request.
+        base_delay (float): Seconds to wait before the first retry, when the server does not say.
+        max_delay (float): Max seconds to wait between retries, when the server does not say.
+        max_wait (float): Max seconds to wait for a budget to be restored. `RateLimitError` is raised past it.
+        slowdown_threshold (float): Fraction of the budget left below which requests are spread until reset.
+        rates (dict[str, float]): Max requests per second by host, applied to each credential.
+    """
+
+    max_retries: int
+    base_delay: float
+    max_delay: float
+    max_wait: float
+    slowdown_threshold: float
+    rates: dict[str, float]
+    _budgets: dict[_Key, RateLimitBudget]
+    _buckets: dict[_Key, TokenBucket]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_wait: float = 3600.0,
+        slowdown_threshold: float = 0.1,
+        rates: Optional[dict[str, float]] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.slowdown_threshold = slowdown_threshold
+        self.rates = {host.lower(): rate for host, rate in rates.items()} if rates is not None else {}
+        self._budgets = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_budget(self, host: str, credential: str = "") -> Optional[RateLimitBudget]:
+        """Returns a copy of the last known budget of a host and credential, if any."""
+
+        with self._lock:
+            budget = self._budgets.get((host.lower(), credential), None)
+            return dataclasses.replace(budget) if budget is not None else None
+
+    def acquire(self, host: str, credential: str = "") -> None:
+        """Blocks until a request could be sent to the host with the credential.
+
+        Raises:
+            RateLimitError: If the wait is longer than `max_wait`.
+        """
+
+        key = (host.lower(), credential)
+        delay = self._reserve(key)
+        if delay > self.max_wait:
+            raise RateLimitError(f"Rate limit of {host} is exhausted for {delay:.0f} seconds")
+
+        if delay > 0:
+            time.sleep(delay)
+
+        bucket = self._get_bucket(key)
+        if bucket is not None:
+            bucket.acquire()
+
+    def update(self, host: str, credential: str, response: requests.Response, attempt: int = 0) -> Optional[float]:
+        """Updates the budget from the response headers.
+
+        Args:
+            host (str): Host the request was sent to.
+            credential (str): Credential the request was sent with.
+            response (requests.Response): Response received.
+            attempt (int): Number of retries of the request so far, to compute the backoff.
+
+        Returns:
+            Optional[float]: Seconds to wait before retrying, or `None` if the response was not rate limited.
+        """
+
+        key = (host.lower(), credential)
+        headers = response.headers
+        now = time.time()
+        limit = _parse_int(_first_header(headers, "X-RateLimit-Limit", "RateLimit-Limit"))
+        remaining = _parse_int(_first_header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining"))
+        reset_at = _parse_reset(_first_header(headers, "X-RateLimit-Reset", "RateLimit-Reset"), now)
+        retry_after = _parse_retry_after(headers.get("Retry-After", None), now)
+
+        rate_limited = response.status_code == 429 or (
+            response.status_code in (403, 503) and (retry_after is not None or remaining == 0)
+        )
+
+        delay: Optional[float] = None
+        if rate_limited:
+            if retry_after is not None:
+                delay = retry_after
+            elif remaining == 0 and reset_at is not None:
+                delay = max(reset_at - now, 0.0)
+
+        with self._lock:
+            budget = self._budgets.get(key, None)
+            if budget is None:
+                budget = RateLimitBudget(limit=None, remaining=None, reset_at=None)
+                self._budgets[key] = budget
+
+            if limit is not None:
+                budget.limit = limit
+            if remaining is not None:
+                budget.remaining = remaining
+            if reset_at is not None:
+                budget.reset_at = reset_at
+            if delay is not None:
+                budget.retry_at = now + delay
+
+        return self.backoff(attempt, delay) if rate_limited else None
+
+    def backoff(self, attempt: int, delay: Optional[float] = None) -> float:
+        """Returns the seconds to wait before a retry. Uses full jitter when the server did not set a delay."""
+
+        if delay is not None:
+            return delay + random.uniform(0, self.base_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+    def _reserve(self, key: _Key) -> float:
+        now = time.time()
+        with self._lock:
+            budget = self._budgets.get(key, None)
+            if budget is None:
+                return 0.0
+
+            delay = 0.0
+            if budget.retry_at is not None and budget.retry_at > now:
+                delay = budget.retry_at - now
+
+            if budget.remaining is not None and budget.reset_at is not None and budget.reset_at > now:
+                until_reset = budget.reset_at - now
+                if budget.remaining <= 0:
+                    delay = max(delay, until_reset)
+                elif budget.limit and budget.remaining < budget.limit * self.slowdown_threshold:
+                    # Spread the requests left until the budget is restored
+                    delay = max(delay, until_reset / budget.remaining)
+
+                # Count this request, so concurrent callers see the budget shrink before responses arrive
+                budget.remaining -= 1
+
+            return delay
+
+    def _get_bucket(self, key: _Key) -> Optional[TokenBucket]:
+        rate = self.rates.get(key[0], None)
+        if rate is None:
+            return None
+
+        with self._lock:
+            bucket = self._buckets.get(key, None)
+            if bucket is None:
+                bucket = TokenBucket(rate)
+                self._buckets[key] = bucket
+
+        return bucket
+
+
+def _first_header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name, None)
+        if value is not None:
+            return value
+
+    return None
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def _parse_reset(value: Optional[str], now: float) -> Optional[float]:
+    seconds = _parse_int(value)
+    if seconds is None:
+        return None
+
+    # GitHub and GitLab send an epoch time, the IETF draft headers send seconds left
+    return float(seconds) if seconds > 1_000_000_000 else now + seconds
+
+
+def _parse_retry_after(value: Optional[str], now: float) -> Optional[float]:
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - now, 0.0)
+    except (TypeError, ValueError):
+        return None
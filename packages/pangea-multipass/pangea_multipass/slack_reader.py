@@ -1,11 +1,15 @@
+import functools
+import itertools
 import logging
-from typing import Any, List, Optional, Tuple
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional, Tuple
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from .core import MultipassDocument, PangeaMetadataKeys, PangeaMetadataValues, generate_id
 from .sources import SlackClient
+from .utils import iter_prefetched
 
 
 class SlackReader:
@@ -17,21 +21,83 @@ class SlackReader:
 
     def __init__(self, token: str, logger_name: str = "multipass") -> None:
         self._token = token
-        self._slack_client = WebClient(token=self._token)
+        self._slack_client = SlackClient.new_web_client(self._token)
         self.logger = logging.getLogger(logger_name)
         self._client = SlackClient(logger_name)
         self._restart()
 
     def load_data(self, max_messages_per_channel: int = 1000) -> List[MultipassDocument]:
         """Load all messages from all channels"""
-        documents: List[MultipassDocument] = []
+        return list(self.iter_documents(max_messages_per_channel))
+
+    def iter_documents(self, max_messages_per_channel: int = 1000, prefetch: int = 4) -> Iterator[MultipassDocument]:
+        """
+        Yield the messages from all channels, one channel at a time.
+        Up to `prefetch` channels are fetched in background threads ahead of the consumer, so memory usage is
+        bounded by the size of those channels.
+
+        Args:
+            max_messages_per_channel (int): Max number of messages to read per channel.
+            prefetch (int): Number of channels to fetch ahead. Set to 0 to fetch each channel when requested.
+        """
+
         channels = self._client.list_channels(token=self._token)
-        for channel in channels:
-            self.logger.debug(f"Fetching messages from channel {channel['name']}")
-            messages, _, _ = self._fetch_messages(channel["id"], max_messages_per_channel)
-            documents.extend(self._process_messages(messages, channel))
+        tasks = (functools.partial(self._read_channel, channel, max_messages_per_channel) for channel in channels)
+        for documents in iter_prefetched(tasks, prefetch):
+            yield from documents
 
-        return documents
+    def load_new_data(
+        self, watermarks: dict[str, str], include_replies: bool = False, max_messages_per_channel: int = 1000
+    ) -> List[MultipassDocument]:
+        """Load the messages posted or edited since the last sync. See `iter_new_documents()`."""
+        return list(self.iter_new_documents(watermarks, include_replies, max_messages_per_channel))
+
+    def iter_new_documents(
+        self,
+        watermarks: dict[str, str],
+        include_replies: bool = False,
+        max_messages_per_channel: int = 1000,
+        edit_lookback: float = 3600,
+        prefetch: int = 4,
+        max_workers: int = 4,
+    ) -> Iterator[MultipassDocument]:
+        """
+        Yield only the messages posted or edited since the last sync, one channel at a time.
+        `watermarks` maps channel IDs to the timestamp of their latest synced message. It is updated in place once
+        the documents of a channel are yielded, so it could be saved (e.g. with `data_save()`) and passed to the
+        next sync. Channels without a watermark are read up to `max_messages_per_channel`, newest first.
+
+        Slack does not list messages by edition time, so messages posted up to `edit_lookback` seconds before the
+        watermark are requested again and yielded if they were edited after it. Likewise, new replies are found on
+        threads started within that window. Documents of edited messages have the same channel ID and timestamp
+        metadata as the previous version.
+
+        Args:
+            watermarks (dict[str, str]): Latest synced timestamp of each channel. Updated in place.
+            include_replies (bool): Also read the replies of threads with activity since the watermark.
+            max_messages_per_channel (int): Max number of messages to read from channels without watermark.
+            edit_lookback (float): Seconds before the watermark in which edited messages and new replies are found.
+            prefetch (int): Number of channels to fetch ahead. Set to 0 to fetch each channel when requested.
+            max_workers (int): Max number of threads whose replies are fetched concurrently, per channel.
+        """
+
+        channels = self._client.list_channels(token=self._token)
+        tasks = (
+            functools.partial(
+                self._read_channel_changes,
+                channel,
+                watermarks.get(channel["id"], None),
+                include_replies,
+                max_messages_per_channel,
+                edit_lookback,
+                max_workers,
+            )
+            for channel in channels
+        )
+        for channel, (documents, watermark) in zip(channels, iter_prefetched(tasks, prefetch)):
+            yield from documents
+            if watermark is not None:
+                watermarks[channel["id"]] = watermark
 
     def get_channels(self) -> List[dict[str, Any]]:
         """Get all the channels token has access to"""
@@ -63,6 +129,56 @@ class SlackReader:
         """Check if there are more messages to read"""
         return self._has_more_messages
 
+    def _read_channel(self, channel: dict, max_messages: int) -> List[MultipassDocument]:
+        self.logger.debug(f"Fetching messages from channel {channel['name']}")
+        messages, _, _ = self._fetch_messages(channel["id"], max_messages)
+        return self._process_messages(messages, channel)
+
+    def _read_channel_changes(
+        self,
+        channel: dict,
+        watermark: Optional[str],
+        include_replies: bool,
+        max_messages: int,
+        edit_lookback: float,
+        max_workers: int,
+    ) -> Tuple[List[MultipassDocument], Optional[str]]:
+        """Read the messages of a channel changed since the watermark. Returns their documents and the new watermark."""
+
+        channel_id = channel["id"]
+        oldest = str(Decimal(watermark) - Decimal(edit_lookback)) if watermark is not None else None
+        try:
+            messages = self._client.iter_messages(self._token, channel_id, oldest=oldest)
+            fetched = list(messages if watermark is not None else itertools.islice(messages, max_messages))
+
+            threads = [
+                message["ts"]
+                for message in fetched
+                if include_replies
+                and message.get("reply_count", 0) > 0
+                and _is_after(message.get("latest_reply", message["ts"]), watermark)
+            ]
+            tasks = (functools.partial(self._read_replies, channel_id, thread_ts, oldest) for thread_ts in threads)
+            for replies in iter_prefetched(tasks, max_workers):
+                fetched.extend(replies)
+
+        except SlackApiError as e:
+            self.logger.error(f"Error fetching messages for channel {channel_id}: {e.response['error']}")
+            raise Exception(f"Error fetching messages for channel {channel_id}: {e.response['error']}")
+
+        # Replies broadcast to the channel are listed in both the history and the thread
+        unique = {message.get("ts", None): message for message in fetched}
+        changed = [message for message in unique.values() if _is_after(_last_activity(message), watermark)]
+        latest = max([_last_activity(message) for message in fetched], key=Decimal, default=watermark)
+        if watermark is not None and latest is not None and Decimal(latest) < Decimal(watermark):
+            latest = watermark
+
+        self.logger.debug(f"Fetched {len(changed)} new or edited messages from channel {channel['name']}")
+        return self._process_messages(changed, channel), latest
+
+    def _read_replies(self, channel_id: str, thread_ts: str, oldest: Optional[str]) -> List[dict[str, Any]]:
+        return list(self._client.iter_replies(self._token, channel_id, thread_ts, oldest=oldest))
+
     def _restart(self) -> None:
         self._channel_id = None
         self._latest_ts = None
@@ -134,3 +250,17 @@ class SlackReader:
             raise Exception(f"Error fetching messages for channel {channel_id}: {e.response['error']}")
 
         return (messages, latest, more_messages)
+
+
+def _last_activity(message: dict[str, Any]) -> str:
+    """Timestamp of the last post or edition of a message."""
+
+    edited = message.get("edited", None) or {}
+    edited_ts = edited.get("ts", None)
+    ts: str = message.get("ts", "0")
+    return edited_ts if edited_ts is not None and Decimal(edited_ts) > Decimal(ts) else ts
+
+
+def _is_after(ts: str, watermark: Optional[str]) -> bool:
+    # Slack timestamps have more digits than a float could hold
+    return watermark is None or Decimal(ts) > Decimal(watermark)
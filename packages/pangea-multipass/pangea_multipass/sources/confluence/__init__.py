@@ -1,4 +1,4 @@
 # Copyright 2021 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
-from .confluence import ConfluenceAuth, ConfluenceME, ConfluenceProcessor
+from .confluence import ConfluenceAuth, ConfluenceME, ConfluenceProcessor, ConfluenceRestrictionResolver
@@ -2,13 +2,16 @@
 # Author: Pangea Cyber Corporation
 
 import dataclasses
+import functools
 import json
-from typing import Any, Callable, Generic, List, Optional
+from typing import Any, Callable, Generic, Iterator, List, Optional
+from urllib.parse import urljoin
 
 import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import HTTPError
 
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     FilterOperator,
     MetadataEnricher,
@@ -18,6 +21,8 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.transport import HttpTransport, get_default_transport
+from pangea_multipass.utils import batched, iter_prefetched
 
 
 @dataclasses.dataclass
@@ -75,15 +80,152 @@ class ConfluenceME(MetadataEnricher):
         return ""
 
 
+class ConfluenceRestrictionResolver:
+    """Checks users read access to Confluence pages from memoized restrictions.
+
+    Confluence restrictions are inherited, so a page is readable if the closest page with read restrictions, up
+    its ancestor chain, allows the user or one of its groups, or if there are none. The ancestors of a page are
+    requested once, and the restrictions of each page and the members of each group are memoized with a TTL, so
+    sibling pages reuse the lookups of their common ancestors. Share one instance between the processors of every
+    user of a Confluence site.
+
+    Attributes:
+        auth (ConfluenceAuth): Credentials with access to the restrictions of every page.
+        ttl (float): Seconds during which restrictions and group members are reused.
+    """
+
+    auth: ConfluenceAuth
+    ttl: float
+    _cache: AuthorizationCache
+    _transport: Optional[HttpTransport]
+
+    def __init__(
+        self,
+        auth: ConfluenceAuth,
+        ttl: float = 300,
+        cache: Optional[AuthorizationCache] = None,
+        transport: Optional[HttpTransport] = None,
+    ):
+        self.auth = auth
+        self.ttl = ttl
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
+        self._transport = transport
+        self._principal = credential_fingerprint(auth.url, auth.email, auth.token)
+
+    def check_user_access(self, page_id: str, account_id: str) -> bool:
+        """
+        Checks if a user could read a Confluence page.
+
+        Args:
+            page_id (str): ID of the Confluence page.
+            account_id (str): Account ID of the user to check access for.
+
+        Returns:
+            Boolean indicating whether the user has access.
+        """
+
+        # From the page up to the root
+        page_ids = [page_id] + list(reversed(self._get_ancestors(page_id)))
+        for current_page in page_ids:
+            restrictions = self._get_restrictions(current_page)
+            users: List[str] = restrictions["users"]
+            groups: List[str] = restrictions["groups"]
+            if not users and not groups:
+                continue
+
+            # The closest restricted page decides
+            if account_id in users:
+                return True
+
+            return any(account_id in self.get_group_members(group_id) for group_id in groups)
+
+        return True
+
+    def get_group_members(self, group_id: str) -> List[str]:
+        """Returns the account IDs of the members of a group, memoized."""
+
+        key = f"group:{group_id}"
+        members = self._cache.get(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, key)
+        if members is None:
+            members = ConfluenceAPI.get_group_members(self._basic_auth(), self.auth.url, group_id, self._transport)
+            self._cache.set(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, key, members, ttl=self.ttl)
+
+        return members
+
+    def _get_ancestors(self, page_id: str) -> List[str]:
+        """Returns the IDs of the ancestors of a page, from the root to the parent."""
+
+        ancestors = self._cache.get(
+            PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, f"ancestors:{page_id}"
+        )
+        if ancestors is None:
+            ancestors = self._load_page(page_id)
+
+        return ancestors
+
+    def _get_restrictions(self, page_id: str) -> dict[str, List[str]]:
+        """Returns the users and groups read access to a page is restricted to, both empty if it is not restricted."""
+
+        key = f"restrictions:{page_id}"
+        restrictions = self._cache.get(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, key)
+        if restrictions is not None:
+            return restrictions
+
+        restrictions = _read_restrictions(
+            ConfluenceAPI.get_page_restrictions(self._basic_auth(), self.auth.url, page_id, self._transport)
+        )
+        self._cache.set(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, key, restrictions, ttl=self.ttl)
+        return restrictions
+
+    def _load_page(self, page_id: str) -> List[str]:
+        """Requests the ancestors and restrictions of a page at once and memoizes them. Returns the ancestors."""
+
+        details = ConfluenceAPI.get_page_details(
+            self._basic_auth(),
+            self.auth.url,
+            page_id,
+            transport=self._transport,
+            expand="ancestors,restrictions.read.restrictions.user,restrictions.read.restrictions.group",
+        )
+        ancestors = [ancestor["id"] for ancestor in details.get("ancestors", [])]
+        values: dict[str, Any] = {
+            f"ancestors:{page_id}": ancestors,
+            f"restrictions:{page_id}": _read_restrictions(details.get("restrictions", {})),
+        }
+        # Ancestors of an ancestor are the ones above it
+        for i, ancestor_id in enumerate(ancestors):
+            values[f"ancestors:{ancestor_id}"] = ancestors[:i]
+
+        self._cache.set_many(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, self._principal, values, ttl=self.ttl)
+        return ancestors
+
+    def _basic_auth(self) -> HTTPBasicAuth:
+        return HTTPBasicAuth(self.auth.email, self.auth.token)
+
+
+def _read_restrictions(restrictions: dict[str, Any]) -> dict[str, List[str]]:
+    """Extracts the users and groups of the read restrictions of a page."""
+
+    details = restrictions.get("read", None) or {}
+    by_type = details.get("restrictions", None) or {}
+    users = [user.get("accountId") for user in by_type.get("user", {}).get("results", []) if user.get("accountId")]
+    groups = [group.get("id") for group in by_type.get("group", {}).get("results", []) if group.get("id")]
+    return {"users": users, "groups": groups}
+
+
 class ConfluenceProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     """Processor for handling Confluence documents with authorization checks."""
 
+    _data_source = PangeaMetadataValues.DATA_SOURCE_CONFLUENCE
     page_ids: List[str] = []
-    page_ids_cache: dict[str, bool] = {}
     auth: ConfluenceAuth
     space_id: Optional[int] = None
+    space_ids: Optional[List[int]] = None
     get_node_metadata: Callable[[T], dict[str, Any]]
     _account_id: Optional[str]
+    _transport: Optional[HttpTransport]
+    _cache: AuthorizationCache
+    _resolver: ConfluenceRestrictionResolver
 
     def __init__(
         self,
@@ -91,24 +233,51 @@ class ConfluenceProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         get_node_metadata: Callable[[T], dict[str, Any]],
         space_id: Optional[int] = None,
         account_id: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[AuthorizationCache] = None,
+        restriction_resolver: Optional[ConfluenceRestrictionResolver] = None,
+        space_ids: Optional[List[int]] = None,
     ):
         super().__init__()
         self.auth = auth
         self.space_id = space_id
+        self.space_ids = space_ids
         self.get_node_metadata = get_node_metadata
         self._account_id = account_id
+        self._transport = transport
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
+        self._resolver = (
+            restriction_resolver
+            if restriction_resolver is not None
+            else ConfluenceRestrictionResolver(auth, transport=transport)
+        )
 
     def filter(
         self,
         nodes: List[T],
     ) -> List[Any]:
-        """Filters nodes based on authorization criteria."""
+        """Filters nodes based on authorization criteria.
 
-        filtered: List[T] = []
+        Without `account_id`, access to every page not cached yet is checked in bulk with CQL searches sent as the
+        authenticated user.
+        """
+
+        confluence_nodes: List[T] = []
+        ids: List[str] = []
         for node in nodes:
-            if self._is_authorized(node):
-                filtered.append(node)
-        return filtered
+            metadata = self.get_node_metadata(node)
+            if metadata[PangeaMetadataKeys.DATA_SOURCE] != PangeaMetadataValues.DATA_SOURCE_CONFLUENCE:
+                continue
+
+            id = metadata.get(PangeaMetadataKeys.CONFLUENCE_PAGE_ID, None)
+            if not id:
+                raise KeyError("Invalid metadata key")
+
+            confluence_nodes.append(node)
+            ids.append(str(id))
+
+        access = self._load_access(ids)
+        return [node for node, id in zip(confluence_nodes, ids) if access.get(id, False)]
 
     def get_filter(
         self,
@@ -116,7 +285,14 @@ class ConfluenceProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         """Returns a filter to use for Confluence document authorization."""
 
         if not self.page_ids:
-            self.page_ids = ConfluenceAPI.load_page_ids(self.auth.email, self.auth.token, self.auth.url, self.space_id)
+            self.page_ids = ConfluenceAPI.load_page_ids(
+                self.auth.email,
+                self.auth.token,
+                self.auth.url,
+                self.space_id,
+                transport=self._transport,
+                space_ids=self.space_ids,
+            )
         return MetadataFilter(
             key=PangeaMetadataKeys.CONFLUENCE_PAGE_ID, value=self.page_ids, operator=FilterOperator.IN
         )
@@ -136,31 +312,45 @@ class ConfluenceProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         if not id:
             raise KeyError("Invalid metadata key")
 
-        access = self.page_ids_cache.get(id, None)
-        if access is not None:
-            return access
+        return self._load_access([str(id)]).get(str(id), False)
 
-        auth = HTTPBasicAuth(self.auth.email, self.auth.token)
-        try:
-            if self._account_id:
-                access = ConfluenceAPI.check_user_access(auth, self.auth.url, id, self._account_id)
-            else:
-                ConfluenceAPI.get_page(auth, self.auth.url, id)
-                access = True
-        except HTTPError as e:
-            if e.response is None or e.response.status_code == 404:
-                access = False
+    def _load_access(self, ids: List[str]) -> dict[str, bool]:
+        """Returns the access by page ID, checking the pages that are not cached yet. Missing pages are denied."""
+
+        principal = self._get_principal()
+        access: dict[str, bool] = self._cache.get_many(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, principal, ids)
+        pending = [id for id in dict.fromkeys(ids) if id not in access]
+        if not pending:
+            return access
 
-        if access is None:
-            return False
+        resolved: dict[str, bool] = {}
+        if self._account_id:
+            for id in pending:
+                resolved[id] = self._resolver.check_user_access(id, self._account_id)
+        else:
+            auth = HTTPBasicAuth(self.auth.email, self.auth.token)
+            try:
+                resolved = ConfluenceAPI.check_pages_access(auth, self.auth.url, pending, transport=self._transport)
+            except HTTPError:
+                # Denied without caching, so they are checked again next time
+                return access
 
-        self.page_ids_cache[id] = access
+        self._cache.set_many(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, principal, resolved)
+        access.update(resolved)
         return access
 
+    def _get_principal(self) -> str:
+        if self._account_id:
+            return f"{self.auth.url}:{self._account_id}"
+
+        return credential_fingerprint(self.auth.url, self.auth.email, self.auth.token)
+
 
 class ConfluenceAPI:
     @staticmethod
-    def get_pages(auth: HTTPBasicAuth, url: str, space_id: Optional[int]) -> dict[str, Any]:
+    def get_pages(
+        auth: HTTPBasicAuth, url: str, space_id: Optional[int], transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         """
         Fetches a list of pages from a Confluence space.
 
@@ -168,18 +358,20 @@ class ConfluenceAPI:
             auth (HTTPBasicAuth): The authentication credentials for Confluence.
             url (str): The base URL of the Confluence instance.
             space_id (Optional[int]): The space ID to filter pages by (optional).
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             dict: A JSON response containing the list of pages.
         """
 
+        transport = transport if transport is not None else get_default_transport()
+
         url = f"{url}/wiki/api/v2/pages"
         if space_id:
             url += f"?space-id={space_id}"
 
         headers = {"Accept": "application/json"}
-        response = requests.request(
-            "GET",
+        response = transport.get(
             url,
             headers=headers,
             auth=auth,
@@ -188,28 +380,126 @@ class ConfluenceAPI:
         return json.loads(response.text)
 
     @staticmethod
-    def load_page_ids(email: str, token: str, url: str, space_id: Optional[int]) -> List[str]:
+    def iter_pages(
+        auth: HTTPBasicAuth,
+        url: str,
+        space_id: Optional[int],
+        transport: Optional[HttpTransport] = None,
+        limit: int = 250,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterates over the pages of a Confluence space, or of every space, following the `_links.next` cursor.
+
+        Args:
+            auth (HTTPBasicAuth): The authentication credentials for Confluence.
+            url (str): The base URL of the Confluence instance.
+            space_id (Optional[int]): The space ID to filter pages by (optional).
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            limit (int): Pages requested per call. Confluence caps it to 250.
+
+        Yields:
+            dict: Page objects as returned by the pages API.
+        """
+
+        transport = transport if transport is not None else get_default_transport()
+        headers = {"Accept": "application/json"}
+        next_url: Optional[str] = f"{url}/wiki/api/v2/pages"
+        first_params: dict[str, Any] = {"limit": limit}
+        if space_id:
+            first_params["space-id"] = space_id
+
+        params: Optional[dict[str, Any]] = first_params
+
+        while next_url:
+            response = transport.get(next_url, headers=headers, auth=auth, params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield from data.get("results", [])
+
+            # The next link is relative to the site and already has every query parameter
+            next_link: Optional[str] = data.get("_links", {}).get("next", None)
+            next_url = urljoin(url, next_link) if next_link else None
+            params = None
+
+    @staticmethod
+    def iter_page_ids(
+        email: str,
+        token: str,
+        url: str,
+        space_id: Optional[int] = None,
+        transport: Optional[HttpTransport] = None,
+        space_ids: Optional[List[int]] = None,
+        max_workers: int = 4,
+    ) -> Iterator[str]:
         """
-        Retrieves IDs of all pages in a specified Confluence space using `get_pages`.
+        Yields the IDs of all pages in the specified Confluence spaces, as they are listed.
 
         Args:
             email (str): The email address associated with the Confluence account.
             token (str): The API token for authentication.
             url (str): The base URL of the Confluence instance.
             space_id (Optional[int]): The space ID to filter pages by (optional).
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            space_ids (Optional[List[int]]): Several space IDs to list concurrently, along with `space_id`.
+            max_workers (int): Max number of spaces listed at the same time.
+
+        Yields:
+            str: Page IDs.
+        """
+
+        auth = HTTPBasicAuth(email, token)
+        spaces = list(dict.fromkeys(([space_id] if space_id else []) + (space_ids or [])))
+        if len(spaces) <= 1:
+            for page in ConfluenceAPI.iter_pages(auth, url, spaces[0] if spaces else None, transport=transport):
+                yield page["id"]
+            return
+
+        tasks = (functools.partial(ConfluenceAPI._list_space_page_ids, auth, url, space, transport) for space in spaces)
+        for ids in iter_prefetched(tasks, max_workers):
+            yield from ids
+
+    @staticmethod
+    def load_page_ids(
+        email: str,
+        token: str,
+        url: str,
+        space_id: Optional[int],
+        transport: Optional[HttpTransport] = None,
+        space_ids: Optional[List[int]] = None,
+        max_workers: int = 4,
+    ) -> List[str]:
+        """
+        Retrieves IDs of all pages in the specified Confluence spaces using `iter_page_ids`.
+
+        Args:
+            email (str): The email address associated with the Confluence account.
+            token (str): The API token for authentication.
+            url (str): The base URL of the Confluence instance.
+            space_id (Optional[int]): The space ID to filter pages by (optional).
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            space_ids (Optional[List[int]]): Several space IDs to list concurrently, along with `space_id`.
+            max_workers (int): Max number of spaces listed at the same time.
 
         Returns:
-            List[str]: A list of page IDs in the specified space.
+            List[str]: A list of page IDs in the specified spaces.
         """
-        # FIXME: Iterate over pages
 
-        response = ConfluenceAPI.get_pages(HTTPBasicAuth(email, token), url, space_id=space_id)
-        pages = response.get("results", [])
-        ids = [page["id"] for page in pages]
-        return ids
+        return list(
+            ConfluenceAPI.iter_page_ids(
+                email, token, url, space_id, transport=transport, space_ids=space_ids, max_workers=max_workers
+            )
+        )
+
+    @staticmethod
+    def _list_space_page_ids(
+        auth: HTTPBasicAuth, url: str, space_id: int, transport: Optional[HttpTransport]
+    ) -> List[str]:
+        return [page["id"] for page in ConfluenceAPI.iter_pages(auth, url, space_id, transport=transport)]
 
     @staticmethod
-    def get_page(auth: HTTPBasicAuth, url: str, page_id: int | str) -> dict[str, Any]:
+    def get_page(
+        auth: HTTPBasicAuth, url: str, page_id: int | str, transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         """
         Fetches details of a specific Confluence page by its ID.
 
@@ -217,16 +507,17 @@ class ConfluenceAPI:
             auth (HTTPBasicAuth): The authentication credentials for Confluence.
             url (str): The base URL of the Confluence instance.
             page_id (int | str): The ID of the page to retrieve.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             dict: A JSON response containing the page details.
         """
 
+        transport = transport if transport is not None else get_default_transport()
         url = f"{url}/wiki/api/v2/pages/{page_id}"
 
         headers = {"Accept": "application/json"}
-        response = requests.request(
-            "GET",
+        response = transport.get(
             url,
             headers=headers,
             auth=auth,
@@ -235,7 +526,61 @@ class ConfluenceAPI:
         return dict(json.loads(response.text))
 
     @staticmethod
-    def get_page_details(auth: HTTPBasicAuth, url: str, page_id: str) -> dict[str, Any]:
+    def check_pages_access(
+        auth: HTTPBasicAuth,
+        url: str,
+        page_ids: List[str],
+        transport: Optional[HttpTransport] = None,
+        chunk_size: int = 50,
+    ) -> dict[str, bool]:
+        """
+        Checks which pages the authenticated user could read, with CQL searches of up to `chunk_size` page IDs.
+        Searches only return the content visible to the user, so pages that are not found are denied.
+
+        Args:
+            auth (HTTPBasicAuth): The authentication credentials of the user.
+            url (str): The base URL of the Confluence instance.
+            page_ids (List[str]): IDs of the pages to check.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            chunk_size (int): Max number of page IDs per search.
+
+        Returns:
+            dict[str, bool]: Access by page ID.
+        """
+
+        transport = transport if transport is not None else get_default_transport()
+        headers = {"Accept": "application/json"}
+        # Only numeric IDs are valid, and this keeps the query from being altered
+        access = {page_id: False for page_id in page_ids}
+        valid_ids = [page_id for page_id in access if page_id.isdigit()]
+
+        for chunk in batched(valid_ids, chunk_size):
+            next_url: Optional[str] = f"{url}/wiki/rest/api/content/search"
+            params: Optional[dict[str, Any]] = {"cql": f"id in ({','.join(chunk)})", "limit": len(chunk)}
+            while next_url:
+                response = transport.get(next_url, headers=headers, auth=auth, params=params)
+                response.raise_for_status()
+                data = response.json()
+                for content in data.get("results", []):
+                    content_id = str(content.get("id"))
+                    if content_id in access:
+                        access[content_id] = True
+
+                links = data.get("_links", {})
+                next_link: Optional[str] = links.get("next", None)
+                next_url = f"{links.get('base', f'{url}/wiki')}{next_link}" if next_link else None
+                params = None
+
+        return access
+
+    @staticmethod
+    def get_page_details(
+        auth: HTTPBasicAuth,
+        url: str,
+        page_id: str,
+        transport: Optional[HttpTransport] = None,
+        expand: str = "ancestors",
+    ) -> dict[str, Any]:
         """
         Fetch details of a Confluence page, including its parent.
 
@@ -243,23 +588,29 @@ class ConfluenceAPI:
             auth (HTTPBasicAuth): The authentication credentials for Confluence.
             url (str): The base URL of the Confluence instance.
             page_id (str): ID of the Confluence page.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            expand (str): Comma separated properties to expand. `ancestors` is needed to get the parent.
 
         Returns:
             Page details including the parent page ID.
         """
 
-        url = f"{url}/wiki/rest/api/content/{page_id}?expand=ancestors"
+        transport = transport if transport is not None else get_default_transport()
+
+        url = f"{url}/wiki/rest/api/content/{page_id}?expand={expand}"
         headers = {"Accept": "application/json"}
 
         try:
-            response = requests.get(url, auth=auth, headers=headers)
+            response = transport.get(url, auth=auth, headers=headers)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             raise Exception(f"Error fetching page details for page {page_id}: {e}")
 
     @staticmethod
-    def get_page_restrictions(auth: HTTPBasicAuth, url: str, page_id: str) -> dict[str, Any]:
+    def get_page_restrictions(
+        auth: HTTPBasicAuth, url: str, page_id: str, transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         """
         Fetch restrictions for a given Confluence page.
 
@@ -267,22 +618,26 @@ class ConfluenceAPI:
             auth (HTTPBasicAuth): The authentication credentials for Confluence.
             url (str): The base URL of the Confluence instance.
             page_id (str): ID of the Confluence page.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             List of restrictions.
         """
+        transport = transport if transport is not None else get_default_transport()
         url = f"{url}/wiki/rest/api/content/{page_id}/restriction/byOperation"
         headers = {"Accept": "application/json"}
 
         try:
-            response = requests.get(url, auth=auth, headers=headers)
+            response = transport.get(url, auth=auth, headers=headers)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             raise Exception(f"Error fetching restrictions for page {page_id}: {e}")
 
     @staticmethod
-    def check_user_access(auth: HTTPBasicAuth, url: str, page_id: str, account_id: str) -> bool:
+    def check_user_access(
+        auth: HTTPBasicAuth, url: str, page_id: str, account_id: str, transport: Optional[HttpTransport] = None
+    ) -> bool:
         """
         Recursively checks if a user has access to a Confluence page or its parent pages.
 
@@ -291,6 +646,7 @@ class ConfluenceAPI:
             url (str): The base URL of the Confluence instance.
             page_id (str): ID of the Confluence page.
             account_id (str): Account ID of the user to check access for.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             Boolean indicating whether the user has access.
@@ -300,7 +656,7 @@ class ConfluenceAPI:
         while current_page:
             # TODO: Log to logger
             # print(f"Checking restrictions for page {current_page}...")
-            restrictions = ConfluenceAPI.get_page_restrictions(auth, url, current_page)
+            restrictions = ConfluenceAPI.get_page_restrictions(auth, url, current_page, transport=transport)
             if restrictions:
                 # TODO: Check group permissions too
                 details = restrictions.get("read", {})
@@ -317,7 +673,9 @@ class ConfluenceAPI:
                     if restriction_group.get("size", 0) > 0:
                         # Check group restrictions
                         for group in restriction_group.get("results", []):
-                            if account_id in ConfluenceAPI.get_group_members(auth, url, group.get("id")):
+                            if account_id in ConfluenceAPI.get_group_members(
+                                auth, url, group.get("id"), transport=transport
+                            ):
                                 return True
 
                     if restriction_group.get("size", 0) > 0 or restriction_user.get("size", 0) > 0:
@@ -330,7 +688,7 @@ class ConfluenceAPI:
                 pass
 
             # Get parent page ID
-            page_details = ConfluenceAPI.get_page_details(auth, url, current_page)
+            page_details = ConfluenceAPI.get_page_details(auth, url, current_page, transport=transport)
             if page_details.get("ancestors"):
                 current_page = page_details["ancestors"][-1]["id"]
             else:
@@ -341,7 +699,9 @@ class ConfluenceAPI:
         return True
 
     @staticmethod
-    def get_group_members(auth: HTTPBasicAuth, url: str, group_id: str) -> List[str]:
+    def get_group_members(
+        auth: HTTPBasicAuth, url: str, group_id: str, transport: Optional[HttpTransport] = None
+    ) -> List[str]:
         """
         Fetch all members of a Confluence group.
 
@@ -349,28 +709,32 @@ class ConfluenceAPI:
             auth (HTTPBasicAuth): The authentication credentials for Confluence.
             url (str): The base URL of the Confluence instance.
             group_id (str): group id to request members.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             List of account IDs of group members.
         """
+        transport = transport if transport is not None else get_default_transport()
         group_members = []
         start = 0
         limit = 50  # Confluence API returns a limited number of results per request
 
         while True:
-            url = f"{url}/wiki/rest/api/group/{group_id}/membersByGroupId?start={start}&limit={limit}"
+            members_url = f"{url}/wiki/rest/api/group/{group_id}/membersByGroupId?start={start}&limit={limit}"
             headers = {"Accept": "application/json"}
 
             try:
-                response = requests.get(url, auth=auth, headers=headers)
+                response = transport.get(members_url, auth=auth, headers=headers)
                 response.raise_for_status()
                 data = response.json()
 
                 for member in data.get("results", []):
                     group_members.append(member["accountId"])
 
-                # Check if there are more members to fetch
-                if data.get("size", 0) + start >= data.get("totalSize", 0):
+                # Check if there are more members to fetch. `totalSize` is not always sent
+                size = data.get("size", 0)
+                total_size = data.get("totalSize", None)
+                if size < limit or (total_size is not None and start + size >= total_size):
                     break
 
                 start += limit
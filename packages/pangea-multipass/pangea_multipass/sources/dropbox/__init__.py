@@ -1 +1 @@
-from .dropbox import DropboxClient, DropboxProcessor
+from .dropbox import DropboxAclIndex, DropboxClient, DropboxProcessor
@@ -1,9 +1,14 @@
+import functools
 import json
 import logging
-from typing import Any, Callable, Generic, List, Optional
+import threading
+import time
+from typing import Any, Callable, Generic, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 
+from pangea_multipass.acl_snapshot import AclDelta, AclSnapshotStore
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache
 from pangea_multipass.core import (
     FilterOperator,
     MetadataFilter,
@@ -12,6 +17,8 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.transport import HttpTransport, get_default_transport
+from pangea_multipass.utils import PathPrefixTrie, iter_prefetched
 
 
 class DropboxClient:
@@ -21,9 +28,17 @@ class DropboxClient:
     TOKEN_URL = "https://api.dropbox.com/oauth2/token"
     LIST_FILES_URL = "https://api.dropboxapi.com/2/files/list_folder"
     LIST_CONTINUE_URL = "https://api.dropboxapi.com/2/files/list_folder/continue"
+    LIST_SHARED_FOLDERS_URL = "https://api.dropboxapi.com/2/sharing/list_folders"
+    LIST_SHARED_FOLDERS_CONTINUE_URL = "https://api.dropboxapi.com/2/sharing/list_folders/continue"
+    LIST_FOLDER_MEMBERS_URL = "https://api.dropboxapi.com/2/sharing/list_folder_members"
+    LIST_FOLDER_MEMBERS_CONTINUE_URL = "https://api.dropboxapi.com/2/sharing/list_folder_members/continue"
 
-    def __init__(self, logger_name: str = "multipass"):
+    max_workers: int
+
+    def __init__(self, logger_name: str = "multipass", transport: Optional[HttpTransport] = None, max_workers: int = 4):
         self.logger = logging.getLogger(logger_name)
+        self._transport = transport if transport is not None else get_default_transport()
+        self.max_workers = max_workers
 
     def download_file(self, token: str, file_path: str):
         """Download a file from Dropbox."""
@@ -34,7 +49,7 @@ class DropboxClient:
         }
 
         url = "https://content.dropboxapi.com/2/files/download"
-        response = requests.post(url, headers=headers, stream=True)
+        response = self._transport.post(url, headers=headers, stream=True)
         if response.status_code != 200:
             self.logger.error(
                 json.dumps(
@@ -65,7 +80,7 @@ class DropboxClient:
         headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
         data = {"file": file_path}
 
-        response = requests.post(url, json=data, headers=headers)
+        response = self._transport.post(url, json=data, headers=headers)
         if response.status_code != 200:
             self._log_error("check_user_access", url, data, response)
             return False
@@ -100,61 +115,99 @@ class DropboxClient:
         :return: List of folder paths the user has access to.
         """
 
-        accessible_folders: List[str] = []
-        has_more = True
-        cursor: Optional[str] = None
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        folders: List[dict[str, Any]] = []
+        try:
+            for folder in self.iter_shared_folders(token):
+                folders.append(folder)
+        except requests.HTTPError:
+            # Keep the folders listed before the failure
+            pass
+
+        members_by_folder = self.get_members_by_folder(token, [folder["shared_folder_id"] for folder in folders])
+        user_email = user_email.lower()
+        return [
+            DropboxClient.get_shared_folder_path(folder)
+            for folder in folders
+            if user_email in (members_by_folder.get(folder["shared_folder_id"], None) or [])
+        ]
+
+    def iter_shared_folders(self, token: str) -> Iterator[dict[str, Any]]:
+        """
+        Iterates over the shared folders of the token account, following the pagination cursor.
 
-        while has_more:
-            url = (
-                "https://api.dropboxapi.com/2/sharing/list_folders"
-                if cursor is None
-                else "https://api.dropboxapi.com/2/sharing/list_folders/continue"
-            )
-            data = {} if cursor is None else {"cursor": cursor}
-            response = requests.post(url, json=data, headers=headers)
+        :param token: Admin OAuth token with access to all files.
+        :return: Shared folder metadata as returned by `sharing/list_folders`.
+        :raises requests.HTTPError: If a page could not be loaded.
+        """
 
-            if response.status_code != 200:
-                self._log_error("list_shared_folders", url, data, response)
-                return accessible_folders
+        for page in self._iter_pages(
+            "iter_shared_folders",
+            token,
+            DropboxClient.LIST_SHARED_FOLDERS_URL,
+            DropboxClient.LIST_SHARED_FOLDERS_CONTINUE_URL,
+            {"limit": 1000},
+        ):
+            yield from page.get("entries", [])
 
-            resp_data = response.json()
-            self.logger.debug(
-                json.dumps(
-                    {
-                        "actor": DropboxClient._actor,
-                        "fn": "list_shared_folders",
-                        "actions": "post",
-                        "url": url,
-                        "data": data,
-                        "response": resp_data,
-                    }
-                )
-            )
+    def list_folder_members(self, token: str, shared_folder_id: str) -> List[str]:
+        """
+        Lists the emails of the users that are members of a shared folder, following the pagination cursor.
+        Members of groups the folder is shared with and pending invitees are not included.
 
-            shared_folders = resp_data.get("entries", [])
-            cursor = resp_data.get("cursor", None)
-            has_more = cursor is not None
+        :param token: Admin OAuth token with access to all files.
+        :param shared_folder_id: ID of the shared folder.
+        :return: Lowercase emails of the folder members.
+        :raises requests.HTTPError: If a page could not be loaded.
+        """
+
+        emails: List[str] = []
+        for page in self._iter_pages(
+            "list_folder_members",
+            token,
+            DropboxClient.LIST_FOLDER_MEMBERS_URL,
+            DropboxClient.LIST_FOLDER_MEMBERS_CONTINUE_URL,
+            {"shared_folder_id": shared_folder_id, "limit": 1000},
+        ):
+            for member in page.get("users", []):
+                email = member.get("user", {}).get("email", "")
+                if email:
+                    emails.append(email.lower())
+
+        return emails
+
+    def get_members_by_folder(self, token: str, shared_folder_ids: List[str]) -> dict[str, Optional[List[str]]]:
+        """
+        Lists the members of several shared folders concurrently, with up to `max_workers` folders in flight.
+
+        :param token: Admin OAuth token with access to all files.
+        :param shared_folder_ids: IDs of the shared folders.
+        :return: Lowercase member emails of each folder, or `None` for folders whose members could not be listed.
+        """
 
-            for folder in shared_folders:
-                folder_id = folder.get("shared_folder_id")
-                folder_name = folder.get("name")
+        tasks = (functools.partial(self.list_folder_members, token, folder_id) for folder_id in shared_folder_ids)
+        members_by_folder: dict[str, Optional[List[str]]] = {}
+        for folder_id, result in zip(
+            shared_folder_ids, iter_prefetched(tasks, self.max_workers, return_exceptions=True)
+        ):
+            if isinstance(result, requests.HTTPError):
+                members_by_folder[folder_id] = None
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                members_by_folder[folder_id] = result
 
-                members_url = "https://api.dropboxapi.com/2/sharing/list_folder_members"
-                members_data = {"shared_folder_id": folder_id}
+        return members_by_folder
 
-                members_response = requests.post(members_url, json=members_data, headers=headers)
+    @staticmethod
+    def get_shared_folder_path(folder: dict[str, Any]) -> str:
+        """Returns the path a shared folder is mounted at, or its name under the root if it is not mounted."""
 
-                if members_response.status_code == 200:
-                    members = members_response.json().get("users", [])
-                    for member in members:
-                        if member.get("user", {}).get("email", "").lower() == user_email.lower():
-                            if not folder_name.startswith("/"):
-                                folder_name = f"/{folder_name}"
-                            accessible_folders.append(folder_name)
-                            break
+        path: Optional[str] = folder.get("path_lower", None)
+        if path:
+            return path
 
-        return accessible_folders
+        name: str = folder.get("name", "")
+        return name if name.startswith("/") else f"/{name}"
 
     def list_subfolders(self, token: str, root: str) -> List[str]:
         """
@@ -164,22 +217,49 @@ class DropboxClient:
         :return: List of all folder paths.
         """
 
+        folders, _ = self.list_subfolders_with_cursor(token, root)
+        return folders
+
+    def list_subfolders_with_cursor(self, token: str, root: str) -> Tuple[List[str], Optional[str]]:
+        """
+        Lists all folders under a root, along with the cursor to request later changes.
+
+        :param token: Admin OAuth token with access to all files.
+        :param root: Path of the folder to list.
+        :return: List of all folder paths and the cursor, or `None` if the listing failed.
+        """
+
+        folders, _, cursor = self._list_folder(token, {"path": root, "recursive": True, "limit": 100})
+        return folders, cursor
+
+    def list_subfolder_changes(self, token: str, cursor: str) -> Tuple[List[str], List[str], Optional[str]]:
+        """
+        Lists folder changes since a cursor returned by `list_subfolders_with_cursor`.
+
+        :param token: Admin OAuth token with access to all files.
+        :param cursor: Cursor of the previous listing.
+        :return: Added folder paths, deleted paths and the new cursor, or `None` if the listing failed.
+        """
+
+        return self._list_folder(token, {"cursor": cursor})
+
+    def _list_folder(self, token: str, data: dict[str, Any]) -> Tuple[List[str], List[str], Optional[str]]:
         folders: List[str] = []
+        deleted: List[str] = []
         has_more = True
-        cursor: Optional[str] = None
+        cursor: Optional[str] = data.get("cursor", None)
         headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
         while has_more:
             url = DropboxClient.LIST_FILES_URL if cursor is None else DropboxClient.LIST_CONTINUE_URL
-            data = {"path": root, "recursive": True, "limit": 100}
             if cursor:
                 data = {"cursor": cursor}
 
-            response = requests.post(url, headers=headers, json=data)
+            response = self._transport.post(url, headers=headers, json=data)
 
             if response.status_code != 200:
                 self._log_error("list_subfolders", url, data, response)
-                return folders
+                return folders, deleted, None
 
             resp_data = response.json()
             folder_entries = resp_data.get("entries", [])
@@ -187,13 +267,34 @@ class DropboxClient:
             has_more = resp_data.get("has_more", False)
 
             for entrie in folder_entries:
-                if entrie.get(".tag") != "folder":
-                    continue
+                if entrie.get(".tag") == "deleted":
+                    deleted.append(entrie.get("path_lower", ""))
+                elif entrie.get(".tag") == "folder":
+                    folders.append(entrie.get("path_lower", ""))
 
-                folder_path = entrie.get("path_lower", "")
-                folders.append(folder_path)
+        return folders, deleted, cursor
 
-        return folders
+    def _iter_pages(
+        self, function_name: str, token: str, url: str, continue_url: str, data: dict[str, Any]
+    ) -> Iterator[dict[str, Any]]:
+        """Requests a listing page by page, following its cursor. Raises `requests.HTTPError` on failure."""
+
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        cursor: Optional[str] = None
+        while True:
+            request_url = url if cursor is None else continue_url
+            request_data = data if cursor is None else {"cursor": cursor}
+            response = self._transport.post(request_url, json=request_data, headers=headers)
+            if response.status_code != 200:
+                self._log_error(function_name, request_url, request_data, response)
+            response.raise_for_status()
+
+            page: dict[str, Any] = response.json()
+            yield page
+
+            cursor = page.get("cursor", None)
+            if not cursor:
+                return
 
     def _log_error(self, function_name: str, url: str, data: dict, response: requests.Response):
         self.logger.error(
@@ -211,11 +312,132 @@ class DropboxClient:
         )
 
 
+class DropboxAclIndex:
+    """Members of every shared folder, inverted to the folders each user could read.
+
+    Shared folders and their members are listed once, with members of several folders requested concurrently, and
+    listed again after `refresh_interval`. Files are checked by matching the folders of the user against the file
+    path, without any request. Share one instance between the processors of every user.
+
+    Only access through shared folders is indexed: files shared on their own are not.
+
+    Attributes:
+        refresh_interval (float): Seconds during which the index is used without listing shared folders again.
+    """
+
+    _token: str
+    refresh_interval: float
+    _user_folders: dict[str, set[str]]
+    _refreshed_at: Optional[float]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        token: str,
+        refresh_interval: float = 300,
+        logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+        max_workers: int = 4,
+    ):
+        self._token = token
+        self.refresh_interval = refresh_interval
+        self._client = DropboxClient(logger_name, transport=transport, max_workers=max_workers)
+        self._user_folders = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def get_user_folders(self, user_email: str) -> Optional[List[str]]:
+        """
+        Returns the shared folders a user is a member of, refreshing the index first if it is due.
+
+        :param user_email: Email of the user.
+        :return: Lowercase folder paths, or `None` if the index could not be built.
+        """
+
+        if not self.refresh():
+            return None
+
+        return list(self._user_folders.get(user_email.lower(), ()))
+
+    def has_access(self, user_email: str, file_path: str) -> Optional[bool]:
+        """
+        Checks if a user could read a file through one of the shared folders it is in.
+
+        :param user_email: Email of the user.
+        :param file_path: Path of the file in Dropbox (e.g., "/documents/file.txt").
+        :return: Whether the user has access, or `None` if the index could not be built.
+        """
+
+        if not self.refresh():
+            return None
+
+        folders = self._user_folders.get(user_email.lower(), None)
+        if not folders:
+            return False
+
+        # Walk up from the deepest parent folder, so the check costs one lookup per path level
+        path = file_path.lower().rstrip("/")
+        while path:
+            path = path.rsplit("/", 1)[0]
+            if (path or "/") in folders:
+                return True
+
+        return False
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Lists shared folders and their members again, if `refresh_interval` elapsed since the last refresh.
+
+        :param force: Refresh even if the last refresh is recent.
+        :return: True if the index is usable, False if it could not be built.
+        """
+
+        with self._lock:
+            now = time.time()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return True
+
+            try:
+                folders = list(self._client.iter_shared_folders(self._token))
+            except requests.HTTPError:
+                return self._refreshed_at is not None
+
+            members_by_folder = self._client.get_members_by_folder(
+                self._token, [folder["shared_folder_id"] for folder in folders]
+            )
+            previous_members = self._folder_members()
+            user_folders: dict[str, set[str]] = {}
+            for folder in folders:
+                path = DropboxClient.get_shared_folder_path(folder).lower()
+                members = members_by_folder.get(folder["shared_folder_id"], None)
+                # Folders whose members could not be listed keep their previous members until the next refresh
+                for email in members if members is not None else previous_members.get(path, ()):
+                    user_folders.setdefault(email, set()).add(path)
+
+            self._user_folders = user_folders
+            self._refreshed_at = now
+            return True
+
+    def _folder_members(self) -> dict[str, List[str]]:
+        folder_members: dict[str, List[str]] = {}
+        for email, folders in self._user_folders.items():
+            for folder in folders:
+                folder_members.setdefault(folder, []).append(email)
+
+        return folder_members
+
+
 class DropboxProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
-    _access_cache: dict[str, bool] = {}
+    _data_source = PangeaMetadataValues.DATA_SOURCE_DROPBOX
+    _access_cache: AuthorizationCache
     _token: str
     _folders: List[str] = []
     _user_email: str
+    _snapshots: Optional[AclSnapshotStore]
+    _acl_index: Optional[DropboxAclIndex]
+    _use_prefix_filter: bool
+    _folders_trie: Optional[PathPrefixTrie]
+    _trie_folders: set[str]
 
     def __init__(
         self,
@@ -223,14 +445,25 @@ class DropboxProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         user_email: str,
         get_node_metadata: Callable[[T], dict[str, Any]],
         logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[AuthorizationCache] = None,
+        snapshot_store: Optional[AclSnapshotStore] = None,
+        acl_index: Optional[DropboxAclIndex] = None,
+        use_prefix_filter: bool = False,
     ):
         super().__init__()
         self._token = token
-        self._access_cache = {}
+        self._folders = []
+        self._snapshots = snapshot_store
+        self._acl_index = acl_index
+        self._use_prefix_filter = use_prefix_filter
+        self._folders_trie = None
+        self._trie_folders = set()
+        self._access_cache = cache if cache is not None else InMemoryAuthorizationCache()
         self.get_node_metadata = get_node_metadata
         self._user_email = user_email
         self.logger = logging.getLogger(logger_name)
-        self._client = DropboxClient(logger_name)
+        self._client = DropboxClient(logger_name, transport=transport)
 
     def _has_access(self, metadata: dict[str, Any]) -> bool:
         """Check if the authenticated user has access to a file."""
@@ -239,13 +472,21 @@ class DropboxProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         if not path:
             raise KeyError(f"Invalid metadata key: {PangeaMetadataKeys.DROPBOX_FILE_PATH}")
 
-        has_access = self._access_cache.get(path, None)
+        has_access = self._access_cache.get(PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, path)
         if has_access is not None:
             return has_access
 
-        has_access = self._client.check_user_access(token=self._token, file_path=path, user_email=self._user_email)
+        # Folders loaded by get_filter() grant every file under them
+        if self._folders_trie is not None and self._folders_trie.matches(path.lower()):
+            return True
+
+        index_access = self._acl_index.has_access(self._user_email, path) if self._acl_index is not None else None
+        if index_access is not None:
+            has_access = index_access
+        else:
+            has_access = self._client.check_user_access(token=self._token, file_path=path, user_email=self._user_email)
 
-        self._access_cache[path] = has_access
+        self._access_cache.set(PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, path, has_access)
         return has_access
 
     def filter(
@@ -272,23 +513,99 @@ class DropboxProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     ) -> MetadataFilter:
         """Generate a filter based on accessible Dropbox paths.
 
+        If a snapshot store is set, paths are refreshed on every call requesting only the folder changes since the
+        last sync.
+
+        With `use_prefix_filter`, only the shared folders are returned with the `PREFIX` operator, matching every
+        path under them, instead of listing every subfolder. The vector store must support prefix matching. Shared
+        folders are listed again on every call, from the ACL index if set, so revoked folders stop matching.
+
         Returns:
             MetadataFilter: Filter for Dropbox paths.
         """
 
-        if not self._folders:
-            shared_folders = self._client.list_shared_folders(self._token, self._user_email)
-            folders = {value: True for value in shared_folders}
-
-            for folder in shared_folders:
-                subfolders = self._client.list_subfolders(self._token, folder)
-                folders.update({value: True for value in subfolders})
+        if self._use_prefix_filter:
+            folders_trie = self._update_folders_trie(self._list_shared_folders())
+            return MetadataFilter(
+                key=PangeaMetadataKeys.DROPBOX_PATH, value=folders_trie.roots(), operator=FilterOperator.PREFIX
+            )
 
-            self._access_cache = folders
-            self._folders = list(folders.keys())
+        if self._snapshots is not None:
+            self._folders = self._snapshots.sync(
+                PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, self._full_sync, self._delta_sync
+            )
+        elif not self._folders:
+            self._folders, _ = self._full_sync()
 
+        self._update_folders_trie(self._folders)
         return MetadataFilter(key=PangeaMetadataKeys.DROPBOX_PATH, value=self._folders, operator=FilterOperator.IN)
 
+    def _update_folders_trie(self, folders: Iterable[str]) -> PathPrefixTrie:
+        """Patches the folders trie with the folders added and removed since the last call."""
+
+        folders_set = {folder.lower() for folder in folders}
+        if self._folders_trie is None:
+            self._folders_trie = PathPrefixTrie()
+
+        for folder in self._trie_folders - folders_set:
+            self._folders_trie.remove(folder)
+        for folder in folders_set - self._trie_folders:
+            self._folders_trie.add(folder)
+
+        self._trie_folders = folders_set
+        return self._folders_trie
+
+    def _full_sync(self) -> Tuple[List[str], Optional[str]]:
+        shared_folders = self._list_shared_folders()
+        folders = {value: True for value in shared_folders}
+        cursors: dict[str, Optional[str]] = {}
+
+        for folder in shared_folders:
+            subfolders, cursors[folder] = self._client.list_subfolders_with_cursor(self._token, folder)
+            folders.update({value: True for value in subfolders})
+
+        self._access_cache.set_many(PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, folders)
+        # A folder listing failed, so later changes could not be requested from it
+        if None in cursors.values():
+            return list(folders.keys()), None
+
+        return list(folders.keys()), json.dumps(cursors)
+
+    def _delta_sync(self, cursor: str) -> Optional[AclDelta]:
+        cursors: dict[str, str] = json.loads(cursor)
+        shared_folders = self._list_shared_folders()
+        # Sharing changes are not reported by folder listings, so the allow-list is rebuilt
+        if set(shared_folders) != set(cursors.keys()):
+            return None
+
+        added: List[str] = []
+        removed: List[str] = []
+        new_cursors: dict[str, str] = {}
+        for folder, folder_cursor in cursors.items():
+            subfolders, deleted, new_cursor = self._client.list_subfolder_changes(self._token, folder_cursor)
+            if new_cursor is None:
+                return None
+
+            added.extend(subfolders)
+            removed.extend(deleted)
+            new_cursors[folder] = new_cursor
+
+        self._access_cache.set_many(
+            PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, {v: True for v in added}
+        )
+        for path in removed:
+            self._access_cache.delete(PangeaMetadataValues.DATA_SOURCE_DROPBOX, self._user_email, path)
+
+        return AclDelta(added=added, removed=removed, cursor=json.dumps(new_cursors))
+
+    def _list_shared_folders(self) -> List[str]:
+        if self._acl_index is not None:
+            folders = self._acl_index.get_user_folders(self._user_email)
+            if folders is not None:
+                return folders
+
+        return self._client.list_shared_folders(self._token, self._user_email)
+
     def _is_authorized(self, node: T) -> bool:
         metadata = self.get_node_metadata(node)
         return metadata[
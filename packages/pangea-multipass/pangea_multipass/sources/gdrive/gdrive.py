@@ -2,12 +2,20 @@
 # Author: Pangea Cyber Corporation
 
 import enum
-from typing import Any, Callable, Generic, List, Optional
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Iterable, List, Optional, Sequence, Tuple
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
 
+from pangea_multipass.acl_snapshot import AclDelta, AclSnapshotStore
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     FilterOperator,
     MetadataEnricher,
@@ -17,6 +25,7 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.utils import batched
 
 
 class GDriveME(MetadataEnricher):
@@ -30,6 +39,7 @@ class GDriveME(MetadataEnricher):
         _files (dict): Cached file metadata from Google Drive.
         _fields (dict): Mappings of FileField attributes to metadata keys.
         _fields_param (str): Parameter for specifying fields to retrieve in Google Drive API requests.
+        _file_fields_param (str): Fields to retrieve when requesting a single file.
     """
 
     class FileField(str, enum.Enum):
@@ -53,6 +63,7 @@ class GDriveME(MetadataEnricher):
     _files: dict[str, dict[str, Any]]
     _fields: dict[FileField, str]
     _fields_param: str
+    _file_fields_param: str
 
     def __init__(self, creds: Credentials, fields: dict[FileField, str]):
         # TODO: Add authz instance to upload permission tuples
@@ -115,6 +126,48 @@ class GDriveME(MetadataEnricher):
 
         return metadata
 
+    def prepare(self, documents: Sequence[Any]) -> None:
+        """Fetch the Google Drive metadata of the files of the documents, and of their parent folders.
+
+        Files are requested in batch requests, so only the files being enriched are fetched instead of listing every
+        file of the drive.
+
+        Args:
+            documents (Sequence[Any]): Documents that will be enriched.
+        """
+
+        if not self._fields:
+            return
+
+        ids = [self._get_id_from_metadata(doc.metadata) for doc in documents]
+        self._fetch_files([id for id in ids if id and id not in self._files])
+
+        if GDriveME.FileField.PARENT in self._fields:
+            parents = [
+                self._files[id][GDriveME.FileField.PARENT][0]
+                for id in ids
+                if self._files.get(id, {}).get(GDriveME.FileField.PARENT)
+            ]
+            self._fetch_files([id for id in parents if id not in self._files])
+
+    def _fetch_files(self, file_ids: List[str]) -> None:
+        if not file_ids:
+            return
+
+        service = GDriveAPI.get_service(self._creds)
+
+        def callback(file_id: str, response: Optional[dict[str, Any]], exception: Optional[Exception]) -> None:
+            # Files that could not be requested are left out, as when listing the drive
+            if exception is None and response:
+                self._files[file_id] = response
+
+        GDriveAPI._execute_batches(
+            service,
+            file_ids,
+            lambda file_id: service.files().get(fileId=file_id, fields=self._file_fields_param, supportsAllDrives=True),
+            callback,
+        )
+
     def _get_id_from_metadata(self, metadata: dict[str, Any]) -> str:
         # Llama index "file_id" key
         value = metadata.get("file id", "")
@@ -155,6 +208,7 @@ class GDriveME(MetadataEnricher):
     ) -> None:
         if not self._fields:
             self._fields_param = "nextPageToken, files(id)"
+            self._file_fields_param = "id"
             return
 
         keys = "id, name"
@@ -162,11 +216,12 @@ class GDriveME(MetadataEnricher):
             keys = f"{keys}, {k}"
 
         self._fields_param = f"nextPageToken, files({keys})"
+        self._file_fields_param = keys
 
     # Get all the files belonging to the user (only top 10 for this example)
     def _getGDrivePermissions(self) -> None:
         # Create the Google Drive API service
-        service = build("drive", "v3", credentials=self._creds)
+        service = GDriveAPI.get_service(self._creds)
 
         # Check if I need folders or not (would be a minor improvement)
         # query = "mimeType != 'application/vnd.google-apps.folder'"  # Query to search all files (exclude folders)
@@ -185,7 +240,7 @@ class GDriveME(MetadataEnricher):
                 pageSize=page_size,
                 fields=self._fields_param,
             )
-            .execute()
+            .execute(num_retries=GDriveAPI._NUM_RETRIES)
         )
 
         while True:
@@ -211,7 +266,7 @@ class GDriveME(MetadataEnricher):
                     pageSize=page_size,
                     fields=self._fields_param,
                 )
-                .execute()
+                .execute(num_retries=GDriveAPI._NUM_RETRIES)
             )
 
         self._files = files_dict
@@ -223,26 +278,40 @@ class GDriveProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     Filters documents based on access permissions for Google Drive files.
 
     Attributes:
-        files_access_cache (dict[str, bool]): Cache storing access status for file IDs.
         creds (Credentials): Google API credentials.
         files_ids (List[str]): List of accessible Google Drive file IDs.
         get_node_metadata (Callable): Function to retrieve metadata for nodes.
         user_email (Optional[str]): User email to check access to files.
+        user_groups (List[str]): Emails of the groups the user belongs to, to honor permissions granted to groups.
+        _cache (AuthorizationCache): Cache storing access status for file IDs.
+        _snapshots (Optional[AclSnapshotStore]): Store to refresh `get_filter()` file IDs incrementally.
     """
 
-    files_access_cache: dict[str, bool] = {}
+    _data_source = PangeaMetadataValues.DATA_SOURCE_GDRIVE
     creds: Credentials
     files_ids: List[str] = []
     get_node_metadata: Callable[[T], dict[str, Any]]
     _user_email: Optional[str]
+    user_groups: List[str]
+    _cache: AuthorizationCache
+    _snapshots: Optional[AclSnapshotStore]
 
     def __init__(
-        self, creds: Credentials, get_node_metadata: Callable[[T], dict[str, Any]], user_email: Optional[str] = None
+        self,
+        creds: Credentials,
+        get_node_metadata: Callable[[T], dict[str, Any]],
+        user_email: Optional[str] = None,
+        cache: Optional[AuthorizationCache] = None,
+        snapshot_store: Optional[AclSnapshotStore] = None,
+        user_groups: Optional[List[str]] = None,
     ):
         super().__init__()
         self.creds = creds
         self.get_node_metadata = get_node_metadata
         self._user_email = user_email
+        self.user_groups = user_groups if user_groups is not None else []
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
+        self._snapshots = snapshot_store
 
     def filter(
         self,
@@ -250,6 +319,8 @@ class GDriveProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     ) -> List[T]:
         """Filter nodes by access permissions.
 
+        Access to every file not cached yet is requested in batches before filtering.
+
         Args:
             nodes (List[T]): List of nodes to process.
 
@@ -257,22 +328,38 @@ class GDriveProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
             List[T]: Nodes that are authorized.
         """
 
-        filtered: List[T] = []
+        gdrive_nodes: List[T] = []
+        file_ids: List[str] = []
         for node in nodes:
-            if self._is_authorized(node):
-                filtered.append(node)
-        return filtered
+            metadata = self.get_node_metadata(node)
+            if metadata[PangeaMetadataKeys.DATA_SOURCE] != PangeaMetadataValues.DATA_SOURCE_GDRIVE:
+                continue
+
+            gdrive_nodes.append(node)
+            file_ids.append(self._get_file_id(metadata))
+
+        access = self._load_access(file_ids)
+        return [node for node, id in zip(gdrive_nodes, file_ids) if access.get(id, False)]
 
     def get_filter(
         self,
     ) -> MetadataFilter:
         """Generate a filter for processing Google Drive file IDs.
 
+        If a snapshot store is set, file IDs are refreshed on every call requesting only Drive changes.
+
         Returns:
             MetadataFilter: A filter based on accessible file IDs.
         """
 
-        if not self.files_ids:
+        if self._snapshots is not None:
+            self.files_ids = self._snapshots.sync(
+                PangeaMetadataValues.DATA_SOURCE_GDRIVE,
+                credential_fingerprint(self.creds.client_id, self.creds.refresh_token or self.creds.token),
+                self._full_sync,
+                self._delta_sync,
+            )
+        elif not self.files_ids:
             self.files_ids = GDriveAPI.list_all_file_ids(self.creds)
 
         return MetadataFilter(key=PangeaMetadataKeys.GDRIVE_FILE_ID, value=self.files_ids, operator=FilterOperator.IN)
@@ -284,25 +371,60 @@ class GDriveProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         )
 
     def _has_access(self, metadata: dict[str, Any]) -> bool:
+        id = self._get_file_id(metadata)
+        return self._load_access([id]).get(id, False)
+
+    def _get_file_id(self, metadata: dict[str, Any]) -> str:
         id = metadata.get(PangeaMetadataKeys.GDRIVE_FILE_ID, None)
         if not id:
             raise KeyError("Invalid metadata key")
 
-        access = self.files_access_cache.get(id, None)
-        if access is not None:
+        return str(id)
+
+    def _load_access(self, file_ids: Sequence[str]) -> dict[str, bool]:
+        """Returns the access to the given files, requesting in batches the ones that are not cached yet."""
+
+        principal = self._get_principal()
+        access: dict[str, bool] = self._cache.get_many(PangeaMetadataValues.DATA_SOURCE_GDRIVE, principal, file_ids)
+        pending = [id for id in dict.fromkeys(file_ids) if id not in access]
+        if not pending:
             return access
 
+        service = GDriveAPI.get_service(self.creds)
         # If user email is set, we could use it to search among the file permissions (using the admin token)
         if self._user_email:
-            access_level = GDriveAPI.check_user_access(self.creds, id, self._user_email)
-            access = access_level is not None
+            levels = GDriveAPI.check_users_access(
+                self.creds, pending, self._user_email, user_groups=self.user_groups, service=service
+            )
+            new_access = {id: level is not None for id, level in levels.items()}
         else:
             # If user email is not set, we only request the file info to see if current credentials has access to it.
-            access = GDriveAPI.check_file_access(self.creds, id)
+            new_access = GDriveAPI.batch_check_file_access(self.creds, pending, service=service)
 
-        self.files_access_cache[id] = access
+        self._cache.set_many(PangeaMetadataValues.DATA_SOURCE_GDRIVE, principal, new_access)
+        access.update(new_access)
         return access
 
+    def _full_sync(self) -> Tuple[List[str], Optional[str]]:
+        # Request the token first so changes made while listing are not missed
+        page_token = GDriveAPI.get_changes_start_page_token(self.creds)
+        return GDriveAPI.list_all_file_ids(self.creds), page_token
+
+    def _delta_sync(self, page_token: str) -> AclDelta:
+        added, removed, new_page_token = GDriveAPI.list_file_changes(self.creds, page_token)
+        return AclDelta(added=added, removed=removed, cursor=new_page_token)
+
+    def _get_principal(self) -> str:
+        if self._user_email:
+            if not self.user_groups:
+                return self._user_email
+
+            # Groups grant access too, so decisions are not shared with processors of the same user with other groups
+            groups = sorted(dict.fromkeys(group.lower() for group in self.user_groups))
+            return f"{self._user_email}:groups:{credential_fingerprint(*groups)}"
+
+        return credential_fingerprint(self.creds.client_id, self.creds.refresh_token or self.creds.token)
+
 
 class GDriveAPI:
     _SCOPES = [
@@ -314,6 +436,59 @@ class GDriveAPI:
 
     _user_token_filepath: str = "gdrive_access_token.json"
 
+    _NUM_RETRIES = 5
+    """Retries with exponential backoff of requests failing with rate limit (429) or server errors."""
+
+    _BATCH_SIZE = 100
+    """Max number of sub-requests allowed by Google API batch requests."""
+
+    _PERMISSIONS_FIELDS = "permissions(type, role, emailAddress, domain)"
+
+    _ROLES = {"reader": 1, "commenter": 2, "writer": 3, "fileOrganizer": 4, "organizer": 5, "owner": 6}
+
+    _services = threading.local()
+    """Services built on each thread. `httplib2` transports are not thread-safe."""
+
+    _MAX_SERVICES_PER_THREAD = 32
+
+    @staticmethod
+    def get_service(creds: Credentials, service_name: str = "drive", version: str = "v3") -> Any:
+        """
+        Returns a Google API service, reusing the one built before for the same credentials on the current thread.
+
+        Services are built from the discovery documents bundled with `google-api-python-client`, so no request is
+        made to the discovery endpoint. Each thread gets its own service and HTTP transport.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object.
+            service_name (str): Name of the API.
+            version (str): Version of the API.
+
+        Returns:
+            Any: The service object.
+        """
+
+        services: Optional[OrderedDict[Tuple[int, str, str], Tuple[Credentials, Any]]] = getattr(
+            GDriveAPI._services, "services", None
+        )
+        if services is None:
+            services = OrderedDict()
+            GDriveAPI._services.services = services
+
+        key = (id(creds), service_name, version)
+        entry = services.get(key, None)
+        # Services keep their credentials alive, so the ID is only reused once the entry was evicted
+        if entry is not None and entry[0] is creds:
+            services.move_to_end(key)
+            return entry[1]
+
+        service = build(service_name, version, credentials=creds, static_discovery=True, cache_discovery=False)
+        services[key] = (creds, service)
+        while len(services) > GDriveAPI._MAX_SERVICES_PER_THREAD:
+            services.popitem(last=False)
+
+        return service
+
     @staticmethod
     def get_and_save_access_token(credentials_filepath: str, token_filepath: str, scopes: List[str]) -> None:
         """
@@ -345,8 +520,8 @@ class GDriveAPI:
             dict: A dictionary containing user profile information.
         """
 
-        service = build("oauth2", "v2", credentials=creds)
-        user_info = service.userinfo().get().execute()
+        service = GDriveAPI.get_service(creds, "oauth2", "v2")
+        user_info = service.userinfo().get().execute(num_retries=GDriveAPI._NUM_RETRIES)
         return user_info
 
     @staticmethod
@@ -384,9 +559,9 @@ class GDriveAPI:
             bool: `True` if the user has access, `False` otherwise.
         """
 
-        service = build("drive", "v3", credentials=creds)
+        service = GDriveAPI.get_service(creds)
         try:
-            service.files().get(fileId=file_id, fields="id, name").execute()
+            service.files().get(fileId=file_id, fields="id, name").execute(num_retries=GDriveAPI._NUM_RETRIES)
             return True
         except:
             return False
@@ -403,7 +578,7 @@ class GDriveAPI:
             List[str]: A list of file IDs accessible by the user.
         """
 
-        service = build("drive", "v3", credentials=creds)
+        service = GDriveAPI.get_service(creds)
         file_ids = []
         page_token = None
 
@@ -413,7 +588,7 @@ class GDriveAPI:
                 response = (
                     service.files()
                     .list(q="trashed=false", fields="nextPageToken, files(id)", pageToken=page_token)
-                    .execute()
+                    .execute(num_retries=GDriveAPI._NUM_RETRIES)
                 )
 
                 # Collect the file IDs
@@ -431,20 +606,286 @@ class GDriveAPI:
         return file_ids
 
     @staticmethod
-    def check_user_access(creds: Credentials, file_id: str, user_email: str) -> Optional[str]:
+    def get_changes_start_page_token(creds: Credentials) -> str:
+        """
+        Retrieves the page token to list the changes made from now on.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object.
+
+        Returns:
+            str: Page token to use in `list_file_changes`.
+        """
+
+        service = GDriveAPI.get_service(creds)
+        response = service.changes().getStartPageToken().execute(num_retries=GDriveAPI._NUM_RETRIES)
+        return str(response["startPageToken"])
+
+    @staticmethod
+    def list_file_changes(creds: Credentials, page_token: str) -> Tuple[List[str], List[str], str]:
+        """
+        Lists the files changed for the authenticated user since a page token.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object.
+            page_token (str): Token returned by `get_changes_start_page_token` or by a previous call.
+
+        Returns:
+            Tuple[List[str], List[str], str]: IDs of the files now accessible, IDs of the files removed, trashed or
+            no longer accessible, and the page token to request the next changes.
+        """
+
+        service = GDriveAPI.get_service(creds)
+        added: List[str] = []
+        removed: List[str] = []
+        token: Optional[str] = page_token
+
+        while token is not None:
+            response = (
+                service.changes()
+                .list(
+                    pageToken=token,
+                    spaces="drive",
+                    includeRemoved=True,
+                    fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(trashed))",
+                )
+                .execute(num_retries=GDriveAPI._NUM_RETRIES)
+            )
+
+            for change in response.get("changes", []):
+                file_id = change.get("fileId", None)
+                if not file_id:
+                    continue
+
+                if change.get("removed", False) or change.get("file", {}).get("trashed", False):
+                    removed.append(file_id)
+                else:
+                    added.append(file_id)
+
+            new_start_page_token = response.get("newStartPageToken", None)
+            if new_start_page_token is not None:
+                return added, removed, str(new_start_page_token)
+
+            token = response.get("nextPageToken", None)
+
+        return added, removed, page_token
+
+    @staticmethod
+    def check_user_access(
+        creds: Credentials, file_id: str, user_email: str, user_groups: Optional[Iterable[str]] = None
+    ) -> Optional[str]:
         """
         Check if a specific user has access to a Google Drive file.
 
         :return: Access level (e.g., "owner", "writer", "reader") or None if no access.
         """
 
-        service = build("drive", "v3", credentials=creds)
+        service = GDriveAPI.get_service(creds)
         try:
             # List the file's permissions
-            permissions = service.permissions().list(fileId=file_id, fields="permissions").execute()
-            for permission in permissions.get("permissions", []):
-                if permission.get("emailAddress") == user_email:
-                    return str(permission.get("role"))  # e.g., "owner", "writer", "reader"
-            return None
+            permissions = (
+                service.permissions()
+                .list(fileId=file_id, fields=GDriveAPI._PERMISSIONS_FIELDS, supportsAllDrives=True)
+                .execute(num_retries=GDriveAPI._NUM_RETRIES)
+            )
+            return GDriveAPI.get_access_level(permissions.get("permissions", []), user_email, user_groups)
         except Exception:
             return None
+
+    @staticmethod
+    def check_users_access(
+        creds: Credentials,
+        file_ids: Sequence[str],
+        user_email: str,
+        user_groups: Optional[Iterable[str]] = None,
+        service: Optional[Any] = None,
+    ) -> dict[str, Optional[str]]:
+        """
+        Check if a specific user has access to several Google Drive files, using batch requests.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object. Must be able to read the files permissions.
+            file_ids (Sequence[str]): IDs of the files to check.
+            user_email (str): Email of the user.
+            user_groups (Optional[Iterable[str]]): Emails of the groups the user belongs to.
+            service (Optional[Any]): Drive service to reuse. Built from `creds` if not set.
+
+        Returns:
+            dict[str, Optional[str]]: Access level of the user (e.g., "owner", "writer", "reader") or `None` if no
+            access, by file ID. Files whose permissions could not be requested because of a transient error are
+            left out.
+        """
+
+        if service is None:
+            service = GDriveAPI.get_service(creds)
+
+        groups = list(user_groups) if user_groups is not None else []
+        levels: dict[str, Optional[str]] = {}
+
+        def callback(file_id: str, response: Optional[dict[str, Any]], exception: Optional[Exception]) -> None:
+            if exception is not None:
+                levels[file_id] = None
+                return
+
+            levels[file_id] = GDriveAPI.get_access_level((response or {}).get("permissions", []), user_email, groups)
+
+        GDriveAPI._execute_batches(
+            service,
+            file_ids,
+            lambda file_id: service.permissions().list(
+                fileId=file_id, fields=GDriveAPI._PERMISSIONS_FIELDS, supportsAllDrives=True
+            ),
+            callback,
+        )
+        return levels
+
+    @staticmethod
+    def batch_check_file_access(
+        creds: Credentials, file_ids: Sequence[str], service: Optional[Any] = None
+    ) -> dict[str, bool]:
+        """
+        Checks if the authenticated user has access to several Google Drive files, using batch requests.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object.
+            file_ids (Sequence[str]): IDs of the files to check.
+            service (Optional[Any]): Drive service to reuse. Built from `creds` if not set.
+
+        Returns:
+            dict[str, bool]: Access by file ID. Files that could not be requested because of a transient error are
+            left out.
+        """
+
+        if service is None:
+            service = GDriveAPI.get_service(creds)
+
+        access: dict[str, bool] = {}
+
+        def callback(file_id: str, response: Optional[dict[str, Any]], exception: Optional[Exception]) -> None:
+            access[file_id] = exception is None
+
+        GDriveAPI._execute_batches(
+            service,
+            file_ids,
+            lambda file_id: service.files().get(fileId=file_id, fields="id", supportsAllDrives=True),
+            callback,
+        )
+        return access
+
+    @staticmethod
+    def get_access_level(
+        permissions: List[dict[str, Any]], user_email: str, user_groups: Optional[Iterable[str]] = None
+    ) -> Optional[str]:
+        """
+        Resolves the access level of a user from a file permissions.
+
+        Permissions granted to the user, to any of their groups, to their domain or to anyone are honored.
+
+        Args:
+            permissions (List[dict[str, Any]]): File permissions, as returned by the Drive API.
+            user_email (str): Email of the user.
+            user_groups (Optional[Iterable[str]]): Emails of the groups the user belongs to.
+
+        Returns:
+            Optional[str]: Highest access level (e.g., "owner", "writer", "reader") or `None` if no access.
+        """
+
+        email = user_email.lower()
+        domain = email.rsplit("@", 1)[-1]
+        groups = {group.lower() for group in user_groups} if user_groups is not None else set()
+        best: Optional[str] = None
+
+        for permission in permissions:
+            permission_type = permission.get("type", None)
+            address = permission.get("emailAddress", "").lower()
+            if (
+                (permission_type == "user" and address == email)
+                or (permission_type == "group" and address in groups)
+                or (permission_type == "domain" and permission.get("domain", "").lower() == domain)
+                or permission_type == "anyone"
+            ):
+                role = str(permission.get("role"))
+                if best is None or GDriveAPI._ROLES.get(role, 0) > GDriveAPI._ROLES.get(best, 0):
+                    best = role
+
+        return best
+
+    @staticmethod
+    def get_user_groups(creds: Credentials, user_email: str) -> List[str]:
+        """
+        Lists the emails of the groups a user belongs to, using the Admin SDK Directory API.
+
+        Credentials need the `https://www.googleapis.com/auth/admin.directory.group.readonly` scope.
+
+        Args:
+            creds (Credentials): The OAuth2 credentials object.
+            user_email (str): Email of the user.
+
+        Returns:
+            List[str]: Emails of the groups.
+
+        Raises:
+            HttpError: If the groups could not be requested, so access granted to groups is not silently denied.
+        """
+
+        groups: List[str] = []
+        page_token = None
+        service = GDriveAPI.get_service(creds, "admin", "directory_v1")
+        while True:
+            response = (
+                service.groups()
+                .list(userKey=user_email, pageToken=page_token)
+                .execute(num_retries=GDriveAPI._NUM_RETRIES)
+            )
+            groups.extend(group["email"] for group in response.get("groups", []) if "email" in group)
+            page_token = response.get("nextPageToken", None)
+            if page_token is None:
+                break
+
+        return groups
+
+    @staticmethod
+    def _execute_batches(
+        service: Any,
+        file_ids: Sequence[str],
+        new_request: Callable[[str], Any],
+        callback: Callable[[str, Optional[dict[str, Any]], Optional[Exception]], None],
+    ) -> None:
+        """Sends one request per file in batch requests. Requests failing with a transient error, alone or because
+        the whole batch request failed, are retried with jittered exponential backoff, and left out of the callback
+        if they still fail."""
+
+        pending = list(dict.fromkeys(file_ids))
+        for attempt in range(GDriveAPI._NUM_RETRIES + 1):
+            retry: List[str] = []
+            done: set[str] = set()
+
+            def batch_callback(file_id: str, response: Optional[dict[str, Any]], exception: Optional[Exception]):
+                done.add(file_id)
+                if exception is not None and GDriveAPI._is_transient_error(exception):
+                    retry.append(file_id)
+                else:
+                    callback(file_id, response, exception)
+
+            for chunk in batched(pending, GDriveAPI._BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=batch_callback)
+                for file_id in chunk:
+                    batch.add(new_request(file_id), request_id=file_id)
+
+                try:
+                    batch.execute()
+                except Exception as e:
+                    if not GDriveAPI._is_transient_error(e) and not isinstance(e, (OSError, HttpLib2Error)):
+                        raise
+
+                    retry.extend(file_id for file_id in chunk if file_id not in done)
+
+            if not retry or attempt == GDriveAPI._NUM_RETRIES:
+                return
+
+            pending = retry
+            time.sleep(random.uniform(0, 2**attempt))
+
+    @staticmethod
+    def _is_transient_error(exception: Exception) -> bool:
+        return isinstance(exception, HttpError) and (exception.resp.status == 429 or exception.resp.status >= 500)
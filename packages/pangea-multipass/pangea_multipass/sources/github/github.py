@@ -1,9 +1,13 @@
 import json
 import logging
-from typing import Any, Callable, Generic, List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Generic, List, Optional, Tuple
+from urllib.parse import quote
 
 import requests
 
+from pangea_multipass.acl_snapshot import AclDelta, AclSnapshotStore
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     FilterOperator,
     MetadataFilter,
@@ -12,13 +16,39 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.transport import HttpTransport, get_default_transport
+from pangea_multipass.utils import batched
 
 
 class GitHubClient:
     _actor = "github_client"
 
-    def __init__(self, logger_name: str = "multipass"):
+    GRAPHQL_URL = "https://api.github.com/graphql"
+
+    _GRAPHQL_PAGE_SIZE = 100
+    _GRAPHQL_REPOS_PER_QUERY = 50
+
+    _VIEWER_REPOS_QUERY = """
+        query($cursor: String, $login: String!, $withCollaborators: Boolean!) {
+          viewer {
+            repositories(
+              first: 100, after: $cursor, affiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+            ) {
+              pageInfo { hasNextPage endCursor }
+              nodes {
+                name
+                owner { login }
+                viewerPermission
+                collaborators(login: $login, first: 1) @include(if: $withCollaborators) { totalCount }
+              }
+            }
+          }
+        }
+    """
+
+    def __init__(self, logger_name: str = "multipass", transport: Optional[HttpTransport] = None):
         self.logger = logging.getLogger(logger_name)
+        self._transport = transport if transport is not None else get_default_transport()
 
     def get_auth_headers(self, token: str) -> dict[str, str]:
         """Authenticate to GitHub using a personal access token."""
@@ -36,7 +66,7 @@ class GitHubClient:
 
         headers = self.get_auth_headers(token)
         url = f"https://api.github.com/repos/{owner}/{repo_name}"
-        response = requests.get(url, headers=headers)
+        response = self._transport.get(url, headers=headers, conditional=True)
 
         if response.status_code == 200:
             access = True  # User has access
@@ -57,7 +87,7 @@ class GitHubClient:
         """
         headers = self.get_auth_headers(admin_token)
         url = f"https://api.github.com/repos/{owner}/{repo_name}/collaborators/{username}"
-        response = requests.get(url, headers=headers)
+        response = self._transport.get(url, headers=headers, conditional=True)
 
         if response.status_code == 204:
             return True
@@ -70,8 +100,13 @@ class GitHubClient:
             self._log_error("user_has_access", url, {}, response)
             raise Exception(f"Unexpected error: {response.status_code} - {response.json()}")
 
-    def get_user_repos(self, token: str) -> List[dict[str, Any]]:
-        """Get all repositories the authenticated user has access to."""
+    def get_user_repos(self, token: str, since: Optional[str] = None) -> List[dict[str, Any]]:
+        """Get all repositories the authenticated user has access to.
+
+        Args:
+            token (str): GitHub access token.
+            since (Optional[str]): ISO 8601 timestamp. If set, only repositories updated after it are returned.
+        """
 
         headers = self.get_auth_headers(token)
         url = "https://api.github.com/user/repos"
@@ -79,9 +114,13 @@ class GitHubClient:
         page = 1
 
         while True:
-            response = requests.get(url, headers=headers, params={"per_page": 100, "page": page})
+            params: dict[str, Any] = {"per_page": 100, "page": page}
+            if since is not None:
+                params["since"] = since
+
+            response = self._transport.get(url, headers=headers, params=params, conditional=True)
             if response.status_code != 200:
-                self._log_error("get_user_repos", url, {"per_page": 100, "page": page}, response)
+                self._log_error("get_user_repos", url, params, response)
                 raise Exception(f"Error fetching repositories: {response.json()}")
 
             data = response.json()
@@ -99,7 +138,7 @@ class GitHubClient:
         headers = self.get_auth_headers(token)
 
         url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/main?recursive=1"
-        response = requests.get(url, headers=headers)
+        response = self._transport.get(url, headers=headers, conditional=True)
 
         if response.status_code == 200:
             tree_data = response.json()
@@ -112,17 +151,152 @@ class GitHubClient:
             raise Exception(f"Error fetching files for repository '{repo}': {response.json()}")
 
     def download_file_content(self, token: str, url: str) -> str:
-        """Download the content of a file from GitHub."""
+        """Download the content of a file from GitHub, decoded as text with `decode_content`."""
 
-        headers = self.get_auth_headers(token)
+        # Request the raw file instead of the JSON blob object with base64 content
+        headers = {**self.get_auth_headers(token), "Accept": "application/vnd.github.raw+json"}
 
-        response = requests.get(url, headers=headers)
+        response = self._transport.get(url, headers=headers, conditional=True)
         if response.status_code == 200:
-            return str(response.content)
+            return GitHubClient.decode_content(response.content)
         else:
             self._log_error("download_file_content", url, {}, response)
             raise Exception(f"Error downloading file: {response.json()}")
 
+    @staticmethod
+    def decode_content(content: bytes) -> str:
+        """Decode the content of a file as UTF-8 text. Invalid bytes are replaced, so binary files do not fail."""
+        return content.decode("utf-8", errors="replace")
+
+    def download_repo_archive(self, token: str, owner: str, repo: str, ref: Optional[str] = None) -> requests.Response:
+        """Request the tarball of a repository. The response is streamed and must be closed by the caller.
+
+        Args:
+            token (str): GitHub access token.
+            owner (str): Repository owner.
+            repo (str): Repository name.
+            ref (Optional[str]): Branch, tag or commit. Defaults to the repository default branch.
+        """
+
+        url = f"https://api.github.com/repos/{owner}/{repo}/tarball"
+        if ref:
+            url = f"{url}/{quote(ref, safe='')}"
+
+        response = self._transport.get(url, headers=self.get_auth_headers(token), stream=True)
+        if response.status_code != 200:
+            self._log_error("download_repo_archive", url, {}, response)
+            response.close()
+            raise Exception(f"Error downloading archive for repository '{repo}': {response.status_code}")
+
+        return response
+
+    def graphql(self, token: str, query: str, variables: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """Run a GraphQL query and return its data. Partial errors are logged and the partial data returned."""
+
+        url = GitHubClient.GRAPHQL_URL
+        body = {"query": query, "variables": variables or {}}
+        response = self._transport.post(url, headers=self.get_auth_headers(token), json=body)
+        if response.status_code != 200:
+            self._log_error("graphql", url, variables or {}, response)
+            raise Exception(f"Error running GraphQL query: {response.status_code} - {response.text}")
+
+        result = response.json()
+        data = result.get("data", None)
+        errors = result.get("errors", None)
+        if errors:
+            self.logger.debug(json.dumps({"actor": GitHubClient._actor, "fn": "graphql", "errors": errors}))
+        if data is None:
+            self._log_error("graphql", url, variables or {}, response)
+            raise Exception(f"Error running GraphQL query: {errors}")
+
+        return data
+
+    def get_repos_access(self, token: str, username: Optional[str] = None) -> dict[Tuple[str, str], bool]:
+        """
+        Resolve the access to every repository the token has access to, 100 repositories per GraphQL request.
+
+        Args:
+            token (str): GitHub access token. To check the access of a user it needs push access to the repositories.
+            username (Optional[str]): User to check. If not set, the access of the token owner is returned.
+
+        Returns:
+            dict[Tuple[str, str], bool]: Access by repository owner and name.
+        """
+
+        access: dict[Tuple[str, str], bool] = {}
+        unresolved: List[Tuple[str, str]] = []
+        cursor: Optional[str] = None
+        while True:
+            variables = {"cursor": cursor, "login": username or "", "withCollaborators": bool(username)}
+            data = self.graphql(token, GitHubClient._VIEWER_REPOS_QUERY, variables)
+            repositories = data["viewer"]["repositories"]
+            for repo in repositories.get("nodes", None) or []:
+                key = (repo["owner"]["login"], repo["name"])
+                if not username:
+                    access[key] = True
+                elif repo.get("collaborators", None) is None:
+                    # Collaborators could not be listed for this repository
+                    unresolved.append(key)
+                else:
+                    access[key] = repo["collaborators"]["totalCount"] > 0
+
+            page_info = repositories["pageInfo"]
+            if not page_info["hasNextPage"]:
+                break
+            cursor = page_info["endCursor"]
+
+        for owner, repo_name in unresolved:
+            access[(owner, repo_name)] = self.user_has_access(token, owner, repo_name, username or "")
+
+        return access
+
+    def check_repos_access(
+        self, token: str, repos: List[Tuple[str, str]], username: Optional[str] = None
+    ) -> dict[Tuple[str, str], bool]:
+        """
+        Check the access to several repositories, 50 repositories per GraphQL request.
+
+        Args:
+            token (str): GitHub access token. To check the access of a user it needs push access to the repositories.
+            repos (List[Tuple[str, str]]): Owner and name of the repositories to check.
+            username (Optional[str]): User to check. If not set, the access of the token owner is checked.
+
+        Returns:
+            dict[Tuple[str, str], bool]: Access by repository owner and name.
+        """
+
+        access: dict[Tuple[str, str], bool] = {}
+        unresolved: List[Tuple[str, str]] = []
+        for chunk in batched(list(dict.fromkeys(repos)), GitHubClient._GRAPHQL_REPOS_PER_QUERY):
+            fields = "viewerPermission"
+            if username:
+                fields = f"{fields} collaborators(login: $login, first: 1) {{ totalCount }}"
+
+            aliases = [
+                f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {fields} }}"
+                for i, (owner, name) in enumerate(chunk)
+            ]
+            header = "query($login: String!)" if username else "query"
+            query = f"{header} {{ {' '.join(aliases)} }}"
+            data = self.graphql(token, query, {"login": username} if username else {})
+
+            for i, key in enumerate(chunk):
+                repo = data.get(f"r{i}", None)
+                if repo is None:
+                    # Repository not found or not visible to the token
+                    access[key] = False
+                elif not username:
+                    access[key] = True
+                elif repo.get("collaborators", None) is None:
+                    unresolved.append(key)
+                else:
+                    access[key] = repo["collaborators"]["totalCount"] > 0
+
+        for owner, repo_name in unresolved:
+            access[(owner, repo_name)] = self.user_has_access(token, owner, repo_name, username or "")
+
+        return access
+
     def get_allowed_repos(self, token: str, username: str) -> List[dict]:
         projects = self.get_user_repos(token)
         user_projects = []
@@ -150,10 +324,20 @@ class GitHubClient:
 
 
 class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
-    _access_cache: dict[Tuple[str, str], bool] = {}
+    _SYNC_OVERLAP = timedelta(minutes=5)
+    """Margin added to incremental syncs so repositories updated during the previous sync are not missed."""
+
+    _FULL_SYNC_INTERVAL = 3600
+    """Default `full_sync_interval`. Shorter than other sources, as adding a collaborator does not update the
+    repository, so incremental syncs could not see new grants."""
+
+    _data_source = PangeaMetadataValues.DATA_SOURCE_GITHUB
+    _access_cache: AuthorizationCache
     _token: str
     _repos: List[Tuple[str, str]] = []
     _username: str
+    _snapshots: Optional[AclSnapshotStore]
+    _full_sync_interval: float
 
     def __init__(
         self,
@@ -161,13 +345,22 @@ class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         get_node_metadata: Callable[[T], dict[str, Any]],
         username: str,
         logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[AuthorizationCache] = None,
+        snapshot_store: Optional[AclSnapshotStore] = None,
+        full_sync_interval: Optional[float] = None,
     ):
         super().__init__()
         self._token = token
-        self._access_cache = {}
+        self._repos = []
+        self._snapshots = snapshot_store
+        self._full_sync_interval = (
+            full_sync_interval if full_sync_interval is not None else GitHubProcessor._FULL_SYNC_INTERVAL
+        )
+        self._access_cache = cache if cache is not None else InMemoryAuthorizationCache()
         self.get_node_metadata = get_node_metadata
         self._username = username
-        self._client = GitHubClient(logger_name)
+        self._client = GitHubClient(logger_name, transport=transport)
 
     def filter(
         self,
@@ -175,6 +368,8 @@ class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     ) -> List[T]:
         """Filter GitHub files by access permissions.
 
+        Access to every repository not cached yet is requested in bulk with GraphQL before filtering.
+
         Args:
             nodes (List[T]): List of nodes to process.
 
@@ -182,31 +377,44 @@ class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
             List[Any]: Nodes that have authorized access.
         """
 
-        filtered: List[T] = []
+        github_nodes: List[T] = []
+        repos: List[Tuple[str, str]] = []
         for node in nodes:
-            if self._is_authorized(node):
-                filtered.append(node)
-        return filtered
+            metadata = self.get_node_metadata(node)
+            if metadata[PangeaMetadataKeys.DATA_SOURCE] != PangeaMetadataValues.DATA_SOURCE_GITHUB:
+                continue
+
+            github_nodes.append(node)
+            repos.append(self._get_repo(metadata))
+
+        access = self._load_access(repos)
+        return [node for node, repo in zip(github_nodes, repos) if access.get(f"{repo[0]}/{repo[1]}", False)]
 
     def get_filter(
         self,
     ) -> MetadataFilter:
-        """Generate a filter based on accessible Jira issue IDs.
+        """Generate a filter based on accessible GitHub repositories.
+
+        If a snapshot store is set, repositories are refreshed on every call, checking again only the allowed
+        repositories and the ones updated since the last sync, so revoked access is removed right away. Adding a
+        collaborator does not update the repository, so new grants are only added by the next full rebuild, at most
+        `full_sync_interval` later.
 
         Returns:
-            MetadataFilter: Filter for Jira issue IDs.
+            MetadataFilter: Filter for GitHub repository owner and name.
         """
 
-        if not self._repos:
-            repos_info = self._client.get_allowed_repos(self._token, username=self._username)
-            repos = []
-
-            for repo in repos_info:
-                owner = repo["owner"]["login"]
-                repo_name = repo["name"]
-                repos.append((owner, repo_name))
-
-        self._repos = repos
+        if self._snapshots is not None:
+            repos = self._snapshots.sync(
+                PangeaMetadataValues.DATA_SOURCE_GITHUB,
+                self._get_principal(),
+                self._full_sync,
+                self._delta_sync,
+                full_sync_interval=min(self._full_sync_interval, self._snapshots.full_sync_interval),
+            )
+            self._repos = [(owner, repo_name) for owner, repo_name in repos]
+        elif not self._repos:
+            self._repos, _ = self._full_sync()
 
         return MetadataFilter(
             key=PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER_AND_NAME, value=self._repos, operator=FilterOperator.IN
@@ -215,6 +423,10 @@ class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     def _has_access(self, metadata: dict[str, Any]) -> bool:
         """Check if the authenticated user has access to a repository."""
 
+        owner, repo_name = self._get_repo(metadata)
+        return self._load_access([(owner, repo_name)]).get(f"{owner}/{repo_name}", False)
+
+    def _get_repo(self, metadata: dict[str, Any]) -> Tuple[str, str]:
         repo_name = metadata.get(PangeaMetadataKeys.GITHUB_REPOSITORY_NAME, None)
         if repo_name is None:
             raise KeyError(f"Invalid metadata key: {PangeaMetadataKeys.GITHUB_REPOSITORY_NAME}")
@@ -223,20 +435,61 @@ class GitHubProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         if owner is None:
             raise KeyError(f"Invalid metadata key: {PangeaMetadataKeys.GITHUB_REPOSITORY_OWNER}")
 
-        access_tuple = (owner, repo_name)
-        has_access = self._access_cache.get(access_tuple, None)
-        if has_access is not None:
-            return has_access
+        return (owner, repo_name)
+
+    def _load_access(self, repos: List[Tuple[str, str]]) -> dict[str, bool]:
+        """Returns the access by "owner/repo", requesting in bulk the repositories that are not cached yet."""
+
+        principal = self._get_principal()
+        keys = [f"{owner}/{repo_name}" for owner, repo_name in repos]
+        access: dict[str, bool] = self._access_cache.get_many(PangeaMetadataValues.DATA_SOURCE_GITHUB, principal, keys)
+        pending = [repo for repo, key in zip(repos, keys) if key not in access]
+        if not pending:
+            return access
 
+        resolved = self._client.check_repos_access(self._token, pending, username=self._username or None)
+        self._save_access(resolved)
+        access.update({f"{owner}/{repo_name}": value for (owner, repo_name), value in resolved.items()})
+        return access
+
+    def _save_access(self, access: dict[Tuple[str, str], bool]) -> None:
+        values = {f"{owner}/{repo_name}": value for (owner, repo_name), value in access.items()}
+        self._access_cache.set_many(PangeaMetadataValues.DATA_SOURCE_GITHUB, self._get_principal(), values)
+
+    def _full_sync(self) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        started_at = datetime.now(timezone.utc)
+        access = self._client.get_repos_access(self._token, username=self._username or None)
+        # Every repository of the token is resolved, so the per-node cache is filled as well
+        self._save_access(access)
+        return [repo for repo, allowed in access.items() if allowed], started_at.isoformat()
+
+    def _delta_sync(self, cursor: str) -> AclDelta:
+        started_at = datetime.now(timezone.utc)
+        since = datetime.fromisoformat(cursor) - GitHubProcessor._SYNC_OVERLAP
+        changed = [
+            (repo["owner"]["login"], repo["name"])
+            for repo in self._client.get_user_repos(self._token, since=since.isoformat())
+        ]
+        # Removing a collaborator does not update the repository either, so the allowed ones are checked again
+        snapshot = (
+            self._snapshots.load(PangeaMetadataValues.DATA_SOURCE_GITHUB, self._get_principal())
+            if self._snapshots is not None
+            else None
+        )
+        allowed = [(owner, repo_name) for owner, repo_name in snapshot.ids] if snapshot is not None else []
+        repos = list(dict.fromkeys(allowed + changed))
+        access = self._client.check_repos_access(self._token, repos, username=self._username or None)
+        self._save_access(access)
+        added = [repo for repo, allowed in access.items() if allowed]
+        removed = [repo for repo, allowed in access.items() if not allowed]
+
+        return AclDelta(added=added, removed=removed, cursor=started_at.isoformat())
+
+    def _get_principal(self) -> str:
         if self._username:
-            has_access = self._client.user_has_access(
-                admin_token=self._token, owner=owner, repo_name=repo_name, username=self._username
-            )
-        else:
-            has_access = self._client.has_access(token=self._token, owner=owner, repo_name=repo_name)
+            return self._username
 
-        self._access_cache[access_tuple] = has_access
-        return has_access
+        return credential_fingerprint(self._token)
 
     def _is_authorized(self, node: T) -> bool:
         metadata = self.get_node_metadata(node)
@@ -1,10 +1,13 @@
 import json
 import logging
-from typing import Any, Callable, Generic, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Generic, List, Optional, Tuple
 from urllib.parse import quote
 
 import requests
 
+from pangea_multipass.acl_snapshot import AclDelta, AclSnapshotStore
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     FilterOperator,
     MetadataFilter,
@@ -13,13 +16,15 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.transport import HttpTransport, get_default_transport
 
 
 class GitLabClient:
     _actor = "gitlab_client"
 
-    def __init__(self, logger_name: str = "multipass"):
+    def __init__(self, logger_name: str = "multipass", transport: Optional[HttpTransport] = None):
         self.logger = logging.getLogger(logger_name)
+        self._transport = transport if transport is not None else get_default_transport()
 
     def get_auth_headers(self, token: str) -> dict[str, str]:
         """Authenticate to GitLab using a personal access token."""
@@ -31,7 +36,7 @@ class GitLabClient:
         """
         url = f"https://gitlab.com/api/v4/projects/{project_id}/members/all/{user_id}"
         headers = self.get_auth_headers(admin_token)
-        response = requests.get(url, headers=headers)
+        response = self._transport.get(url, headers=headers, conditional=True)
 
         if response.status_code == 200:
             return True  # User has access
@@ -48,7 +53,7 @@ class GitLabClient:
         """Get user information using an admin token."""
 
         url = f"https://gitlab.com/api/v4/users?username={quote(username)}"
-        response = requests.get(
+        response = self._transport.get(
             url,
             headers=self.get_auth_headers(admin_token),
         )
@@ -64,7 +69,7 @@ class GitLabClient:
         """Get user information from current token"""
 
         url = "https://gitlab.com/api/v4/user/"
-        response = requests.get(
+        response = self._transport.get(
             url,
             headers=self.get_auth_headers(admin_token),
         )
@@ -75,14 +80,22 @@ class GitLabClient:
         response.raise_for_status()
         return response.json()
 
-    def get_user_projects(self, admin_token: str) -> list[dict[str, Any]]:
-        """Fetch all projects the authenticated user has access to."""
+    def get_user_projects(self, admin_token: str, last_activity_after: Optional[str] = None) -> list[dict[str, Any]]:
+        """Fetch all projects the authenticated user has access to.
+
+        Args:
+            admin_token (str): GitLab access token.
+            last_activity_after (Optional[str]): ISO 8601 timestamp. If set, only projects with activity after it are
+                returned.
+        """
         projects = []
         headers = self.get_auth_headers(admin_token)
         url = f"https://gitlab.com/api/v4/projects"
-        params = {"per_page": 100, "membership": True, "simple": True}
+        params: dict[str, Any] = {"per_page": 100, "membership": True, "simple": True}
+        if last_activity_after is not None:
+            params["last_activity_after"] = last_activity_after
         while url:
-            response = requests.get(url, headers=headers, params=params)
+            response = self._transport.get(url, headers=headers, params=params, conditional=True)
             if response.status_code != 200:
                 self._log_error("get_user_projects", url, params, response)
                 raise Exception(f"Error fetching projects: {response.text}")
@@ -105,13 +118,32 @@ class GitLabClient:
         encoded_file_path = quote(file_path, safe="")  # Encode special chars
         file_url = f"https://gitlab.com/api/v4/projects/{repo_id}/repository/files/{encoded_file_path}/raw"
 
-        response = requests.get(file_url, headers=self.get_auth_headers(token))
+        response = self._transport.get(file_url, headers=self.get_auth_headers(token), conditional=True)
         if response.status_code != 200:
             self._log_error("download_file", file_url, {}, response)
             raise Exception(f"Skipping {file_path}: Could not download file")
 
         return response.content
 
+    def download_repo_archive(self, token: str, repo_id: str, ref: Optional[str] = None) -> requests.Response:
+        """Request the tar.gz archive of a repository. The response is streamed and must be closed by the caller.
+
+        Args:
+            token (str): GitLab access token.
+            repo_id (str): Project ID.
+            ref (Optional[str]): Branch, tag or commit. Defaults to the project default branch.
+        """
+
+        url = f"https://gitlab.com/api/v4/projects/{repo_id}/repository/archive.tar.gz"
+        params = {"sha": ref} if ref else {}
+        response = self._transport.get(url, headers=self.get_auth_headers(token), params=params, stream=True)
+        if response.status_code != 200:
+            self._log_error("download_repo_archive", url, params, response)
+            response.close()
+            raise Exception(f"Skipping {repo_id}: Could not download archive")
+
+        return response
+
     def _log_error(self, function_name: str, url: str, data: dict, response: requests.Response):
         self.logger.error(
             json.dumps(
@@ -129,12 +161,22 @@ class GitLabClient:
 
 
 class GitLabProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
-    _access_cache: dict[str, bool] = {}
+    _SYNC_OVERLAP = timedelta(minutes=5)
+    """Margin added to incremental syncs so projects updated during the previous sync are not missed."""
+
+    _FULL_SYNC_INTERVAL = 3600
+    """Default `full_sync_interval`. Shorter than other sources, as adding or removing a project member does not
+    count as project activity, so incremental syncs could not see it."""
+
+    _data_source = PangeaMetadataValues.DATA_SOURCE_GITLAB
+    _access_cache: AuthorizationCache
     _token: str
     _username: str
     _user_id: Optional[str]
     _projects: list[int] = []
     _get_node_metadata: Callable[[T], dict[str, Any]]
+    _snapshots: Optional[AclSnapshotStore]
+    _full_sync_interval: float
 
     def __init__(
         self,
@@ -142,13 +184,22 @@ class GitLabProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         username: str,
         get_node_metadata: Callable[[T], dict[str, Any]],
         logger_name: str = "multipass",
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[AuthorizationCache] = None,
+        snapshot_store: Optional[AclSnapshotStore] = None,
+        full_sync_interval: Optional[float] = None,
     ):
         self._token = admin_token
+        self._projects = []
+        self._snapshots = snapshot_store
+        self._full_sync_interval = (
+            full_sync_interval if full_sync_interval is not None else GitLabProcessor._FULL_SYNC_INTERVAL
+        )
         self._username = username
-        self._access_cache = {}
+        self._access_cache = cache if cache is not None else InMemoryAuthorizationCache()
         self._get_node_metadata = get_node_metadata
         self._user_id = None
-        self._client = GitLabClient(logger_name)
+        self._client = GitLabClient(logger_name, transport=transport)
 
     def _has_access(self, metadata: dict[str, Any]) -> bool:
         """Check if the user has access to the given file."""
@@ -164,11 +215,13 @@ class GitLabProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
             print("Could not load user ID")
             return False
 
-        if project_id in self._access_cache:
-            return self._access_cache[project_id]
+        cache_key = str(project_id)
+        has_access = self._access_cache.get(PangeaMetadataValues.DATA_SOURCE_GITLAB, self._username, cache_key)
+        if has_access is not None:
+            return has_access
 
         has_access = self._client.user_has_access(self._token, self._user_id, project_id)
-        self._access_cache[project_id] = has_access
+        self._access_cache.set(PangeaMetadataValues.DATA_SOURCE_GITLAB, self._username, cache_key, has_access)
         return has_access
 
     def filter(
@@ -195,17 +248,30 @@ class GitLabProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     ) -> MetadataFilter:
         """Generate a filter based on accessible GitLab project IDs.
 
+        If a snapshot store is set, project IDs are refreshed on every call requesting only the projects with
+        activity since the last sync. Adding or removing a project member is not project activity, so those changes
+        are only applied by the next full rebuild, at most `full_sync_interval` later.
+
         Returns:
             MetadataFilter: Filter for GitLab project IDs.
         """
 
-        if not self._projects:
+        if self._snapshots is not None or not self._projects:
             if self._user_id is None:
                 self._load_user_id()
 
             if self._user_id is None:
                 raise Exception("Could not load user ID")
 
+        if self._snapshots is not None:
+            self._projects = self._snapshots.sync(
+                PangeaMetadataValues.DATA_SOURCE_GITLAB,
+                self._username,
+                self._full_sync,
+                self._delta_sync,
+                full_sync_interval=min(self._full_sync_interval, self._snapshots.full_sync_interval),
+            )
+        elif not self._projects and self._user_id is not None:
             self._projects = self._client.get_allowed_projects(self._token, self._user_id)
 
         return MetadataFilter(
@@ -218,6 +284,29 @@ class GitLabProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
             metadata
         )
 
+    def _full_sync(self) -> Tuple[List[int], Optional[str]]:
+        started_at = datetime.now(timezone.utc)
+        if self._user_id is None:
+            raise Exception("Could not load user ID")
+
+        return self._client.get_allowed_projects(self._token, self._user_id), started_at.isoformat()
+
+    def _delta_sync(self, cursor: str) -> AclDelta:
+        started_at = datetime.now(timezone.utc)
+        if self._user_id is None:
+            raise Exception("Could not load user ID")
+
+        since = datetime.fromisoformat(cursor) - GitLabProcessor._SYNC_OVERLAP
+        added: List[int] = []
+        removed: List[int] = []
+        for project in self._client.get_user_projects(self._token, last_activity_after=since.isoformat()):
+            if self._client.user_has_access(self._token, self._user_id, project["id"]):
+                added.append(project["id"])
+            else:
+                removed.append(project["id"])
+
+        return AclDelta(added=added, removed=removed, cursor=started_at.isoformat())
+
     def _load_user_id(self):
         user = self._client.get_user(self._token, username=self._username)
         self._user_id = user.get("id", None)
@@ -2,13 +2,17 @@
 # Author: Pangea Cyber Corporation
 
 import dataclasses
-from typing import Any, Callable, Generic, List, Optional
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple
 from urllib.parse import urljoin
 
-import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import HTTPError
 
+from pangea_multipass.acl_snapshot import AclDelta, AclSnapshotStore
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     _PANGEA_METADATA_KEY_PREFIX,
     FilterOperator,
@@ -19,6 +23,8 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.transport import HttpTransport, get_default_transport
+from pangea_multipass.utils import batched
 
 
 @dataclasses.dataclass
@@ -40,18 +46,44 @@ class JiraME(MetadataEnricher):
         _email (str): Email for authenticating with Jira.
         _api_token (str): API token for Jira access.
         _auth (JiraAuth): Authentication details for Jira.
+        _transport (Optional[HttpTransport]): HTTP transport used to reach Jira.
+        _issues (dict): Cached assignee and reporter fields by issue ID and key.
     """
 
+    _FIELDS = ["assignee", "reporter"]
+
     _url: str
     _email: str
     _api_token: str
     _auth: JiraAuth
+    _transport: Optional[HttpTransport]
+    _issues: dict[str, dict[str, Any]]
 
-    def __init__(self, url: str, email: str, api_token: str):
+    def __init__(self, url: str, email: str, api_token: str, transport: Optional[HttpTransport] = None):
         self._url = url.rstrip("/")
         self._email = email
         self._api_token = api_token
         self._auth = JiraAuth(email, api_token, self._url)
+        self._transport = transport
+        self._issues = {}
+
+    def prepare(self, documents: Sequence[Any]) -> None:
+        """Fetch in bulk the assignee and reporter of the issues of the documents that are not cached yet.
+
+        Called by `enrich_metadata()` for each batch of documents, so `extract_metadata()` reads the issues from the
+        cache instead of requesting them one by one. Issues are searched with JQL `id in (...)`, in concurrent chunks.
+
+        Args:
+            documents (Sequence[Any]): Documents that will be enriched.
+        """
+
+        ids = [id for id in dict.fromkeys(str(doc.metadata.get("id", "")) for doc in documents) if id]
+        pending = [id for id in ids if id not in self._issues]
+        if not pending:
+            return
+
+        for issue in JiraAPI.get_issues_by_id(self._auth, pending, JiraME._FIELDS, transport=self._transport):
+            self._save_issue(issue)
 
     def extract_metadata(self, doc: Any, file_content: str) -> dict[str, Any]:
         """Fetch Jira-related metadata for the document.
@@ -77,7 +109,11 @@ class JiraME(MetadataEnricher):
         metadata[PangeaMetadataKeys.JIRA_ISSUE_ID] = id
 
         # New metadata
-        issue = JiraAPI.get_issue(self._auth, id)
+        issue = self._issues.get(str(id), None)
+        if issue is None:
+            issue = JiraAPI.get_issue(self._auth, id, transport=self._transport, fields=JiraME._FIELDS)
+            self._save_issue(issue)
+
         # Sometimes field is present but it's null, so we should handle that case
         fields = issue.get("fields", {})
         if fields is None:
@@ -96,6 +132,11 @@ class JiraME(MetadataEnricher):
 
         return metadata
 
+    def _save_issue(self, issue: dict[str, Any]) -> None:
+        for id in (issue.get("id", None), issue.get("key", None)):
+            if id:
+                self._issues[str(id)] = issue
+
 
 class JiraProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     """Processes Jira documents for access control.
@@ -104,25 +145,54 @@ class JiraProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
 
     Attributes:
         auth (JiraAuth): Jira authentication details.
-        issue_ids_cache (dict[str, bool]): Cache of access status for Jira issue IDs.
         issue_ids_list (List[str]): List of authorized Jira issue IDs.
         get_node_metadata (Callable): Function to retrieve metadata for nodes.
+        _transport (Optional[HttpTransport]): HTTP transport used to reach Jira.
+        _cache (AuthorizationCache): Cache of access status for Jira issue IDs.
+        _snapshots (Optional[AclSnapshotStore]): Store to refresh `get_filter()` issue IDs incrementally.
+        _full_sync_interval (float): Seconds after which `get_filter()` issue IDs are rebuilt from scratch, when a
+            snapshot store is set. Incremental syncs only add issues, so this is the max time an issue the user lost
+            access to stays in the filter.
     """
 
+    _SYNC_OVERLAP_SECONDS = 300
+    """Margin added to incremental syncs so issues updated during the previous sync are not missed."""
+
+    _FULL_SYNC_INTERVAL = 3600
+    """Default `full_sync_interval`. Shorter than other sources, as Jira incremental syncs could not report revoked
+    access."""
+
+    _data_source = PangeaMetadataValues.DATA_SOURCE_JIRA
     auth: JiraAuth
-    issue_ids_cache: dict[str, bool]
     issue_ids_list: List[str]
     get_node_metadata: Callable[[T], dict[str, Any]]
     _account_id: Optional[str]
+    _transport: Optional[HttpTransport]
+    _cache: AuthorizationCache
+    _snapshots: Optional[AclSnapshotStore]
+    _full_sync_interval: float
 
     def __init__(
-        self, auth: JiraAuth, get_node_metadata: Callable[[T], dict[str, Any]], account_id: Optional[str] = None
+        self,
+        auth: JiraAuth,
+        get_node_metadata: Callable[[T], dict[str, Any]],
+        account_id: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[AuthorizationCache] = None,
+        snapshot_store: Optional[AclSnapshotStore] = None,
+        full_sync_interval: Optional[float] = None,
     ):
         super().__init__()
         self.auth = auth
-        self.issue_ids_cache = {}
+        self.issue_ids_list = []
+        self._snapshots = snapshot_store
+        self._full_sync_interval = (
+            full_sync_interval if full_sync_interval is not None else JiraProcessor._FULL_SYNC_INTERVAL
+        )
         self.get_node_metadata = get_node_metadata
         self._account_id = account_id
+        self._transport = transport
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
 
     def filter(
         self,
@@ -130,6 +200,8 @@ class JiraProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
     ) -> List[Any]:
         """Filter Jira nodes by access permissions.
 
+        Access of every issue not cached yet is requested in bulk before filtering.
+
         Args:
             nodes (List[T]): List of nodes to process.
 
@@ -137,39 +209,42 @@ class JiraProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
             List[Any]: Nodes that have authorized access.
         """
 
-        filtered: List[T] = []
-        if not self._account_id:
-            for node in nodes:
-                if self._is_authorized(node):
-                    filtered.append(node)
-            return filtered
-
-        issues = []
+        jira_nodes: List[T] = []
+        issue_ids: List[str] = []
         for node in nodes:
             metadata = self.get_node_metadata(node)
-            if metadata[PangeaMetadataKeys.DATA_SOURCE] == PangeaMetadataValues.DATA_SOURCE_JIRA:
-                issues.append(int(metadata.get(PangeaMetadataKeys.JIRA_ISSUE_ID, "")))
-                filtered.append(node)
-
-        allowed_issues = JiraAPI.get_allowed_issues(self.auth, self._account_id, issues)
-        return list(
-            filter(
-                lambda x: (int(self.get_node_metadata(x).get(PangeaMetadataKeys.JIRA_ISSUE_ID, ""))) in allowed_issues,
-                filtered,
-            )
-        )
+            if metadata[PangeaMetadataKeys.DATA_SOURCE] != PangeaMetadataValues.DATA_SOURCE_JIRA:
+                continue
+
+            jira_nodes.append(node)
+            issue_ids.append(self._get_issue_id(metadata))
+
+        access = self._load_access(issue_ids)
+        return [node for node, id in zip(jira_nodes, issue_ids) if access.get(id, False)]
 
     def get_filter(
         self,
     ) -> MetadataFilter:
         """Generate a filter based on accessible Jira issue IDs.
 
+        If a snapshot store is set, issue IDs are refreshed on every call requesting only the issues updated since
+        the last sync. Searches only return issues the user could see, so issues the user lost access to are not
+        reported by those syncs: they are dropped on the next full rebuild, at most `full_sync_interval` later.
+
         Returns:
             MetadataFilter: Filter for Jira issue IDs.
         """
 
-        if not self.issue_ids_list:
-            self.issue_ids_list = JiraAPI.get_issue_ids(self.auth)
+        if self._snapshots is not None:
+            self.issue_ids_list = self._snapshots.sync(
+                PangeaMetadataValues.DATA_SOURCE_JIRA,
+                credential_fingerprint(self.auth.url, self.auth.email, self.auth.token),
+                self._full_sync,
+                self._delta_sync,
+                full_sync_interval=min(self._full_sync_interval, self._snapshots.full_sync_interval),
+            )
+        elif not self.issue_ids_list:
+            self.issue_ids_list = JiraAPI.get_issue_ids(self.auth, transport=self._transport)
         return MetadataFilter(
             key=PangeaMetadataKeys.JIRA_ISSUE_ID, value=self.issue_ids_list, operator=FilterOperator.IN
         )
@@ -181,31 +256,66 @@ class JiraProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         )
 
     def _has_access(self, metadata: dict[str, Any]) -> bool:
+        id = self._get_issue_id(metadata)
+        return self._load_access([id]).get(id, False)
+
+    def _get_issue_id(self, metadata: dict[str, Any]) -> str:
         id = metadata.get(PangeaMetadataKeys.JIRA_ISSUE_ID, None)
         if id is None:
             raise KeyError("Invalid metadata key")
 
-        access = self.issue_ids_cache.get(id, None)
-        if access is not None:
-            return access
+        return str(id)
 
-        try:
-            JiraAPI.get_issue(self.auth, id)
-            access = True
-        except HTTPError as e:
-            if e.response is None or e.response.status_code == 404:
-                access = False
+    def _load_access(self, issue_ids: Sequence[str]) -> dict[str, bool]:
+        """Returns the access to the given issues, requesting in bulk the ones that are not cached yet."""
 
-        if access is None:
-            return False
+        principal = self._get_principal()
+        access: dict[str, bool] = self._cache.get_many(PangeaMetadataValues.DATA_SOURCE_JIRA, principal, issue_ids)
+        pending = [id for id in dict.fromkeys(issue_ids) if id not in access]
+        if not pending:
+            return access
 
-        self.issue_ids_cache[id] = access
+        if self._account_id:
+            allowed = JiraAPI.get_allowed_issues(
+                self.auth, self._account_id, [int(id) for id in pending], transport=self._transport
+            )
+            allowed_ids = {str(id) for id in allowed}
+        else:
+            try:
+                allowed_ids = set(JiraAPI.get_visible_issues(self.auth, pending, transport=self._transport))
+            except HTTPError:
+                # Do not cache the result so it is requested again next time
+                return access
+
+        new_access = {id: id in allowed_ids for id in pending}
+        self._cache.set_many(PangeaMetadataValues.DATA_SOURCE_JIRA, principal, new_access)
+        access.update(new_access)
         return access
 
+    def _full_sync(self) -> Tuple[List[str], Optional[str]]:
+        started_at = time.time()
+        return JiraAPI.get_issue_ids(self.auth, transport=self._transport), str(started_at)
+
+    def _delta_sync(self, cursor: str) -> AclDelta:
+        started_at = time.time()
+        # Relative dates avoid any mismatch with the time zone configured for the Jira user
+        minutes = math.ceil((started_at - float(cursor) + JiraProcessor._SYNC_OVERLAP_SECONDS) / 60)
+        updated = JiraAPI.get_updated_issue_ids(self.auth, minutes, transport=self._transport)
+        # Revoked issues are not returned by the search, so they are only removed by full syncs
+        return AclDelta(added=updated, removed=[], cursor=str(started_at))
+
+    def _get_principal(self) -> str:
+        if self._account_id:
+            return f"{self.auth.url}:{self._account_id}"
+
+        return credential_fingerprint(self.auth.url, self.auth.email, self.auth.token)
+
 
 class JiraAPI:
     @staticmethod
-    def _get(auth: JiraAuth, path: str, params: dict[str, Any] = {}) -> dict[str, Any]:
+    def _get(
+        auth: JiraAuth, path: str, params: dict[str, Any] = {}, transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         """
         Makes a request to the Jira API.
 
@@ -213,52 +323,61 @@ class JiraAPI:
             auth (JiraAuth): The authentication credentials for Jira.
             path (str): The API path to send the request to.
             params (dict, optional): The query parameters for the request.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             dict: The JSON response from the Jira API.
         """
 
+        transport = transport if transport is not None else get_default_transport()
         basic_auth = HTTPBasicAuth(auth.email, auth.token)
         url = urljoin(f"https://{auth.url}", path)
-        response = requests.get(url, headers={"Accept": "application/json"}, params=params, auth=basic_auth)
+        response = transport.get(url, headers={"Accept": "application/json"}, params=params, auth=basic_auth)
         response.raise_for_status()
         return response.json()
 
     @staticmethod
-    def _post(auth: JiraAuth, path: str, body: dict[str, Any] = {}) -> dict[str, Any]:
+    def _post(
+        auth: JiraAuth, path: str, body: dict[str, Any] = {}, transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
+        transport = transport if transport is not None else get_default_transport()
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
 
         basic_auth = HTTPBasicAuth(auth.email, auth.token)
 
-        response = requests.request(
-            "POST", urljoin(f"https://{auth.url}", path), json=body, headers=headers, auth=basic_auth
-        )
+        response = transport.post(urljoin(f"https://{auth.url}", path), json=body, headers=headers, auth=basic_auth)
 
         response.raise_for_status()
         return response.json()
 
     @staticmethod
-    def get_issue(auth: JiraAuth, issue_id: str) -> dict[str, Any]:
+    def get_issue(
+        auth: JiraAuth, issue_id: str, transport: Optional[HttpTransport] = None, fields: Optional[List[str]] = None
+    ) -> dict[str, Any]:
         """
         Retrieves details of a specific Jira issue.
 
         Args:
             auth (JiraAuth): The authentication credentials for Jira.
             issue_id (str): The ID of the Jira issue to retrieve.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            fields (Optional[List[str]]): Issue fields to return. Every field if not set.
 
         Returns:
             dict: The JSON response containing issue details.
         """
 
-        return JiraAPI._get(auth, f"/rest/api/3/issue/{issue_id}")
+        params = {"fields": ",".join(fields)} if fields else {}
+        return JiraAPI._get(auth, f"/rest/api/3/issue/{issue_id}", params=params, transport=transport)
 
     @staticmethod
-    def myself(auth: JiraAuth) -> dict[str, Any]:
+    def myself(auth: JiraAuth, transport: Optional[HttpTransport] = None) -> dict[str, Any]:
         """
         Retrieves the profile information of the currently authenticated user in Jira.
 
         Args:
             auth (JiraAuth): The authentication credentials for Jira.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             dict: A dictionary containing the authenticated user's profile information.
@@ -266,10 +385,12 @@ class JiraAPI:
         Raises:
             HTTPError: If the request to Jira fails.
         """
-        return JiraAPI._get(auth, "/rest/api/3/myself")
+        return JiraAPI._get(auth, "/rest/api/3/myself", transport=transport)
 
     @staticmethod
-    def search(auth: JiraAuth, params: dict[str, Any] = {}) -> dict[str, Any]:
+    def search(
+        auth: JiraAuth, params: dict[str, Any] = {}, transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         """
         Searches for issues in Jira using specified query parameters.
 
@@ -282,6 +403,7 @@ class JiraAPI:
             auth (JiraAuth): The authentication credentials for Jira.
             params (dict, optional): A dictionary of query parameters for customizing the search.
                                      Default is an empty dictionary.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             dict: A dictionary containing the search results, including issue details and pagination info.
@@ -289,10 +411,10 @@ class JiraAPI:
         Raises:
             HTTPError: If the request to Jira fails.
         """
-        return JiraAPI._get(auth, "/rest/api/3/search", params)
+        return JiraAPI._get(auth, "/rest/api/3/search", params, transport=transport)
 
     @staticmethod
-    def get_issue_ids(auth: JiraAuth) -> List[str]:
+    def get_issue_ids(auth: JiraAuth, transport: Optional[HttpTransport] = None) -> List[str]:
         """
         Retrieves the IDs of all issues in Jira.
 
@@ -301,6 +423,7 @@ class JiraAPI:
 
         Args:
             auth (JiraAuth): The authentication credentials for Jira.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
 
         Returns:
             List[str]: A list of all issue IDs in the Jira instance.
@@ -319,7 +442,7 @@ class JiraAPI:
                 "fields": ["id"],
             }
 
-            resp = JiraAPI.search(auth, params)
+            resp = JiraAPI.search(auth, params, transport=transport)
             issues = resp.get("issues", [])
             total = resp.get("total", 0)
 
@@ -332,7 +455,143 @@ class JiraAPI:
         return issue_ids
 
     @staticmethod
-    def get_permission_check(auth: JiraAuth, account_id: str, issues: List[int]) -> dict[str, Any]:
+    def get_updated_issue_ids(auth: JiraAuth, minutes: int, transport: Optional[HttpTransport] = None) -> List[str]:
+        """
+        Retrieves the IDs of the issues visible to the authenticated user that were updated in the last minutes.
+
+        Args:
+            auth (JiraAuth): The authentication credentials for Jira.
+            minutes (int): Number of minutes to look back.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+
+        Returns:
+            List[str]: IDs of the updated issues.
+        """
+
+        jql = f'updated >= "-{max(minutes, 1)}m" ORDER BY updated ASC'
+        issue_ids: List[str] = []
+        while True:
+            resp = JiraAPI.search_jql(auth, jql, ["id"], start_at=len(issue_ids), transport=transport)
+            ids = [str(issue["id"]) for issue in resp.get("issues", [])]
+            issue_ids.extend(ids)
+            if not ids or len(issue_ids) >= resp.get("total", 0):
+                return issue_ids
+
+    @staticmethod
+    def search_jql(
+        auth: JiraAuth,
+        jql: str,
+        fields: List[str],
+        start_at: int = 0,
+        max_results: int = 100,
+        transport: Optional[HttpTransport] = None,
+    ) -> dict[str, Any]:
+        """
+        Searches for issues in Jira using a JQL query sent in the request body.
+
+        Unknown or not visible issues referenced in the query are reported as warnings instead of failing the request.
+
+        Args:
+            auth (JiraAuth): The authentication credentials for Jira.
+            jql (str): The JQL query.
+            fields (List[str]): Issue fields to return.
+            start_at (int): Index of the first issue to return.
+            max_results (int): Max number of issues to return.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+
+        Returns:
+            dict: A dictionary containing the search results, including issue details and pagination info.
+
+        Raises:
+            HTTPError: If the request to Jira fails.
+        """
+
+        body = {
+            "jql": jql,
+            "startAt": start_at,
+            "maxResults": max_results,
+            "fields": fields,
+            "validateQuery": "warn",
+        }
+        return JiraAPI._post(auth, "/rest/api/3/search", body, transport=transport)
+
+    @staticmethod
+    def get_issues_by_id(
+        auth: JiraAuth,
+        issue_ids: Sequence[str],
+        fields: List[str],
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        transport: Optional[HttpTransport] = None,
+    ) -> List[dict[str, Any]]:
+        """
+        Retrieves the issues visible to the authenticated user among the given IDs.
+
+        IDs are deduplicated and split in chunks searched with JQL `id in (...)`. Chunks are requested concurrently.
+
+        Args:
+            auth (JiraAuth): The authentication credentials for Jira.
+            issue_ids (Sequence[str]): IDs of the issues to retrieve.
+            fields (List[str]): Issue fields to return.
+            chunk_size (int): Max number of issues per request.
+            max_workers (int): Max number of concurrent requests.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+
+        Returns:
+            List[dict]: Issues found. Issues that do not exist or the user can not see are missing.
+        """
+
+        def search_chunk(chunk: List[str]) -> List[dict[str, Any]]:
+            ids = ", ".join(_quote_jql_value(id) for id in chunk)
+            issues: List[dict[str, Any]] = []
+            while True:
+                resp = JiraAPI.search_jql(
+                    auth, f"id in ({ids})", fields, start_at=len(issues), max_results=len(chunk), transport=transport
+                )
+                new_issues = resp.get("issues", [])
+                issues.extend(new_issues)
+                if not new_issues or len(issues) >= resp.get("total", 0):
+                    return issues
+
+        chunks = list(batched(dict.fromkeys(str(id) for id in issue_ids), chunk_size))
+        if not chunks:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = executor.map(search_chunk, chunks)
+            return [issue for issues in results for issue in issues]
+
+    @staticmethod
+    def get_visible_issues(
+        auth: JiraAuth,
+        issue_ids: Sequence[str],
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        transport: Optional[HttpTransport] = None,
+    ) -> List[str]:
+        """
+        Filters issue IDs, keeping the ones visible to the authenticated user.
+
+        Args:
+            auth (JiraAuth): The authentication credentials for Jira.
+            issue_ids (Sequence[str]): IDs of the issues to check.
+            chunk_size (int): Max number of issues per request.
+            max_workers (int): Max number of concurrent requests.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+
+        Returns:
+            List[str]: IDs of the visible issues.
+        """
+
+        issues = JiraAPI.get_issues_by_id(
+            auth, issue_ids, ["id"], chunk_size=chunk_size, max_workers=max_workers, transport=transport
+        )
+        return [str(issue["id"]) for issue in issues]
+
+    @staticmethod
+    def get_permission_check(
+        auth: JiraAuth, account_id: str, issues: List[int], transport: Optional[HttpTransport] = None
+    ) -> dict[str, Any]:
         body = {
             "accountId": account_id,
             "projectPermissions": [
@@ -343,9 +602,49 @@ class JiraAPI:
             ],
         }
 
-        return JiraAPI._post(auth=auth, path="rest/api/3/permissions/check", body=body)
+        return JiraAPI._post(auth=auth, path="rest/api/3/permissions/check", body=body, transport=transport)
 
     @staticmethod
-    def get_allowed_issues(auth: JiraAuth, account_id: str, issues: List[int]) -> List[int]:
-        resp = JiraAPI.get_permission_check(auth, account_id, issues)
-        return resp.get("projectPermissions", [])[0].get("issues", [])
+    def get_allowed_issues(
+        auth: JiraAuth,
+        account_id: str,
+        issues: List[int],
+        transport: Optional[HttpTransport] = None,
+        chunk_size: int = 1000,
+        max_workers: int = 4,
+    ) -> List[int]:
+        """
+        Filters issue IDs, keeping the ones a user has permissions on.
+
+        IDs are deduplicated and split in chunks that fit in a permissions check request. Chunks are requested
+        concurrently.
+
+        Args:
+            auth (JiraAuth): The authentication credentials for Jira.
+            account_id (str): Account ID of the user to check permissions for.
+            issues (List[int]): IDs of the issues to check.
+            transport (Optional[HttpTransport]): HTTP transport to use. Defaults to the shared transport.
+            chunk_size (int): Max number of issues per request.
+            max_workers (int): Max number of concurrent requests.
+
+        Returns:
+            List[int]: IDs of the allowed issues.
+        """
+
+        def check_chunk(chunk: List[int]) -> List[int]:
+            resp = JiraAPI.get_permission_check(auth, account_id, chunk, transport=transport)
+            permissions = resp.get("projectPermissions", [])
+            return permissions[0].get("issues", []) if permissions else []
+
+        chunks = list(batched(dict.fromkeys(issues), chunk_size))
+        if not chunks:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = executor.map(check_chunk, chunks)
+            return [issue for allowed in results for issue in allowed]
+
+
+def _quote_jql_value(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
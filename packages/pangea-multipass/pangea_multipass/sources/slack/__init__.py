@@ -1 +1 @@
-from .slack import SlackClient, SlackProcessor
+from .slack import SlackClient, SlackMembershipIndex, SlackProcessor
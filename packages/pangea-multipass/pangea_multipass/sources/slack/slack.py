@@ -1,11 +1,16 @@
+import functools
 import json
 import logging
-from typing import Any, Callable, Generic, List, Optional
+import threading
+import time
+from typing import Any, Callable, Generic, Iterator, List, Optional, Tuple
 
 import requests
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
 
+from pangea_multipass.cache import AuthorizationCache, InMemoryAuthorizationCache, credential_fingerprint
 from pangea_multipass.core import (
     FilterOperator,
     MetadataFilter,
@@ -14,13 +19,75 @@ from pangea_multipass.core import (
     PangeaMetadataValues,
     T,
 )
+from pangea_multipass.rate_limit import TokenBucket
+from pangea_multipass.utils import iter_prefetched
+
+_tier_buckets: dict[Tuple[str, str], TokenBucket] = {}
+_tier_buckets_lock = threading.Lock()
+
+_membership_indexes: dict[str, "SlackMembershipIndex"] = {}
+_membership_indexes_lock = threading.Lock()
 
 
 class SlackClient:
     _actor = "slack_client"
 
-    def __init__(self, logger_name: str = "multipass"):
+    _MAX_RATE_LIMIT_RETRIES = 5
+
+    _TIER_REQUESTS_PER_MINUTE = {
+        "conversations.list": 20,  # Tier 2
+        "conversations.history": 50,  # Tier 3
+        "conversations.replies": 50,  # Tier 3
+        "users.lookupByEmail": 50,  # Tier 3
+        "conversations.members": 100,  # Tier 4
+    }
+    """Rate limits of the Slack methods used, per workspace and app."""
+
+    max_workers: int
+
+    def __init__(self, logger_name: str = "multipass", max_workers: int = 4):
         self.logger = logging.getLogger(logger_name)
+        self.max_workers = max_workers
+
+    @staticmethod
+    def wait_for_rate_limit(method: str, token: str) -> None:
+        """
+        Block until a request to a Slack method fits in its tier rate limit.
+        Buckets are shared by every client of the process using the same token.
+
+        Args:
+            method (str): Slack method name, e.g. `conversations.list`.
+            token (str): Slack token the request is sent with.
+        """
+
+        per_minute = SlackClient._TIER_REQUESTS_PER_MINUTE.get(method, None)
+        if per_minute is None:
+            return
+
+        key = (method, credential_fingerprint(token))
+        with _tier_buckets_lock:
+            bucket = _tier_buckets.get(key, None)
+            if bucket is None:
+                # Slack tolerates short bursts over the per minute rate
+                bucket = TokenBucket(per_minute / 60, capacity=max(per_minute / 10, 1))
+                _tier_buckets[key] = bucket
+
+        bucket.acquire()
+
+    @staticmethod
+    def new_web_client(token: str) -> WebClient:
+        """
+        Create a Slack web client that waits and retries when a method tier rate limit is hit.
+
+        Args:
+            token (str): Slack token.
+        """
+
+        # Waits for the Retry-After time sent by Slack on HTTP 429
+        return WebClient(
+            token=token,
+            retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=SlackClient._MAX_RATE_LIMIT_RETRIES)],
+        )
 
     def list_channels(self, token: str) -> List[dict[str, Any]]:
         """
@@ -33,11 +100,8 @@ class SlackClient:
             List of channel ids that the authenticated user has access to.
         """
 
-        client = WebClient(token=token)
         try:
-            response = client.conversations_list(types="public_channel,private_channel")
-            channels: List[dict[str, Any]] = response.get("channels", [])
-            return channels
+            return list(self.iter_channels(token))
         except SlackApiError as e:
             self._log_error("list_channels", "conversations.list", {}, e.response)
             return []
@@ -54,14 +118,126 @@ class SlackClient:
             List of user IDs in the channel.
         """
 
-        client = WebClient(token=token)
         try:
-            response = client.conversations_members(channel=channel_id)
-            return response["members"]
+            return list(self.iter_channel_members(token, channel_id))
         except SlackApiError as e:
             self._log_error("get_channel_members", "conversations.members", {"channel": channel_id}, e.response)
             return None
 
+    def iter_channels(
+        self, token: str, types: str = "public_channel,private_channel", page_size: int = 1000
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over every channel of the workspace visible to the token, following the pagination cursor.
+
+        Args:
+            token (str): Slack token.
+            types (str): Comma separated channel types to list.
+            page_size (int): Channels requested per page. Slack caps it to 1000.
+
+        Yields:
+            Channel objects as returned by `conversations.list`.
+
+        Raises:
+            SlackApiError: If a page could not be loaded.
+        """
+
+        return self._iter_pages(token, "conversations.list", "channels", types=types, limit=page_size)
+
+    def iter_channel_members(self, token: str, channel_id: str, page_size: int = 1000) -> Iterator[str]:
+        """
+        Iterate over the members of a channel, following the pagination cursor.
+
+        Args:
+            token (str): Slack token.
+            channel_id (str): Channel id to request members.
+            page_size (int): Members requested per page.
+
+        Yields:
+            User IDs in the channel.
+
+        Raises:
+            SlackApiError: If a page could not be loaded.
+        """
+
+        return self._iter_pages(token, "conversations.members", "members", channel=channel_id, limit=page_size)
+
+    def iter_messages(
+        self, token: str, channel_id: str, oldest: Optional[str] = None, page_size: int = 200
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over the messages of a channel, newest first, following the pagination cursor.
+
+        Args:
+            token (str): Slack token.
+            channel_id (str): Channel id to request messages.
+            oldest (Optional[str]): Only messages posted after this timestamp are listed.
+            page_size (int): Messages requested per page.
+
+        Yields:
+            Message objects as returned by `conversations.history`.
+
+        Raises:
+            SlackApiError: If a page could not be loaded.
+        """
+
+        return self._iter_pages(
+            token, "conversations.history", "messages", channel=channel_id, oldest=oldest, limit=page_size
+        )
+
+    def iter_replies(
+        self, token: str, channel_id: str, thread_ts: str, oldest: Optional[str] = None, page_size: int = 200
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over the replies of a thread, following the pagination cursor. The parent message is not included.
+
+        Args:
+            token (str): Slack token.
+            channel_id (str): Channel id of the thread.
+            thread_ts (str): Timestamp of the parent message.
+            oldest (Optional[str]): Only replies posted after this timestamp are listed.
+            page_size (int): Replies requested per page.
+
+        Yields:
+            Message objects as returned by `conversations.replies`.
+
+        Raises:
+            SlackApiError: If a page could not be loaded.
+        """
+
+        replies = self._iter_pages(
+            token, "conversations.replies", "messages", channel=channel_id, ts=thread_ts, oldest=oldest, limit=page_size
+        )
+        return (reply for reply in replies if reply.get("ts", None) != thread_ts)
+
+    def get_members_by_channel(self, token: str, channel_ids: List[str]) -> dict[str, Optional[List[str]]]:
+        """
+        Retrieve the members of several channels concurrently, with up to `max_workers` channels in flight.
+        Requests wait for the tier rate limit of `conversations.members`, so large workspaces slow down instead of
+        being rate limited.
+
+        Args:
+            token (str): Slack token.
+            channel_ids (List[str]): Channels id to request members.
+
+        Returns:
+            Members of each channel, or None for channels whose members could not be loaded.
+        """
+
+        tasks = (functools.partial(self._get_members_or_error, token, channel_id) for channel_id in channel_ids)
+        members_by_channel: dict[str, Optional[List[str]]] = {}
+        for channel_id, result in zip(channel_ids, iter_prefetched(tasks, self.max_workers)):
+            if isinstance(result, SlackApiError):
+                if result.response["error"] != "not_in_channel":
+                    self._log_error(
+                        "get_members_by_channel", "conversations.members", {"channel": channel_id}, result.response
+                    )
+                members_by_channel[channel_id] = None
+            else:
+                members_by_channel[channel_id] = result
+
+        return members_by_channel
+
     def get_all_channels(self, token: str) -> Optional[List[str]]:
         """
         Retrieve all channels in the workspace.
@@ -73,12 +249,8 @@ class SlackClient:
             List of channel IDs.
         """
 
-        client = WebClient(token=token)
-        channels: List[dict[str, Any]] = []
         try:
-            response = client.conversations_list(types="public_channel,private_channel", limit=1000)
-            channels = response.get("channels", [])
-            return [channel["id"] for channel in channels]
+            return [channel["id"] for channel in self.iter_channels(token)]
         except SlackApiError as e:
             self._log_error("get_all_channels", "conversations.list", {}, e.response)
             return None
@@ -95,8 +267,9 @@ class SlackClient:
             User ID or None if the user does not exist.
         """
 
-        client = WebClient(token=token)
+        client = SlackClient.new_web_client(token)
         try:
+            SlackClient.wait_for_rate_limit("users.lookupByEmail", token)
             response = client.users_lookupByEmail(email=user_email)
             return response["user"]["id"]
         except SlackApiError as e:
@@ -115,23 +288,30 @@ class SlackClient:
         Returns:
             List of channel IDs the user has access to.
         """
-        client = WebClient(token=token)
-        accessible_channels = []
-        for channel_id in channel_ids:
-            try:
-                response = client.conversations_members(channel=channel_id)
-                members: List[str] = response.get("members", [])
-                if user_id in members:
-                    accessible_channels.append(channel_id)
-            except SlackApiError as e:
-                if e.response["error"] == "not_in_channel":
-                    continue  # User is not in this channel
-                else:
-                    self._log_error(
-                        "get_channels_for_user", "conversations.members", {"channel": channel_id}, e.response
-                    )
-                    pass
-        return accessible_channels
+
+        members_by_channel = self.get_members_by_channel(token, channel_ids)
+        return [channel_id for channel_id, members in members_by_channel.items() if members and user_id in members]
+
+    def _get_members_or_error(self, token: str, channel_id: str) -> Any:
+        try:
+            return list(self.iter_channel_members(token, channel_id))
+        except SlackApiError as e:
+            return e
+
+    def _iter_pages(self, token: str, method: str, items_key: str, **kwargs: Any) -> Iterator[Any]:
+        """Call a Slack method page by page, following `response_metadata.next_cursor`, and yield the listed items."""
+
+        client = SlackClient.new_web_client(token)
+        call = getattr(client, method.replace(".", "_"))
+        cursor: Optional[str] = None
+        while True:
+            SlackClient.wait_for_rate_limit(method, token)
+            response = call(cursor=cursor, **kwargs)
+            yield from response.get(items_key, [])
+            metadata: dict[str, Any] = response.get("response_metadata", None) or {}
+            cursor = metadata.get("next_cursor", None)
+            if not cursor:
+                return
 
     def _log_error(self, function_name: str, url: str, data: dict, response: requests.Response):
         self.logger.error(
@@ -149,11 +329,169 @@ class SlackClient:
         )
 
 
+class SlackMembershipIndex:
+    """Members of every channel of a workspace, inverted to look up the channels of a user at once.
+
+    The index is built once by paging through every channel and its members, then refreshed incrementally: only
+    new channels, channels updated since the last refresh and channels whose members are older than
+    `max_members_age` are requested again, and deleted channels are dropped. Share one instance between the
+    processors of every user of the workspace, so each of them resolves its channels with a lookup.
+    `SlackMembershipIndex.for_token()` returns the index shared in the process by every processor using a token.
+
+    Attributes:
+        refresh_interval (float): Seconds during which the index is used without listing channels again.
+        max_members_age (float): Seconds after which the members of a channel are requested again, even if the
+            channel was not updated. Joining or leaving a channel does not always update it.
+    """
+
+    _token: str
+    refresh_interval: float
+    max_members_age: float
+    _channels: dict[str, dict[str, Any]]
+    """Channel ID to its `updated` time, the time its members were fetched and its members."""
+    _user_channels: dict[str, set[str]]
+    _refreshed_at: Optional[float]
+    _lock: threading.Lock
+    _refresh_lock: threading.Lock
+
+    def __init__(
+        self,
+        token: str,
+        refresh_interval: float = 300,
+        max_members_age: float = 3600,
+        logger_name: str = "multipass",
+        max_workers: int = 4,
+    ):
+        self._token = token
+        self.refresh_interval = refresh_interval
+        self.max_members_age = max_members_age
+        self._client = SlackClient(logger_name, max_workers=max_workers)
+        self._channels = {}
+        self._user_channels = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @staticmethod
+    def for_token(token: str, logger_name: str = "multipass") -> "SlackMembershipIndex":
+        """
+        Return the index shared by every caller of the process using the same token, creating it on first use.
+
+        Args:
+            token (str): Slack token of the workspace.
+            logger_name (str): Logger of the index, if it is created.
+
+        Returns:
+            SlackMembershipIndex: Index of the token's workspace, with the default refresh settings.
+        """
+
+        key = credential_fingerprint(token)
+        with _membership_indexes_lock:
+            index = _membership_indexes.get(key, None)
+            if index is None:
+                index = SlackMembershipIndex(token, logger_name=logger_name)
+                _membership_indexes[key] = index
+            return index
+
+    def get_user_channels(self, user_id: str) -> Optional[List[str]]:
+        """
+        Return the channels a user is a member of, refreshing the index first if it is due.
+
+        Args:
+            user_id (str): Slack user id.
+
+        Returns:
+            List of channel IDs, or None if the index could not be built.
+        """
+
+        if not self.refresh():
+            return None
+
+        with self._lock:
+            return list(self._user_channels.get(user_id, ()))
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Bring the index up to date with the workspace, if `refresh_interval` elapsed since the last refresh.
+
+        Args:
+            force (bool): Refresh even if the last refresh is recent.
+
+        Returns:
+            True if the index is usable, False if it could not be built.
+        """
+
+        with self._refresh_lock:
+            now = time.time()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return True
+
+            try:
+                channels = {
+                    channel["id"]: channel.get("updated", None) for channel in self._client.iter_channels(self._token)
+                }
+            except SlackApiError as e:
+                self._client._log_error("refresh", "conversations.list", {}, e.response)
+                return self._refreshed_at is not None
+
+            for channel_id in [channel_id for channel_id in self._channels if channel_id not in channels]:
+                self._set_members(channel_id, None)
+
+            stale_channels: List[str] = []
+            for channel_id, updated in channels.items():
+                entry = self._channels.get(channel_id, None)
+                if entry is None or entry["updated"] != updated or now - entry["fetched_at"] >= self.max_members_age:
+                    stale_channels.append(channel_id)
+
+            # Channels whose members could not be loaded keep their previous members until the next refresh
+            for channel_id, members in self._client.get_members_by_channel(self._token, stale_channels).items():
+                if members is not None:
+                    self._set_members(
+                        channel_id, {"updated": channels[channel_id], "fetched_at": now, "members": set(members)}
+                    )
+
+            self._refreshed_at = now
+            return True
+
+    def _set_members(self, channel_id: str, entry: Optional[dict[str, Any]]) -> None:
+        """Replace the members of a channel, or drop it if `entry` is None, updating the inverted map."""
+
+        with self._lock:
+            previous = self._channels.pop(channel_id, None)
+            old_members: set[str] = previous["members"] if previous is not None else set()
+            new_members: set[str] = entry["members"] if entry is not None else set()
+            if entry is not None:
+                self._channels[channel_id] = entry
+
+            for user_id in old_members - new_members:
+                user_channels = self._user_channels.get(user_id, None)
+                if user_channels is not None:
+                    user_channels.discard(channel_id)
+                    if not user_channels:
+                        del self._user_channels[user_id]
+
+            for user_id in new_members - old_members:
+                self._user_channels.setdefault(user_id, set()).add(channel_id)
+
+
 class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
-    _channels_id_cache: dict[str, bool] = {}
+    """Filter Slack nodes by the channels the token, or the user of `user_email`, is a member of.
+
+    With `user_email`, channels are resolved from `membership_index`. If it is not set, processors using the same
+    token share the index returned by `SlackMembershipIndex.for_token()`. Pass an index to change its refresh
+    settings or to share it between different tokens of the same workspace.
+    """
+
+    _data_source = PangeaMetadataValues.DATA_SOURCE_SLACK
+    _CHANNELS_CACHE_KEY = "channels"
+    """Authorization cache key of the list of allowed channel IDs."""
+
+    _channels_id_cache: dict[str, bool]
     _token: str
     _user_email: Optional[str] = None
     _user_id: Optional[str] = None
+    _cache: AuthorizationCache
+    _membership_index: Optional[SlackMembershipIndex]
 
     def __init__(
         self,
@@ -161,6 +499,8 @@ class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         get_node_metadata: Callable[[T], dict[str, Any]],
         user_email: Optional[str] = None,
         logger_name: str = "multipass",
+        cache: Optional[AuthorizationCache] = None,
+        membership_index: Optional[SlackMembershipIndex] = None,
     ):
         super().__init__()
         self._token = token
@@ -168,6 +508,9 @@ class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         self.get_node_metadata = get_node_metadata
         self._user_email = user_email
         self._client = SlackClient(logger_name)
+        self._cache = cache if cache is not None else InMemoryAuthorizationCache()
+        self._logger_name = logger_name
+        self._membership_index = membership_index
 
     def _has_access(self, metadata: dict[str, Any]) -> bool:
         """Check if the authenticated user has access to a channel."""
@@ -176,7 +519,7 @@ class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         if channel_id is None:
             raise KeyError(f"Invalid metadata key: {PangeaMetadataKeys.SLACK_CHANNEL_ID}")
 
-        if not self._channels_id_cache:
+        if not self._user_email:
             self._load_channels_from_token()
         else:
             self._load_channels_with_email()
@@ -244,7 +587,7 @@ class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         return user_id in channel_members
 
     def _load_channels_with_email(self) -> None:
-        if self._channels_id_cache:
+        if self._channels_id_cache or self._load_channels_from_cache():
             return
 
         if not self._user_id and self._user_email is not None:
@@ -253,20 +596,42 @@ class SlackProcessor(PangeaGenericNodeProcessor[T], Generic[T]):
         if not self._user_id:
             return
 
-        all_channels = self._client.get_all_channels(self._token)
-        if all_channels is None:
+        if self._membership_index is None:
+            self._membership_index = SlackMembershipIndex.for_token(self._token, logger_name=self._logger_name)
+
+        channels = self._membership_index.get_user_channels(self._user_id)
+        if channels is None:
             return
 
-        channels = self._client.get_channels_for_user(self._token, user_id=self._user_id, channel_ids=all_channels)
-        for channel in channels:
-            self._channels_id_cache[channel] = True
+        self._save_channels(channels)
 
     def _load_channels_from_token(self) -> None:
-        if self._channels_id_cache:
+        if self._channels_id_cache or self._load_channels_from_cache():
             return
 
-        for channel in self._client.list_channels(self._token):
-            self._channels_id_cache[channel["id"]] = True
+        self._save_channels([channel["id"] for channel in self._client.list_channels(self._token)])
+
+    def _load_channels_from_cache(self) -> bool:
+        channels = self._cache.get(
+            PangeaMetadataValues.DATA_SOURCE_SLACK, self._get_principal(), SlackProcessor._CHANNELS_CACHE_KEY
+        )
+        if channels is None:
+            return False
+
+        self._channels_id_cache = {channel: True for channel in channels}
+        return True
+
+    def _save_channels(self, channels: List[str]) -> None:
+        self._channels_id_cache = {channel: True for channel in channels}
+        self._cache.set(
+            PangeaMetadataValues.DATA_SOURCE_SLACK, self._get_principal(), SlackProcessor._CHANNELS_CACHE_KEY, channels
+        )
+
+    def _get_principal(self) -> str:
+        if self._user_email:
+            return self._user_email
+
+        return credential_fingerprint(self._token)
 
     def _is_authorized(self, node: T) -> bool:
         metadata = self.get_node_metadata(node)
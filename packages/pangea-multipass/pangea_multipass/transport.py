@@ -0,0 +1,224 @@
+# Copyright 2021 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import threading
+import time
+from typing import Any, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+from .cache import credential_fingerprint
+from .http_cache import CachedResponse, HttpResponseCache
+from .rate_limit import RateLimitScheduler
+
+TimeoutType = Union[float, Tuple[float, float]]
+
+
+class HttpTransport:
+    """Pooled HTTP transport shared by the source clients.
+
+    Keeps one `requests.Session` per host, so repeated requests to the same API reuse keep-alive connections
+    instead of paying a new TCP and TLS handshake on every call. Sessions are created lazily and are safe to
+    share between threads. If a rate limiter is set, requests wait for the rate limit budget of their host and
+    credential, and rate limited responses are retried. If a response cache is set, GET requests sent with
+    `conditional=True` reuse the saved body when the server answers `304 Not Modified`.
+
+    Attributes:
+        pool_connections (int): Number of connection pools to cache per session.
+        pool_maxsize (int): Max number of connections to keep alive per host.
+        timeout (Optional[TimeoutType]): Default timeout for requests that do not set one.
+        max_retries (int): Retries on connection errors, before any data is sent to the server.
+        max_connections_per_host (Optional[int]): Max number of requests in flight to the same host. Extra requests
+            wait for a slot. `None` means no limit.
+        rate_limiter (Optional[RateLimitScheduler]): Scheduler of the requests. `None` disables rate limit handling.
+        response_cache (Optional[HttpResponseCache]): Cache for conditional requests. `None` disables them.
+    """
+
+    pool_connections: int
+    pool_maxsize: int
+    timeout: Optional[TimeoutType]
+    max_retries: int
+    max_connections_per_host: Optional[int]
+    rate_limiter: Optional[RateLimitScheduler]
+    response_cache: Optional[HttpResponseCache]
+    _sessions: dict[str, requests.Session]
+    _host_slots: dict[str, threading.BoundedSemaphore]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: Optional[TimeoutType] = 60,
+        max_retries: int = 0,
+        max_connections_per_host: Optional[int] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        response_cache: Optional[HttpResponseCache] = None,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections_per_host = max_connections_per_host
+        self._sessions = {}
+        self._host_slots = {}
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """Returns the pooled session for the host of the given URL."""
+
+        host = urlsplit(url).netloc.lower()
+        session = self._sessions.get(host, None)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host, None)
+            if session is None:
+                session = self._new_session()
+                self._sessions[host] = session
+
+        return session
+
+    def request(self, method: str, url: str, conditional: bool = False, **kwargs: Any) -> requests.Response:
+        """Sends a request through the pooled session of the URL host. Accepts the same arguments as `requests`.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL to request.
+            conditional (bool): Revalidate the saved response of a GET with `If-None-Match`/`If-Modified-Since`,
+                returning it if the resource did not change. Only for idempotent reads of small bodies.
+        """
+
+        kwargs.setdefault("timeout", self.timeout)
+        if not conditional or self.response_cache is None or method.upper() != "GET" or kwargs.get("stream"):
+            return self._request(method, url, **kwargs)
+
+        headers = kwargs.get("headers", None) or {}
+        accept = next((value for name, value in headers.items() if name.lower() == "accept"), None)
+        cache_key = HttpResponseCache.key(method, url, kwargs.get("params", None), _get_credential(kwargs), accept)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            kwargs["headers"] = {**headers, **cached.validators()}
+
+        response = self._request(method, url, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            return cached.to_response(response)
+
+        if response.status_code == 200:
+            entry = CachedResponse.from_response(response)
+            if entry is not None:
+                self.response_cache.set(cache_key, entry)
+
+        return response
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        if self.rate_limiter is None:
+            return self._send(method, url, **kwargs)
+
+        host = urlsplit(url).netloc.lower()
+        credential = _get_credential(kwargs)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(host, credential)
+            response = self._send(method, url, **kwargs)
+            delay = self.rate_limiter.update(host, credential, response, attempt)
+            if delay is None or attempt >= self.rate_limiter.max_retries or delay > self.rate_limiter.max_wait:
+                return response
+
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        if self.max_connections_per_host is None:
+            return self.session(url).request(method, url, **kwargs)
+
+        with self._host_slot(url):
+            return self.session(url).request(method, url, **kwargs)
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host, None)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_connections_per_host or 1)
+                self._host_slots[host] = slot
+
+        return slot
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, max_retries=self.max_retries
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+def _get_credential(kwargs: dict[str, Any]) -> str:
+    """Returns the fingerprint of the credential a request is sent with, to keep a rate limit budget per credential."""
+
+    headers = kwargs.get("headers", None) or {}
+    authorization = next((value for name, value in headers.items() if name.lower() == "authorization"), None)
+    if authorization is not None:
+        return credential_fingerprint(authorization)
+
+    auth = kwargs.get("auth", None)
+    if isinstance(auth, tuple):
+        return credential_fingerprint(*auth)
+    if isinstance(auth, HTTPBasicAuth):
+        # Used by the Jira and Confluence clients
+        return credential_fingerprint(_to_str(auth.username), _to_str(auth.password))
+
+    return ""
+
+
+def _to_str(value: Union[str, bytes]) -> str:
+    return value.decode("latin1") if isinstance(value, bytes) else str(value)
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    """Returns the process-wide transport used by clients that were not given one."""
+
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport(
+                    rate_limiter=RateLimitScheduler(), response_cache=HttpResponseCache()
+                )
+
+    return _default_transport
+
+
+def set_default_transport(transport: HttpTransport) -> None:
+    """Replaces the process-wide transport used by clients that were not given one."""
+
+    global _default_transport
+    with _default_transport_lock:
+        _default_transport = transport
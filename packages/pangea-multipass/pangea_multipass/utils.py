@@ -1,8 +1,29 @@
+import fnmatch
 import json
 import logging
 import os
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from logging.handlers import TimedRotatingFileHandler
-from typing import Dict, Optional
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+_T = TypeVar("_T")
 
 
 def data_load(filename: str) -> Optional[dict]:
@@ -18,6 +39,234 @@ def data_save(filename: str, data: dict):
         json.dump(data, f)
 
 
+def batched(items: Iterable[_T], size: int) -> Iterator[List[_T]]:
+    """Splits items in lists of at most `size` elements."""
+
+    if size < 1:
+        raise ValueError("size must be at least 1")
+
+    batch: List[_T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+@overload
+def iter_prefetched(
+    tasks: Iterable[Callable[[], _T]], prefetch: int, return_exceptions: Literal[False] = False
+) -> Iterator[_T]: ...
+
+
+@overload
+def iter_prefetched(
+    tasks: Iterable[Callable[[], _T]], prefetch: int, return_exceptions: Literal[True]
+) -> Iterator[Union[_T, Exception]]: ...
+
+
+def iter_prefetched(
+    tasks: Iterable[Callable[[], _T]], prefetch: int, return_exceptions: bool = False
+) -> Iterator[Union[_T, Exception]]:
+    """Runs tasks in background threads and yields their results in order.
+
+    At most `prefetch` tasks run or wait to be consumed at any time, so a slow consumer stops new tasks from
+    starting. With `prefetch` lower than 1 every task runs on the caller thread when its result is requested.
+
+    Args:
+        tasks (Iterable[Callable[[], _T]]): Tasks to run. Consumed lazily.
+        prefetch (int): Max number of tasks to run ahead of the consumer.
+        return_exceptions (bool): Yield the exception raised by a task instead of raising it, so the remaining
+            tasks keep running.
+
+    Yields:
+        Union[_T, Exception]: Result of each task.
+    """
+
+    if prefetch < 1:
+        for task in tasks:
+            inline_result: Union[_T, Exception]
+            try:
+                inline_result = task()
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                inline_result = e
+            yield inline_result
+        return
+
+    pending: Deque[Future[_T]] = deque()
+    task_iter = iter(tasks)
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    try:
+        for task in task_iter:
+            pending.append(executor.submit(task))
+            if len(pending) >= prefetch:
+                break
+
+        while pending:
+            result: Union[_T, Exception]
+            try:
+                result = pending.popleft().result()
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                result = e
+
+            # Replace the consumed task before yielding, so the window stays full while the caller works
+            next_task: Optional[Callable[[], _T]] = next(task_iter, None)
+            if next_task is not None:
+                pending.append(executor.submit(next_task))
+            yield result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def path_matches(path: str, include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None) -> bool:
+    """Checks a path against `fnmatch` glob patterns. `*` also matches `/`.
+
+    Args:
+        path (str): Path to check.
+        include (Optional[Sequence[str]]): If set, the path must match at least one of these patterns.
+        exclude (Optional[Sequence[str]]): The path must not match any of these patterns.
+    """
+
+    if include and not any(fnmatch.fnmatchcase(path, pattern) for pattern in include):
+        return False
+
+    return not (exclude and any(fnmatch.fnmatchcase(path, pattern) for pattern in exclude))
+
+
+def iter_tar_files(
+    fileobj: Any,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    max_file_size: Optional[int] = None,
+    strip_components: int = 1,
+) -> Iterator[Tuple[str, bytes]]:
+    """Streams the regular files of a gzipped tarball, without extracting it to disk.
+
+    The archive is read sequentially, so `fileobj` could be a network stream. Only one file is kept in memory.
+
+    Args:
+        fileobj (Any): Gzipped tarball binary file-like object.
+        include (Optional[Sequence[str]]): Glob patterns of the paths to yield. All files if not set.
+        exclude (Optional[Sequence[str]]): Glob patterns of the paths to skip.
+        max_file_size (Optional[int]): Files bigger than this number of bytes are skipped.
+        strip_components (int): Number of leading path components to remove, like `tar --strip-components`.
+
+    Yields:
+        Tuple[str, bytes]: Path inside the archive and content of each file.
+    """
+
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+
+            parts = member.name.split("/")[strip_components:]
+            if not parts:
+                continue
+
+            path = "/".join(parts)
+            if max_file_size is not None and member.size > max_file_size:
+                continue
+
+            if not path_matches(path, include, exclude):
+                continue
+
+            file = archive.extractfile(member)
+            if file is None:
+                continue
+
+            yield path, file.read()
+
+
+class PathPrefixTrie:
+    """Set of folder paths that grants every path equal to or under one of them.
+
+    Paths are split on `/`, so `/a` covers `/a/b` but not `/ab`. Checking a path costs one step per component,
+    whatever the number of folders. Paths are compared as given, so normalize their case beforehand if needed.
+    """
+
+    _root: dict[str, Any]
+    _TERMINAL = "/"
+    """Child key marking the end of a folder path. Never a path component, as paths are split on it."""
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self._root = {}
+        for path in paths:
+            self.add(path)
+
+    def add(self, path: str) -> None:
+        """Adds a folder path."""
+
+        node = self._root
+        for part in PathPrefixTrie._split(path):
+            node = node.setdefault(part, {})
+        node[PathPrefixTrie._TERMINAL] = True
+
+    def remove(self, path: str) -> None:
+        """Removes a folder path. Paths under it stay covered if they were added themselves."""
+
+        nodes = [self._root]
+        parts = PathPrefixTrie._split(path)
+        for part in parts:
+            child = nodes[-1].get(part, None)
+            if child is None:
+                return
+            nodes.append(child)
+
+        nodes[-1].pop(PathPrefixTrie._TERMINAL, None)
+        # Prune the branches left empty
+        for part, node in zip(reversed(parts), reversed(nodes[:-1])):
+            if node[part]:
+                break
+            del node[part]
+
+    def matches(self, path: str) -> bool:
+        """Checks if a path is equal to or under one of the folder paths."""
+
+        node = self._root
+        if PathPrefixTrie._TERMINAL in node:
+            return True
+
+        for part in PathPrefixTrie._split(path):
+            child: Optional[dict[str, Any]] = node.get(part, None)
+            if child is None:
+                return False
+            if PathPrefixTrie._TERMINAL in child:
+                return True
+            node = child
+
+        return False
+
+    def roots(self) -> List[str]:
+        """Returns the smallest set of folder paths covering the same paths, i.e. without nested folders."""
+
+        roots: List[str] = []
+        stack: List[Tuple[str, dict[str, Any]]] = [("", self._root)]
+        while stack:
+            path, node = stack.pop()
+            if PathPrefixTrie._TERMINAL in node:
+                roots.append(path or "/")
+                continue
+
+            stack.extend((f"{path}/{part}", child) for part, child in node.items())
+
+        return sorted(roots)
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        return [part for part in path.split("/") if part]
+
+
 _loggers: Dict[str, bool] = {}
 
 
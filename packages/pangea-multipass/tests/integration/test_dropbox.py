@@ -48,3 +48,8 @@ class TestDropbox(unittest.TestCase):
             has_more_files = reader.has_more_files
 
         assert len(all_files) == _TOTAL_FILES
+
+    def test_dropbox_iter_documents(self) -> None:
+        reader = DropboxReader(token=self.access_token)
+        files = list(reader.iter_documents(prefetch=2, page_size=1))
+        assert len(files) == _TOTAL_FILES
@@ -1,7 +1,7 @@
 import os
 import unittest
 
-from pangea_multipass import GitHubProcessor, GitHubReader, get_document_metadata
+from pangea_multipass import GitHubProcessor, GitHubReader, PangeaMetadataKeys, get_document_metadata
 
 token = os.getenv("GITHUB_ADMIN_TOKEN") or ""
 username = os.getenv("GITHUB_USERNAME") or ""
@@ -45,3 +45,21 @@ class TestGitHub(unittest.TestCase):
                 assert len(files) == 1
 
         assert len(all_files) == _TOTAL_FILES
+
+    def test_github_iter_documents(self) -> None:
+        reader = GitHubReader(token=token)
+        files = list(reader.iter_documents(prefetch=0))
+        assert len(files) == _TOTAL_FILES
+
+        paths = [file.metadata[PangeaMetadataKeys.FILE_PATH] for file in files]
+        prefetched_paths = [file.metadata[PangeaMetadataKeys.FILE_PATH] for file in reader.iter_documents(prefetch=4)]
+        assert prefetched_paths == paths
+
+    def test_github_archive(self) -> None:
+        reader = GitHubReader(token=token)
+        files = list(reader.iter_archive_documents())
+        assert len(files) == _TOTAL_FILES
+
+        processor = GitHubProcessor(token=token, username=username, get_node_metadata=get_document_metadata)
+        authorized_files = processor.filter(files)
+        assert len(authorized_files) == _AUTHORIZED_FILES
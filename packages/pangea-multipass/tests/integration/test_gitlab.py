@@ -45,3 +45,13 @@ class TestGitLab(unittest.TestCase):
                 assert len(files) == 1
 
         assert len(all_files) == _TOTAL_FILES
+
+    def test_gitlab_iter_documents(self) -> None:
+        reader = GitLabReader(token=token)
+        files = list(reader.iter_documents(prefetch=2, page_size=1))
+        assert len(files) == _TOTAL_FILES
+
+    def test_gitlab_archive(self) -> None:
+        reader = GitLabReader(token=token)
+        files = list(reader.iter_archive_documents())
+        assert len(files) == _TOTAL_FILES
@@ -46,3 +46,8 @@ class TestSlack(unittest.TestCase):
                 has_more_messages = reader.has_more_messages
 
         assert len(documents) == _TOTAL_FILES
+
+    def test_slack_iter_documents(self) -> None:
+        reader = SlackReader(token=token)
+        documents = list(reader.iter_documents(prefetch=2))
+        assert len(documents) == _TOTAL_FILES
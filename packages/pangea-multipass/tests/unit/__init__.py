@@ -0,0 +1,15 @@
+from .test_acl_snapshot import TestAclSnapshotStore
+from .test_cache import TestInMemoryAuthorizationCache, TestSQLiteAuthorizationCache
+from .test_confluence import TestConfluencePagesAccess, TestConfluenceRestrictionResolver
+from .test_core import TestAsyncPangeaNodeProcessorMixer, TestPangeaNodeProcessorMixer
+from .test_dropbox import TestDropboxPrefixFilter
+from .test_gdrive import TestGDriveBatches, TestGDriveProcessorCache, TestGDriveUserGroups
+from .test_github import TestGitHubClientAccess, TestGitHubProcessorSnapshots
+from .test_github_reader import TestGitHubReader
+from .test_gitlab import TestGitLabProcessorSnapshots
+from .test_http_cache import TestConditionalRequests, TestHttpResponseCache
+from .test_jira import TestJiraProcessorSnapshots
+from .test_rate_limit import TestRateLimitScheduler, TestTokenBucket
+from .test_slack import TestSlackMembershipIndex
+from .test_transport import TestRateLimitedTransport
+from .test_utils import TestBatched, TestIterPrefetched, TestIterTarFiles, TestPathPrefixTrie
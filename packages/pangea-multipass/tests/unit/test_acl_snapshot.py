@@ -0,0 +1,84 @@
+import unittest
+from typing import Any, List, Optional, Tuple
+from unittest import mock
+
+from pangea_multipass import AclDelta, AclSnapshotStore
+
+
+class TestAclSnapshotStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1_000_000.0
+        patcher = mock.patch("pangea_multipass.acl_snapshot.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.store = AclSnapshotStore(full_sync_interval=3600, min_sync_interval=60)
+        self.full_syncs = 0
+        self.cursors: List[str] = []
+        self.ids: List[Any] = ["a", "b"]
+        self.delta: Optional[AclDelta] = None
+
+    def _full_sync(self) -> Tuple[List[Any], Optional[str]]:
+        self.full_syncs += 1
+        return list(self.ids), f"cursor-{self.full_syncs}"
+
+    def _delta_sync(self, cursor: str) -> Optional[AclDelta]:
+        self.cursors.append(cursor)
+        return self.delta
+
+    def _sync(self, principal: str = "user") -> List[Any]:
+        return self.store.sync("gdrive", principal, self._full_sync, self._delta_sync)
+
+    def test_delta(self) -> None:
+        self.assertEqual(self._sync(), ["a", "b"])
+
+        self.now += 61
+        self.delta = AclDelta(added=["c", "a"], removed=["b"], cursor="cursor-delta")
+        self.assertEqual(self._sync(), ["a", "c"])
+        self.assertEqual(self.cursors, ["cursor-1"])
+        self.assertEqual(self.full_syncs, 1)
+
+        self.now += 61
+        self.delta = AclDelta(added=[], removed=[], cursor="cursor-next")
+        self._sync()
+        self.assertEqual(self.cursors, ["cursor-1", "cursor-delta"])
+
+    def test_min_sync_interval(self) -> None:
+        self._sync()
+        self.now += 30
+        self._sync()
+        self.assertEqual((self.full_syncs, self.cursors), (1, []))
+
+    def test_full_sync_interval(self) -> None:
+        self._sync()
+        self.now += 3601
+        self.ids = ["z"]
+        self.assertEqual(self._sync(), ["z"])
+        self.assertEqual((self.full_syncs, self.cursors), (2, []))
+
+    def test_full_sync_interval_override(self) -> None:
+        self.store.sync("jira", "user", self._full_sync, self._delta_sync, full_sync_interval=600)
+        self.now += 601
+        self.store.sync("jira", "user", self._full_sync, self._delta_sync, full_sync_interval=600)
+        self.assertEqual(self.full_syncs, 2)
+
+    def test_delta_failure(self) -> None:
+        self._sync()
+        self.now += 61
+        self.delta = None
+        self._sync()
+        self.assertEqual(self.full_syncs, 2)
+
+    def test_principals(self) -> None:
+        self._sync("a")
+        self.ids = ["x"]
+        self.assertEqual(self._sync("b"), ["x"])
+        self.assertEqual(self._sync("a"), ["a", "b"])
+
+    def test_tuple_ids(self) -> None:
+        self.ids = [("repo", 1), ("repo", 2)]
+        self._sync()
+        self.now += 61
+        # JSON backends save tuples as lists
+        self.delta = AclDelta(added=[["repo", 1]], removed=[["repo", 2]], cursor="cursor-delta")
+        self.assertEqual(self._sync(), [("repo", 1)])
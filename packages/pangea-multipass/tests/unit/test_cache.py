@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Any
+from unittest import mock
+
+from pangea_multipass import AuthorizationCache, InMemoryAuthorizationCache, SQLiteAuthorizationCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class _CacheTests(unittest.TestCase):
+    """Tests shared by every `AuthorizationCache` backend. Subclasses implement `new_cache()`."""
+
+    clock: _Clock
+
+    def new_cache(self, **kwargs: Any) -> AuthorizationCache:
+        raise NotImplementedError
+
+    def setUp(self) -> None:
+        if type(self) is _CacheTests:
+            self.skipTest("abstract")
+
+        self.clock = _Clock()
+        patcher = mock.patch("pangea_multipass.cache.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_set_delete(self) -> None:
+        cache = self.new_cache()
+        self.assertIsNone(cache.get("jira", "user", "1"))
+        cache.set("jira", "user", "1", True)
+        self.assertEqual(cache.get("jira", "user", "1"), True)
+        self.assertIsNone(cache.get("jira", "other", "1"))
+        self.assertIsNone(cache.get("slack", "user", "1"))
+
+        cache.delete("jira", "user", "1")
+        self.assertIsNone(cache.get("jira", "user", "1"))
+
+    def test_ttl_expiry(self) -> None:
+        cache = self.new_cache(default_ttl=10)
+        cache.set("jira", "user", "default", 1)
+        cache.set("jira", "user", "short", 2, ttl=5)
+        self.clock.now += 6
+        self.assertIsNone(cache.get("jira", "user", "short"))
+        self.assertEqual(cache.get("jira", "user", "default"), 1)
+        self.clock.now += 5
+        self.assertIsNone(cache.get("jira", "user", "default"))
+
+    def test_set_many_get_many(self) -> None:
+        cache = self.new_cache()
+        cache.set_many("jira", "user", {"1": True, "2": False, "3": {"groups": ["a"]}}, ttl=5)
+        values = cache.get_many("jira", "user", ["1", "2", "3", "4", "1"])
+        self.assertEqual(values, {"1": True, "2": False, "3": {"groups": ["a"]}})
+        self.assertEqual(cache.get_many("jira", "other", ["1"]), {})
+
+        self.clock.now += 6
+        self.assertEqual(cache.get_many("jira", "user", ["1", "2", "3"]), {})
+
+    def test_clear(self) -> None:
+        cache = self.new_cache()
+        cache.set_many("jira", "user", {"1": True, "2": True})
+        cache.clear()
+        self.assertEqual(cache.get_many("jira", "user", ["1", "2"]), {})
+
+
+class TestInMemoryAuthorizationCache(_CacheTests):
+    def new_cache(self, **kwargs: Any) -> AuthorizationCache:
+        return InMemoryAuthorizationCache(**kwargs)
+
+    def test_lru_eviction(self) -> None:
+        cache = InMemoryAuthorizationCache(max_entries=2)
+        cache.set("jira", "user", "1", 1)
+        cache.set("jira", "user", "2", 2)
+        cache.get("jira", "user", "1")
+        cache.set("jira", "user", "3", 3)
+        self.assertEqual(cache.get_many("jira", "user", ["1", "2", "3"]), {"1": 1, "3": 3})
+
+
+class TestSQLiteAuthorizationCache(_CacheTests):
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filepath = os.path.join(directory.name, "cache.db")
+
+    def new_cache(self, **kwargs: Any) -> AuthorizationCache:
+        return SQLiteAuthorizationCache(filepath=self.filepath, **kwargs)
+
+    def test_persistence(self) -> None:
+        self.new_cache().set("jira", "user", "1", [1, 2])
+        self.assertEqual(self.new_cache().get("jira", "user", "1"), [1, 2])
+
+    def test_lru_eviction(self) -> None:
+        cache = SQLiteAuthorizationCache(filepath=self.filepath, max_entries=60, touch_interval=0)
+        cache.set_many("jira", "user", {str(i): i for i in range(60)})
+        self.clock.now += 1
+        cache.get("jira", "user", "0")
+        self.clock.now += 1
+        # Eviction is checked every 100 writes
+        cache.set_many("jira", "user", {str(i): i for i in range(60, 100)})
+
+        values = cache.get_many("jira", "user", [str(i) for i in range(100)])
+        self.assertEqual(len(values), 60)
+        self.assertIn("0", values)
+        self.assertNotIn("1", values)
+        self.assertIn("99", values)
+
+    def test_reads_touch_once_per_interval(self) -> None:
+        cache = SQLiteAuthorizationCache(filepath=self.filepath, touch_interval=60)
+        cache.set("jira", "user", "1", True)
+        statements: list[str] = []
+        cache._connection().set_trace_callback(statements.append)
+
+        self.clock.now += 30
+        self.assertEqual(cache.get("jira", "user", "1"), True)
+        self.assertFalse([statement for statement in statements if statement.startswith("UPDATE")])
+
+        self.clock.now += 31
+        self.assertEqual(cache.get("jira", "user", "1"), True)
+        self.assertEqual(len([statement for statement in statements if statement.startswith("UPDATE")]), 1)
+
+        with sqlite3.connect(self.filepath) as conn:
+            (accessed_at,) = conn.execute("SELECT accessed_at FROM authz_cache").fetchone()
+        self.assertEqual(accessed_at, self.clock.now)
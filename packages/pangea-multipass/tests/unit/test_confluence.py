@@ -0,0 +1,223 @@
+import json
+import unittest
+from typing import Any, List, Optional
+from unittest import mock
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from pangea_multipass import (
+    ConfluenceAuth,
+    ConfluenceProcessor,
+    ConfluenceRestrictionResolver,
+    HttpTransport,
+    PangeaMetadataKeys,
+    PangeaMetadataValues,
+)
+from pangea_multipass.sources.confluence.confluence import ConfluenceAPI
+
+_AUTH = ConfluenceAuth("admin@example.com", "token", "https://example.atlassian.net")
+
+# Parent and read restrictions (users, groups) of each page. Pages 3 and 4 are children of the restricted page 2
+_PAGES: dict[str, tuple[Optional[str], List[str], List[str]]] = {
+    "1": (None, [], []),
+    "2": ("1", ["alice"], ["admins"]),
+    "3": ("2", [], []),
+    "4": ("2", [], []),
+    "5": ("1", [], []),
+}
+_GROUPS = {"admins": ["bob"]}
+_SEARCH_URL = f"{_AUTH.url}/wiki/rest/api/content/search"
+
+
+def _restrictions(page_id: str) -> dict[str, Any]:
+    _, users, groups = _PAGES[page_id]
+    return {
+        "read": {
+            "restrictions": {
+                "user": {"results": [{"accountId": user} for user in users], "size": len(users)},
+                "group": {"results": [{"id": group} for group in groups], "size": len(groups)},
+            }
+        }
+    }
+
+
+class TestConfluenceRestrictionResolver(unittest.TestCase):
+    def setUp(self) -> None:
+        self.resolver = ConfluenceRestrictionResolver(_AUTH)
+        self.details_requests: List[str] = []
+        self.restrictions_requests: List[str] = []
+        self.group_requests: List[str] = []
+
+    def _get_page_details(self, auth: Any, url: str, page_id: str, transport: Any = None, expand: str = "") -> Any:
+        self.details_requests.append(page_id)
+        ancestors: List[dict[str, str]] = []
+        parent = _PAGES[page_id][0]
+        while parent is not None:
+            ancestors.insert(0, {"id": parent})
+            parent = _PAGES[parent][0]
+
+        return {"id": page_id, "ancestors": ancestors, "restrictions": _restrictions(page_id)}
+
+    def _get_page_restrictions(self, auth: Any, url: str, page_id: str, transport: Any = None) -> Any:
+        self.restrictions_requests.append(page_id)
+        return _restrictions(page_id)
+
+    def _get_group_members(self, auth: Any, url: str, group_id: str, transport: Any = None) -> List[str]:
+        self.group_requests.append(group_id)
+        return _GROUPS[group_id]
+
+    def _patch(self) -> Any:
+        return mock.patch.multiple(
+            ConfluenceAPI,
+            get_page_details=self._get_page_details,
+            get_page_restrictions=self._get_page_restrictions,
+            get_group_members=self._get_group_members,
+        )
+
+    def test_unrestricted_chain(self) -> None:
+        with self._patch():
+            self.assertTrue(self.resolver.check_user_access("5", "carol"))
+
+        self.assertEqual(self.details_requests, ["5"])
+        self.assertEqual(self.restrictions_requests, ["1"])
+
+    def test_restricted_parent(self) -> None:
+        with self._patch():
+            self.assertTrue(self.resolver.check_user_access("3", "alice"))
+            self.assertFalse(self.resolver.check_user_access("3", "carol"))
+
+        # The restricted parent decides, the root is not checked
+        self.assertEqual(self.restrictions_requests, ["2"])
+
+    def test_group_access(self) -> None:
+        with self._patch():
+            self.assertTrue(self.resolver.check_user_access("3", "bob"))
+            self.assertTrue(self.resolver.check_user_access("2", "bob"))
+
+        self.assertEqual(self.group_requests, ["admins"])
+
+    def test_siblings_reuse_ancestors(self) -> None:
+        with self._patch():
+            self.assertTrue(self.resolver.check_user_access("3", "bob"))
+            self.assertTrue(self.resolver.check_user_access("4", "bob"))
+            self.assertFalse(self.resolver.check_user_access("4", "carol"))
+
+        self.assertEqual(self.details_requests, ["3", "4"])
+        self.assertEqual(self.restrictions_requests, ["2"])
+        self.assertEqual(self.group_requests, ["admins"])
+
+    def test_ttl(self) -> None:
+        now = 1000.0
+        with self._patch(), mock.patch("pangea_multipass.cache.time.time", lambda: now):
+            self.resolver.check_user_access("3", "bob")
+            now += self.resolver.ttl
+            self.resolver.check_user_access("3", "bob")
+
+        self.assertEqual(self.details_requests, ["3", "3"])
+        self.assertEqual(self.group_requests, ["admins", "admins"])
+
+
+class _SearchTransport(HttpTransport):
+    """Answers CQL content searches with the visible pages, `page_size` per response, after failing `failures` times."""
+
+    def __init__(self, visible: set[str], page_size: int = 100, failures: int = 0):
+        super().__init__()
+        self.visible = visible
+        self.page_size = page_size
+        self.failures = failures
+        self.requests: List[tuple[str, Optional[dict[str, Any]]]] = []
+        self._pending: dict[str, List[str]] = {}
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        params: Optional[dict[str, Any]] = kwargs.get("params", None)
+        self.requests.append((url, params))
+        response = requests.Response()
+        response.url = url
+        if self.failures:
+            self.failures -= 1
+            response.status_code = 500
+            return response
+
+        if params is not None:
+            ids = params["cql"].removeprefix("id in (").removesuffix(")").split(",")
+            found = [id for id in ids if id in self.visible]
+        else:
+            found = self._pending.pop(url)
+
+        body: dict[str, Any] = {
+            "results": [{"id": id} for id in found[: self.page_size]],
+            "_links": {"base": f"{_AUTH.url}/wiki"},
+        }
+        if len(found) > self.page_size:
+            next_link = f"/rest/api/content/search?cursor={len(self.requests)}"
+            self._pending[f"{_AUTH.url}/wiki{next_link}"] = found[self.page_size :]
+            body["_links"]["next"] = next_link
+
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+
+class TestConfluencePagesAccess(unittest.TestCase):
+    def _check(self, transport: _SearchTransport, page_ids: List[str]) -> dict[str, bool]:
+        return ConfluenceAPI.check_pages_access(HTTPBasicAuth(_AUTH.email, _AUTH.token), _AUTH.url, page_ids, transport)
+
+    def test_chunks(self) -> None:
+        page_ids = [str(i) for i in range(1, 121)]
+        transport = _SearchTransport({id for id in page_ids if int(id) % 2 == 0})
+        access = self._check(transport, page_ids)
+
+        self.assertEqual(access, {id: int(id) % 2 == 0 for id in page_ids})
+        self.assertEqual([url for url, _ in transport.requests], [_SEARCH_URL] * 3)
+        self.assertEqual(
+            [params["cql"] if params else None for _, params in transport.requests],
+            [f"id in ({','.join(chunk)})" for chunk in (page_ids[:50], page_ids[50:100], page_ids[100:])],
+        )
+        self.assertEqual([params["limit"] if params else None for _, params in transport.requests], [50, 50, 20])
+
+    def test_next_links(self) -> None:
+        page_ids = [str(i) for i in range(1, 31)]
+        transport = _SearchTransport(set(page_ids[:25]), page_size=10)
+        access = self._check(transport, page_ids)
+
+        self.assertEqual(access, {id: int(id) <= 25 for id in page_ids})
+        urls = [url for url, _ in transport.requests]
+        self.assertEqual(urls[0], _SEARCH_URL)
+        self.assertEqual(urls[1:], [f"{_AUTH.url}/wiki/rest/api/content/search?cursor={i}" for i in (1, 2)])
+        self.assertEqual([params for _, params in transport.requests[1:]], [None, None])
+
+    def test_invalid_ids(self) -> None:
+        page_ids = ["1", "2) or id > (0", "", "2"]
+        transport = _SearchTransport({"1", "2"})
+        access = self._check(transport, page_ids)
+
+        self.assertEqual(access, {"1": True, "2) or id > (0": False, "": False, "2": True})
+        self.assertEqual([params["cql"] if params else None for _, params in transport.requests], ["id in (1,2)"])
+
+    def test_only_invalid_ids(self) -> None:
+        transport = _SearchTransport(set())
+        self.assertEqual(self._check(transport, ["abc"]), {"abc": False})
+        self.assertEqual(transport.requests, [])
+
+    def test_processor_error_not_cached(self) -> None:
+        transport = _SearchTransport({"1"}, failures=1)
+        processor = ConfluenceProcessor[dict[str, Any]](_AUTH, lambda node: node, transport=transport)
+        nodes: List[dict[str, Any]] = [
+            {
+                PangeaMetadataKeys.DATA_SOURCE: PangeaMetadataValues.DATA_SOURCE_CONFLUENCE,
+                PangeaMetadataKeys.CONFLUENCE_PAGE_ID: id,
+            }
+            for id in ("1", "2")
+        ]
+
+        self.assertEqual(processor.filter(nodes), [])
+        principal = processor._get_principal()
+        self.assertEqual(
+            processor._cache.get_many(PangeaMetadataValues.DATA_SOURCE_CONFLUENCE, principal, ["1", "2"]), {}
+        )
+
+        # Checked again after the failed search, then served from the cache
+        self.assertEqual(processor.filter(nodes), nodes[:1])
+        self.assertEqual(processor.filter(nodes), nodes[:1])
+        self.assertEqual(len(transport.requests), 2)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from pangea_multipass import (
+    AsyncPangeaGenericNodeProcessor,
+    AsyncPangeaNodeProcessorMixer,
+    FilterOperator,
+    MetadataFilter,
+    PangeaGenericNodeProcessor,
+    PangeaMetadataKeys,
+    PangeaMetadataValues,
+    PangeaNodeProcessorMixer,
+)
+
+Node = dict[str, Any]
+
+
+def _node(id: str, source: Optional[str] = None) -> Node:
+    node: Node = {PangeaMetadataKeys.NODE_ID: id}
+    if source is not None:
+        node[PangeaMetadataKeys.DATA_SOURCE] = source
+
+    return node
+
+
+class _Processor(PangeaGenericNodeProcessor[Node]):
+    """Authorizes the nodes with the given IDs and records the nodes it was called with."""
+
+    def __init__(self, authorized_ids: List[str], data_source: Optional[str] = None):
+        self._data_source = data_source
+        self.authorized_ids = authorized_ids
+        self.calls: List[List[str]] = []
+
+    def filter(self, nodes: List[Node]) -> List[Node]:
+        self.calls.append([node[PangeaMetadataKeys.NODE_ID] for node in nodes])
+        return [node for node in nodes if node[PangeaMetadataKeys.NODE_ID] in self.authorized_ids]
+
+    def get_filter(self) -> MetadataFilter:
+        return MetadataFilter(key="id", value=self.authorized_ids, operator=FilterOperator.IN)
+
+
+class _AsyncProcessor(AsyncPangeaGenericNodeProcessor[Node]):
+    """Authorizes the nodes with the given IDs without a worker thread."""
+
+    def __init__(self, authorized_ids: List[str], data_source: Optional[str] = None):
+        self._data_source = data_source
+        self.authorized_ids = authorized_ids
+
+    async def afilter(self, nodes: List[Node]) -> List[Node]:
+        await asyncio.sleep(0)
+        return [node for node in nodes if node[PangeaMetadataKeys.NODE_ID] in self.authorized_ids]
+
+    async def aget_filter(self) -> MetadataFilter:
+        return MetadataFilter(key="id", value=self.authorized_ids, operator=FilterOperator.IN)
+
+
+class TestPangeaNodeProcessorMixer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.nodes = [
+            _node("a", PangeaMetadataValues.DATA_SOURCE_JIRA),
+            _node("b"),
+            _node("c", PangeaMetadataValues.DATA_SOURCE_SLACK),
+            _node("d"),
+            _node("e", PangeaMetadataValues.DATA_SOURCE_JIRA),
+        ]
+        self.jira = _Processor(["a", "b"], PangeaMetadataValues.DATA_SOURCE_JIRA)
+        self.slack = _Processor(["c"], PangeaMetadataValues.DATA_SOURCE_SLACK)
+        self.any = _Processor(["d"])
+
+    def _mixer(self, concurrent: bool = False) -> PangeaNodeProcessorMixer[Node]:
+        return PangeaNodeProcessorMixer(lambda node: node, [self.jira, self.slack, self.any], concurrent=concurrent)
+
+    def _assert_partitioned(self, mixer: PangeaNodeProcessorMixer[Node], authorized: List[Node]) -> None:
+        self.assertEqual([node[PangeaMetadataKeys.NODE_ID] for node in authorized], ["a", "c", "d"])
+        self.assertEqual([node[PangeaMetadataKeys.NODE_ID] for node in mixer.get_unauthorized_nodes()], ["b", "e"])
+        self.assertEqual(self.jira.calls, [["a", "e"]])
+        self.assertEqual(self.slack.calls, [["c"]])
+        self.assertEqual(self.any.calls, [["a", "b", "c", "d", "e"]])
+
+    def test_filter(self) -> None:
+        # Sequential mode gives every processor the nodes not authorized yet, whatever their source
+        mixer = self._mixer()
+        authorized = mixer.filter(self.nodes)
+        self.assertEqual([node[PangeaMetadataKeys.NODE_ID] for node in authorized], ["a", "b", "c", "d"])
+        self.assertEqual([node[PangeaMetadataKeys.NODE_ID] for node in mixer.get_unauthorized_nodes()], ["e"])
+        self.assertEqual(self.slack.calls, [["c", "d", "e"]])
+
+    def test_filter_concurrent(self) -> None:
+        mixer = self._mixer(concurrent=True)
+        self._assert_partitioned(mixer, mixer.filter(self.nodes))
+
+    def test_afilter(self) -> None:
+        mixer = self._mixer()
+        self._assert_partitioned(mixer, asyncio.run(mixer.afilter(self.nodes)))
+
+    def test_filter_concurrent_without_data_source(self) -> None:
+        mixer = PangeaNodeProcessorMixer(lambda node: node, [self.any], concurrent=True)
+        authorized = mixer.filter([_node("d")])
+        self.assertEqual(authorized, [_node("d")])
+
+    def test_filter_concurrent_without_matching_processor(self) -> None:
+        mixer = PangeaNodeProcessorMixer(lambda node: node, [self.slack], concurrent=True)
+        self.assertEqual(mixer.filter([_node("a", PangeaMetadataValues.DATA_SOURCE_JIRA), _node("b")]), [])
+        self.assertEqual(self.slack.calls, [])
+        self.assertEqual(len(mixer.get_unauthorized_nodes()), 2)
+
+    def test_filter_concurrent_reuses_executor(self) -> None:
+        threads: List[int] = []
+
+        class _ThreadProcessor(_Processor):
+            def filter(self, nodes: List[Node]) -> List[Node]:
+                threads.append(threading.get_ident())
+                return super().filter(nodes)
+
+        mixer = PangeaNodeProcessorMixer(lambda node: node, [_ThreadProcessor(["a"])], concurrent=True)
+        mixer.filter([_node("a")])
+        mixer.filter([_node("a")])
+        self.assertEqual(len(threads), 2)
+        self.assertEqual(threads[0], threads[1])
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+        mixer.close()
+        mixer.filter([_node("a")])
+        mixer.close()
+
+    def test_filter_concurrent_given_executor(self) -> None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            mixer = PangeaNodeProcessorMixer(lambda node: node, [self.any], concurrent=True, executor=executor)
+            self.assertEqual(mixer.filter([_node("d")]), [_node("d")])
+            mixer.close()
+            # The executor belongs to the caller, so it is still usable
+            self.assertEqual(executor.submit(lambda: 1).result(), 1)
+
+    def test_missing_node_id(self) -> None:
+        mixer = self._mixer(concurrent=True)
+        with self.assertRaises(Exception):
+            mixer.filter([{}])
+
+
+class TestAsyncPangeaNodeProcessorMixer(unittest.TestCase):
+    def test_afilter_without_data_source(self) -> None:
+        mixer = AsyncPangeaNodeProcessorMixer(lambda node: node, [_AsyncProcessor(["a"])])
+        authorized = asyncio.run(asyncio.wait_for(mixer.afilter([_node("a"), _node("b")]), timeout=5))
+        self.assertEqual(authorized, [_node("a")])
+        self.assertEqual(mixer.get_unauthorized_nodes(), [_node("b")])
+
+    def test_afilter_mixed_sources(self) -> None:
+        mixer = AsyncPangeaNodeProcessorMixer(
+            lambda node: node,
+            [_AsyncProcessor(["a", "b"], PangeaMetadataValues.DATA_SOURCE_JIRA), _AsyncProcessor(["c"])],
+        )
+        nodes = [_node("a", PangeaMetadataValues.DATA_SOURCE_JIRA), _node("b"), _node("c")]
+        authorized = asyncio.run(asyncio.wait_for(mixer.afilter(nodes), timeout=5))
+        self.assertEqual([node[PangeaMetadataKeys.NODE_ID] for node in authorized], ["a", "c"])
+
+    def test_aget_filters(self) -> None:
+        mixer = AsyncPangeaNodeProcessorMixer(lambda node: node, [_AsyncProcessor(["a"]), _AsyncProcessor(["b"])])
+        filters = asyncio.run(mixer.aget_filters())
+        self.assertEqual([filter.value for filter in filters], [["a"], ["b"]])
@@ -0,0 +1,61 @@
+import unittest
+from typing import Any, List
+from unittest import mock
+
+from pangea_multipass import DropboxAclIndex, DropboxProcessor, FilterOperator, HttpTransport
+
+
+def _node(path: str) -> dict[str, Any]:
+    return {"_pangea_data_source": "dropbox", "_pangea_file_path": path}
+
+
+class TestDropboxPrefixFilter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.shared_folders = ["/Team", "/Projects/Alpha"]
+        self.processor: DropboxProcessor[Any] = DropboxProcessor(
+            "token", "user@example.com", lambda node: node, transport=HttpTransport(), use_prefix_filter=True
+        )
+        self.checks: List[str] = []
+
+        def check_user_access(token: str, file_path: str, user_email: str) -> bool:
+            self.checks.append(file_path)
+            return False
+
+        for name, value in (
+            ("list_shared_folders", lambda token, user_email: list(self.shared_folders)),
+            ("check_user_access", check_user_access),
+        ):
+            patcher = mock.patch.object(self.processor._client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_prefix_filter(self) -> None:
+        filter = self.processor.get_filter()
+        self.assertEqual(filter.operator, FilterOperator.PREFIX)
+        self.assertEqual(filter.value, ["/projects/alpha", "/team"])
+
+        nodes = [_node("/Team/a.txt"), _node("/Projects/Alpha/b/c.txt"), _node("/Projects/Beta/d.txt")]
+        self.assertEqual(self.processor.filter(nodes), nodes[:2])
+        self.assertEqual(self.checks, ["/Projects/Beta/d.txt"])
+
+    def test_revoked_folder(self) -> None:
+        self.processor.get_filter()
+        self.shared_folders = ["/Projects/Alpha", "/Projects/Beta"]
+        self.assertEqual(self.processor.get_filter().value, ["/projects/alpha", "/projects/beta"])
+
+        nodes = [_node("/Team/a.txt"), _node("/Projects/Beta/d.txt")]
+        self.assertEqual(self.processor.filter(nodes), nodes[1:])
+        self.assertEqual(self.checks, ["/Team/a.txt"])
+
+    def test_acl_index(self) -> None:
+        index = mock.Mock(spec=DropboxAclIndex)
+        index.get_user_folders.return_value = ["/Team"]
+        index.has_access.return_value = False
+        processor: DropboxProcessor[Any] = DropboxProcessor(
+            "token", "user@example.com", lambda node: node, acl_index=index, use_prefix_filter=True
+        )
+        self.assertEqual(processor.get_filter().value, ["/team"])
+
+        index.get_user_folders.return_value = []
+        self.assertEqual(processor.get_filter().value, [])
+        self.assertEqual(processor.filter([_node("/Team/a.txt")]), [])
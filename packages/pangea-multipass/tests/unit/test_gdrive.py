@@ -0,0 +1,141 @@
+import unittest
+from typing import Any, Callable, List, Optional
+from unittest import mock
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from pangea_multipass import GDriveAPI, GDriveProcessor, InMemoryAuthorizationCache
+
+_CREDS = Credentials(token="token")
+
+Callback = Callable[[str, Optional[dict[str, Any]], Optional[Exception]], None]
+
+
+class _Batch:
+    def __init__(self, service: "_Service", callback: Callback):
+        self.service = service
+        self.callback = callback
+        self.file_ids: List[str] = []
+
+    def add(self, request: Any, request_id: str) -> None:
+        self.file_ids.append(request_id)
+
+    def execute(self) -> None:
+        self.service.executed.append(list(self.file_ids))
+        if self.service.failures:
+            raise self.service.failures.pop(0)
+
+        for file_id in self.file_ids:
+            permissions = self.service.permissions_by_file.get(file_id, [])
+            self.callback(file_id, {"permissions": permissions}, None)
+
+
+class _Service:
+    """Drive service whose batch requests answer with the given permissions, after raising the given errors."""
+
+    def __init__(self, permissions_by_file: dict[str, List[dict[str, Any]]], failures: List[Exception]):
+        self.permissions_by_file = permissions_by_file
+        self.failures = failures
+        self.executed: List[List[str]] = []
+
+    def permissions(self) -> "_Service":
+        return self
+
+    def list(self, **kwargs: Any) -> None:
+        return None
+
+    def new_batch_http_request(self, callback: Callback) -> _Batch:
+        return _Batch(self, callback)
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(Response({"status": status}), b"")
+
+
+class TestGDriveBatches(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("pangea_multipass.sources.gdrive.gdrive.time.sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.permissions = {
+            "1": [{"type": "user", "emailAddress": "user@example.com", "role": "reader"}],
+            "2": [{"type": "group", "emailAddress": "team@example.com", "role": "writer"}],
+        }
+
+    def test_batch_request_errors_retried(self) -> None:
+        service = _Service(self.permissions, [_http_error(503), ConnectionResetError()])
+        levels = GDriveAPI.check_users_access(_CREDS, ["1", "2"], "user@example.com", ["team@example.com"], service)
+        self.assertEqual(levels, {"1": "reader", "2": "writer"})
+        self.assertEqual(service.executed, [["1", "2"]] * 3)
+
+    def test_batch_request_errors_exhausted(self) -> None:
+        service = _Service(self.permissions, [_http_error(500)] * (GDriveAPI._NUM_RETRIES + 1))
+        self.assertEqual(GDriveAPI.check_users_access(_CREDS, ["1", "2"], "user@example.com", service=service), {})
+
+    def test_batch_request_permanent_error(self) -> None:
+        service = _Service(self.permissions, [_http_error(403)])
+        with self.assertRaises(HttpError):
+            GDriveAPI.check_users_access(_CREDS, ["1"], "user@example.com", service=service)
+
+
+class TestGDriveProcessorCache(unittest.TestCase):
+    def test_principal_includes_groups(self) -> None:
+        cache = InMemoryAuthorizationCache()
+        node = {"_pangea_data_source": "gdrive", "_pangea_gdrive_file_id": "2"}
+        service = _Service({"2": [{"type": "group", "emailAddress": "team@example.com", "role": "reader"}]}, [])
+
+        def processor(groups: Optional[List[str]]) -> GDriveProcessor[Any]:
+            return GDriveProcessor(
+                _CREDS, lambda node: node, user_email="user@example.com", cache=cache, user_groups=groups
+            )
+
+        with mock.patch.object(GDriveAPI, "get_service", lambda creds: service):
+            self.assertEqual(processor(["Team@example.com"]).filter([node]), [node])
+            self.assertEqual(processor(None).filter([node]), [])
+            self.assertEqual(processor(["team@example.com"]).filter([node]), [node])
+
+        self.assertEqual(len(service.executed), 2)
+        self.assertEqual(
+            processor(["b@example.com", "a@example.com"])._get_principal(),
+            processor(["a@example.com", "b@example.com"])._get_principal(),
+        )
+
+
+class _Groups:
+    """Directory service answering group listings with the given pages, after raising the given errors."""
+
+    def __init__(self, pages: List[dict[str, Any]], failures: List[Exception]):
+        self.pages = pages
+        self.failures = failures
+        self.page_tokens: List[Optional[str]] = []
+
+    def groups(self) -> "_Groups":
+        return self
+
+    def list(self, userKey: str, pageToken: Optional[str] = None) -> "_Groups":
+        self.page_tokens.append(pageToken)
+        return self
+
+    def execute(self, num_retries: int = 0) -> dict[str, Any]:
+        if self.failures:
+            raise self.failures.pop(0)
+
+        return self.pages.pop(0)
+
+
+class TestGDriveUserGroups(unittest.TestCase):
+    def test_get_user_groups(self) -> None:
+        service = _Groups([{"groups": [{"email": "a@example.com"}], "nextPageToken": "p2"}, {"groups": [{}]}], [])
+        with mock.patch.object(GDriveAPI, "get_service", lambda creds, name, version: service):
+            self.assertEqual(GDriveAPI.get_user_groups(_CREDS, "user@example.com"), ["a@example.com"])
+
+        self.assertEqual(service.page_tokens, [None, "p2"])
+
+    def test_get_user_groups_error(self) -> None:
+        service = _Groups([], [_http_error(403)])
+        with mock.patch.object(GDriveAPI, "get_service", lambda creds, name, version: service):
+            with self.assertRaises(HttpError):
+                GDriveAPI.get_user_groups(_CREDS, "user@example.com")
@@ -0,0 +1,204 @@
+import json
+import re
+import unittest
+from typing import Any, List, Optional, Tuple
+from unittest import mock
+
+from pangea_multipass import AclSnapshotStore, GitHubClient, GitHubProcessor, HttpTransport
+
+Repo = Tuple[str, str]
+
+
+class TestGitHubProcessorSnapshots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1_000_000.0
+        patcher = mock.patch("pangea_multipass.acl_snapshot.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.access = {("owner", "a"): True, ("owner", "b"): True, ("owner", "c"): False}
+        self.checked: List[List[Repo]] = []
+        self.full_syncs = 0
+        self.processor: GitHubProcessor[Any] = GitHubProcessor(
+            "token",
+            lambda node: node,
+            username="user",
+            transport=HttpTransport(),
+            snapshot_store=AclSnapshotStore(min_sync_interval=0),
+        )
+
+        def get_repos_access(token: str, username: Optional[str] = None) -> dict[Repo, bool]:
+            self.full_syncs += 1
+            return dict(self.access)
+
+        def check_repos_access(token: str, repos: List[Repo], username: Optional[str] = None) -> dict[Repo, bool]:
+            self.checked.append(list(repos))
+            return {repo: self.access.get(repo, False) for repo in repos}
+
+        methods: dict[str, Any] = {
+            "get_repos_access": get_repos_access,
+            "check_repos_access": check_repos_access,
+            # Collaborator changes do not update the repositories
+            "get_user_repos": lambda token, since=None: [],
+        }
+        for name, value in methods.items():
+            patcher = mock.patch.object(self.processor._client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get_filter(self) -> List[Repo]:
+        return self.processor.get_filter().value
+
+    def test_revoked_repository_removed_on_delta(self) -> None:
+        self.assertEqual(self._get_filter(), [("owner", "a"), ("owner", "b")])
+
+        self.access[("owner", "b")] = False
+        self.now += 60
+        self.assertEqual(self._get_filter(), [("owner", "a")])
+        self.assertEqual(self.checked, [[("owner", "a"), ("owner", "b")]])
+        self.assertEqual(self.full_syncs, 1)
+
+    def test_granted_repository_added_after_full_sync_interval(self) -> None:
+        self._get_filter()
+
+        self.access[("owner", "c")] = True
+        self.now += 60
+        self.assertEqual(self._get_filter(), [("owner", "a"), ("owner", "b")])
+
+        self.now += GitHubProcessor._FULL_SYNC_INTERVAL
+        self.assertEqual(self._get_filter(), [("owner", "a"), ("owner", "b"), ("owner", "c")])
+        self.assertEqual(self.full_syncs, 2)
+
+
+# Aliases of the batched repository query, as built by GitHubClient.check_repos_access
+_STRING = r'"(?:[^"\\]|\\.)*"'
+_ALIAS = re.compile(
+    rf"(r\d+): repository\(owner: ({_STRING}), name: ({_STRING})\) \{{ ([^{{}}]*(?:\{{[^{{}}]*\}})?) \}}"
+)
+
+
+class TestGitHubClientAccess(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = GitHubClient(transport=HttpTransport())
+        # Collaborators by repository. Missing repositories are not visible to the token, `None` could not be listed
+        self.collaborators: dict[Repo, Optional[List[str]]] = {}
+        self.queries: List[Tuple[str, dict[str, Any]]] = []
+        self.rest_checks: List[Tuple[str, str, str]] = []
+
+    def _graphql(self, token: str, query: str, variables: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        self.queries.append((query, variables or {}))
+        if "viewer {" in query:
+            return self._viewer_repositories(variables or {})
+
+        data: dict[str, Any] = {}
+        for alias, owner, name, fields in _ALIAS.findall(query):
+            repo = (json.loads(owner), json.loads(name))
+            if repo not in self.collaborators:
+                data[alias] = None
+                continue
+
+            data[alias] = {"viewerPermission": "WRITE"}
+            if "collaborators" in fields:
+                data[alias]["collaborators"] = self._collaborators(repo, (variables or {})["login"])
+
+        return data
+
+    def _viewer_repositories(self, variables: dict[str, Any]) -> dict[str, Any]:
+        repos = sorted(self.collaborators)
+        start = int(variables["cursor"] or 0)
+        nodes = []
+        for owner, name in repos[start : start + 2]:
+            node: dict[str, Any] = {"owner": {"login": owner}, "name": name}
+            if variables["withCollaborators"]:
+                node["collaborators"] = self._collaborators((owner, name), variables["login"])
+            nodes.append(node)
+
+        has_next = start + 2 < len(repos)
+        page_info = {"hasNextPage": has_next, "endCursor": str(start + 2) if has_next else None}
+        return {"viewer": {"repositories": {"nodes": nodes, "pageInfo": page_info}}}
+
+    def _collaborators(self, repo: Repo, login: str) -> Optional[dict[str, int]]:
+        collaborators = self.collaborators[repo]
+        return {"totalCount": int(login in collaborators)} if collaborators is not None else None
+
+    def _user_has_access(self, token: str, owner: str, repo_name: str, username: str) -> bool:
+        self.rest_checks.append((owner, repo_name, username))
+        return True
+
+    def _patch(self) -> Any:
+        return mock.patch.multiple(self.client, graphql=self._graphql, user_has_access=self._user_has_access)
+
+    def test_check_repos_access_aliases(self) -> None:
+        repos = [("owner", f"repo-{i}") for i in range(120)]
+        self.collaborators = {repo: ["user"] if i % 2 == 0 else [] for i, repo in enumerate(repos)}
+        with self._patch():
+            access = self.client.check_repos_access("token", repos + repos[:3], username="user")
+
+        self.assertEqual(access, {repo: i % 2 == 0 for i, repo in enumerate(repos)})
+        self.assertEqual([len(_ALIAS.findall(query)) for query, _ in self.queries], [50, 50, 20])
+        for query, variables in self.queries:
+            self.assertTrue(query.startswith("query($login: String!)"))
+            self.assertIn("collaborators(login: $login, first: 1)", query)
+            self.assertEqual(variables, {"login": "user"})
+
+        self.assertEqual(self.rest_checks, [])
+
+    def test_check_repos_access_without_username(self) -> None:
+        self.collaborators = {("owner", "a"): []}
+        with self._patch():
+            access = self.client.check_repos_access("token", [("owner", "a"), ("owner", "missing")])
+
+        self.assertEqual(access, {("owner", "a"): True, ("owner", "missing"): False})
+        query, variables = self.queries[0]
+        self.assertTrue(query.startswith("query {"))
+        self.assertNotIn("collaborators", query)
+        self.assertEqual(variables, {})
+
+    def test_check_repos_access_null_and_missing_alias(self) -> None:
+        self.collaborators = {("owner", "a"): ["user"], ("owner", "b"): ["user"]}
+
+        def graphql(token: str, query: str, variables: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+            data = self._graphql(token, query, variables)
+            # A partial error drops the alias of the second repository
+            data.pop("r1")
+            return data
+
+        with mock.patch.object(self.client, "graphql", graphql):
+            access = self.client.check_repos_access(
+                "token", [("owner", "a"), ("owner", "b"), ("owner", "gone")], username="user"
+            )
+
+        self.assertEqual(access, {("owner", "a"): True, ("owner", "b"): False, ("owner", "gone"): False})
+
+    def test_check_repos_access_quoting(self) -> None:
+        repo = ('own"er', "repo\\name")
+        self.collaborators = {repo: ["user"]}
+        with self._patch():
+            self.assertEqual(self.client.check_repos_access("token", [repo], username="user"), {repo: True})
+
+    def test_check_repos_access_rest_fallback(self) -> None:
+        self.collaborators = {("owner", "a"): None, ("owner", "b"): []}
+        with self._patch():
+            access = self.client.check_repos_access("token", [("owner", "a"), ("owner", "b")], username="user")
+
+        self.assertEqual(access, {("owner", "a"): True, ("owner", "b"): False})
+        self.assertEqual(self.rest_checks, [("owner", "a", "user")])
+
+    def test_get_repos_access(self) -> None:
+        self.collaborators = {("owner", "a"): ["user"], ("owner", "b"): [], ("owner", "c"): None}
+        with self._patch():
+            access = self.client.get_repos_access("token", username="user")
+
+        self.assertEqual(access, {("owner", "a"): True, ("owner", "b"): False, ("owner", "c"): True})
+        self.assertEqual(self.rest_checks, [("owner", "c", "user")])
+        self.assertEqual([variables["cursor"] for _, variables in self.queries], [None, "2"])
+        self.assertTrue(all(variables["withCollaborators"] for _, variables in self.queries))
+
+    def test_get_repos_access_without_username(self) -> None:
+        self.collaborators = {("owner", "a"): [], ("owner", "b"): None}
+        with self._patch():
+            access = self.client.get_repos_access("token")
+
+        self.assertEqual(access, {("owner", "a"): True, ("owner", "b"): True})
+        self.assertEqual(self.queries[0][1], {"cursor": None, "login": "", "withCollaborators": False})
+        self.assertEqual(self.rest_checks, [])
@@ -0,0 +1,48 @@
+import io
+import unittest
+from typing import Any, List
+
+import requests
+
+from pangea_multipass import GitHubReader, HttpTransport
+from tests.unit.test_utils import _tarball
+
+_CONTENT = "# Título\n\nÜnïcode text\n".encode()
+_REPOSITORY = {"id": 1, "name": "repo", "owner": {"login": "owner"}}
+_BLOB_URL = "https://api.github.com/repos/owner/repo/git/blobs/abc"
+
+
+class _Transport(HttpTransport):
+    """Answers blob requests with the raw file and archive requests with a tarball holding the same file."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests: List[dict[str, Any]] = []
+
+    def request(self, method: str, url: str, conditional: bool = False, **kwargs: Any) -> requests.Response:
+        self.requests.append({"url": url, **kwargs})
+        response = requests.Response()
+        response.status_code = 200
+        if url.endswith("/tarball"):
+            response.raw = _tarball({"docs/README.md": _CONTENT, "logo.png": b"\x89PNG\xff"}, prefix="owner-repo-1/")
+        else:
+            response.raw = io.BytesIO(_CONTENT)
+
+        return response
+
+
+class TestGitHubReader(unittest.TestCase):
+    def test_archive_and_blob_same_text(self) -> None:
+        transport = _Transport()
+        reader = GitHubReader("token", transport=transport)
+
+        blob = reader._read_file("owner", "repo", {"path": "docs/README.md", "url": _BLOB_URL})
+        archive = list(reader.read_repo_archive(_REPOSITORY))
+
+        self.assertEqual(blob.content, _CONTENT.decode())
+        self.assertEqual(archive[0].content, blob.content)
+        self.assertEqual(archive[0].metadata, blob.metadata)
+        self.assertEqual(transport.requests[0]["headers"]["Accept"], "application/vnd.github.raw+json")
+
+        # Binary files are decoded without failing
+        self.assertEqual(archive[1].content, "�PNG�")
@@ -0,0 +1,49 @@
+import unittest
+from typing import Any, List
+from unittest import mock
+
+from pangea_multipass import AclSnapshotStore, GitLabProcessor, HttpTransport
+
+
+class TestGitLabProcessorSnapshots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1_000_000.0
+        patcher = mock.patch("pangea_multipass.acl_snapshot.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.allowed = [1, 2]
+        self.full_syncs = 0
+        self.processor: GitLabProcessor[Any] = GitLabProcessor(
+            "token",
+            "user",
+            lambda node: node,
+            transport=HttpTransport(),
+            snapshot_store=AclSnapshotStore(min_sync_interval=0),
+        )
+
+        def get_allowed_projects(admin_token: str, user_id: str) -> List[int]:
+            self.full_syncs += 1
+            return list(self.allowed)
+
+        methods: dict[str, Any] = {
+            "get_user": lambda admin_token, username: {"id": "10"},
+            "get_allowed_projects": get_allowed_projects,
+            # Member changes are not project activity
+            "get_user_projects": lambda admin_token, last_activity_after=None: [],
+        }
+        for name, value in methods.items():
+            patcher = mock.patch.object(self.processor._client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_member_changes_applied_after_full_sync_interval(self) -> None:
+        self.assertEqual(self.processor.get_filter().value, [1, 2])
+
+        self.allowed = [2, 3]
+        self.now += 60
+        self.assertEqual(self.processor.get_filter().value, [1, 2])
+
+        self.now += GitLabProcessor._FULL_SYNC_INTERVAL
+        self.assertEqual(self.processor.get_filter().value, [2, 3])
+        self.assertEqual(self.full_syncs, 2)
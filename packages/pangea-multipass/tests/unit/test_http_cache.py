@@ -0,0 +1,102 @@
+import tempfile
+import unittest
+from typing import Any, List, Optional
+from unittest import mock
+
+import requests
+
+from pangea_multipass import CachedResponse, HttpResponseCache, HttpTransport
+
+
+def _response(status_code: int, content: bytes = b"", headers: Optional[dict[str, str]] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    response.url = "https://api.github.com/repos"
+    return response
+
+
+def _entry(content: bytes, etag: str = '"v1"') -> CachedResponse:
+    return CachedResponse(status_code=200, headers={}, content=content, etag=etag, last_modified=None)
+
+
+class TestHttpResponseCache(unittest.TestCase):
+    def test_key(self) -> None:
+        key = HttpResponseCache.key("GET", "https://api.github.com/repos", {"page": 2}, "a")
+        self.assertEqual(key, HttpResponseCache.key("get", "https://api.github.com/repos?page=2", None, "a"))
+        self.assertNotEqual(key, HttpResponseCache.key("GET", "https://api.github.com/repos", {"page": 2}, "b"))
+        self.assertNotEqual(key, HttpResponseCache.key("GET", "https://api.github.com/repos", {"page": 2}, "a", "raw"))
+
+    def test_from_response(self) -> None:
+        self.assertIsNone(CachedResponse.from_response(_response(200, b"{}")))
+        entry = CachedResponse.from_response(_response(200, b"{}", {"ETag": '"v1"', "Last-Modified": "yesterday"}))
+        assert entry is not None
+        self.assertEqual(entry.validators(), {"If-None-Match": '"v1"', "If-Modified-Since": "yesterday"})
+
+    def test_memory_bound(self) -> None:
+        cache = HttpResponseCache(max_memory_bytes=10, max_entry_bytes=8)
+        cache.set("a", _entry(b"aaaa"))
+        cache.set("b", _entry(b"bbbb"))
+        cache.get("a")
+        cache.set("c", _entry(b"cccc"))
+        cache.set("d", _entry(b"d" * 9))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertIsNone(cache.get("d"))
+
+    def test_directory(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            HttpResponseCache(directory=directory).set("a", _entry(b"\x00binary"))
+            entry = HttpResponseCache(directory=directory).get("a")
+            assert entry is not None
+            self.assertEqual(entry.content, b"\x00binary")
+
+            HttpResponseCache(directory=directory).clear()
+            self.assertIsNone(HttpResponseCache(directory=directory).get("a"))
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.transport = HttpTransport(response_cache=HttpResponseCache())
+        self.sent: List[dict[str, Any]] = []
+
+    def _send(self, responses: List[requests.Response]) -> Any:
+        def send(method: str, url: str, **kwargs: Any) -> requests.Response:
+            self.sent.append(kwargs)
+            return responses.pop(0)
+
+        return mock.patch.object(self.transport, "_send", send)
+
+    def test_not_modified(self) -> None:
+        responses = [_response(200, b"[1]", {"ETag": '"v1"'}), _response(304)]
+        with self._send(responses):
+            first = self.transport.get("https://api.github.com/repos", conditional=True, headers={"Authorization": "a"})
+            second = self.transport.get(
+                "https://api.github.com/repos", conditional=True, headers={"Authorization": "a"}
+            )
+
+        self.assertEqual(first.json(), [1])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), [1])
+        self.assertEqual(self.sent[1]["headers"]["If-None-Match"], '"v1"')
+
+    def test_not_shared_between_credentials(self) -> None:
+        responses = [_response(200, b"[1]", {"ETag": '"v1"'}), _response(200, b"[2]", {"ETag": '"v2"'})]
+        with self._send(responses):
+            self.transport.get("https://api.github.com/repos", conditional=True, headers={"Authorization": "a"})
+            second = self.transport.get(
+                "https://api.github.com/repos", conditional=True, headers={"Authorization": "b"}
+            )
+
+        self.assertNotIn("If-None-Match", self.sent[1]["headers"])
+        self.assertEqual(second.json(), [2])
+
+    def test_unconditional(self) -> None:
+        responses = [_response(200, b"[1]", {"ETag": '"v1"'}), _response(200, b"[2]", {"ETag": '"v2"'})]
+        with self._send(responses):
+            self.transport.get("https://api.github.com/repos", conditional=True)
+            self.transport.get("https://api.github.com/repos")
+
+        self.assertNotIn("headers", self.sent[1])
@@ -0,0 +1,47 @@
+import unittest
+from typing import Any, List
+from unittest import mock
+
+from pangea_multipass import AclSnapshotStore, JiraAuth, JiraProcessor, get_document_metadata
+from pangea_multipass.sources.jira.jira import JiraAPI
+
+
+class TestJiraProcessorSnapshots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1_000_000.0
+        for target in ("pangea_multipass.acl_snapshot.time.time", "pangea_multipass.sources.jira.jira.time.time"):
+            patcher = mock.patch(target, lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.visible = ["1", "2", "3"]
+        self.full_syncs = 0
+        self.processor: JiraProcessor[Any] = JiraProcessor(
+            JiraAuth(email="user@example.com", token="token", url="https://example.atlassian.net/"),
+            get_document_metadata,
+            snapshot_store=AclSnapshotStore(min_sync_interval=0),
+        )
+
+    def _get_issue_ids(self, auth: JiraAuth, transport: Any = None) -> List[str]:
+        self.full_syncs += 1
+        return list(self.visible)
+
+    def _get_filter(self) -> List[str]:
+        with (
+            mock.patch.object(JiraAPI, "get_issue_ids", self._get_issue_ids),
+            mock.patch.object(JiraAPI, "get_updated_issue_ids", lambda auth, minutes, transport=None: []),
+        ):
+            return self.processor.get_filter().value
+
+    def test_revoked_issue_removed_after_full_sync_interval(self) -> None:
+        self.assertEqual(self._get_filter(), ["1", "2", "3"])
+
+        # Delta syncs could not report revoked issues
+        self.visible = ["1", "3"]
+        self.now += 60
+        self.assertEqual(self._get_filter(), ["1", "2", "3"])
+        self.assertEqual(self.full_syncs, 1)
+
+        self.now += JiraProcessor._FULL_SYNC_INTERVAL
+        self.assertEqual(self._get_filter(), ["1", "3"])
+        self.assertEqual(self.full_syncs, 2)
@@ -0,0 +1,113 @@
+import time
+import unittest
+from typing import Optional
+from unittest import mock
+
+import requests
+
+from pangea_multipass import RateLimitError, RateLimitScheduler, TokenBucket
+
+
+def _response(status_code: int = 200, headers: Optional[dict[str, str]] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve(self) -> None:
+        with mock.patch("pangea_multipass.rate_limit.time.monotonic", return_value=100.0) as monotonic:
+            bucket = TokenBucket(rate=2, capacity=2)
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertEqual(bucket.reserve(), 0.5)
+
+            monotonic.return_value = 101.0
+            self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_invalid_rate(self) -> None:
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1_700_000_000.0
+        for target in ("pangea_multipass.rate_limit.time.time", "pangea_multipass.rate_limit.time.sleep"):
+            patcher = mock.patch(target)
+            mocked = patcher.start()
+            self.addCleanup(patcher.stop)
+            if target.endswith("time"):
+                mocked.side_effect = lambda: self.now
+
+        self.sleep = time.sleep
+        self.scheduler = RateLimitScheduler(base_delay=1.0, max_wait=600)
+
+    def test_budget_from_headers(self) -> None:
+        headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "1700000060"}
+        self.assertIsNone(self.scheduler.update("api.github.com", "a", _response(headers=headers)))
+        budget = self.scheduler.get_budget("API.github.com", "a")
+        assert budget is not None
+        self.assertEqual((budget.limit, budget.remaining, budget.reset_at), (5000, 4999, 1700000060.0))
+        self.assertIsNone(self.scheduler.get_budget("api.github.com", "b"))
+
+    def test_relative_reset(self) -> None:
+        headers = {"RateLimit-Limit": "100", "RateLimit-Remaining": "10", "RateLimit-Reset": "30"}
+        self.scheduler.update("gitlab.com", "a", _response(headers=headers))
+        budget = self.scheduler.get_budget("gitlab.com", "a")
+        assert budget is not None
+        self.assertEqual(budget.reset_at, self.now + 30)
+
+    def test_retry_after(self) -> None:
+        with mock.patch("pangea_multipass.rate_limit.random.uniform", return_value=0.0):
+            delay = self.scheduler.update("jira", "a", _response(429, {"Retry-After": "7"}))
+        self.assertEqual(delay, 7.0)
+
+        # Requests wait until the retry time
+        self.scheduler.acquire("jira", "a")
+        self.sleep.assert_called_once_with(7.0)  # type: ignore[attr-defined]
+
+    def test_backoff_without_delay(self) -> None:
+        for attempt in range(10):
+            delay = self.scheduler.update("jira", "a", _response(429), attempt)
+            assert delay is not None
+            self.assertLessEqual(delay, min(self.scheduler.max_delay, 2**attempt))
+
+    def test_forbidden_is_not_rate_limited(self) -> None:
+        self.assertIsNone(self.scheduler.update("api.github.com", "a", _response(403)))
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1700000010"}
+        delay = self.scheduler.update("api.github.com", "a", _response(403, headers))
+        assert delay is not None
+        self.assertGreaterEqual(delay, 10)
+
+    def test_exhausted_budget(self) -> None:
+        headers = {"X-RateLimit-Limit": "10", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1700000100"}
+        self.scheduler.update("api.github.com", "a", _response(headers=headers))
+        self.scheduler.acquire("api.github.com", "a")
+        self.sleep.assert_called_once_with(100.0)  # type: ignore[attr-defined]
+
+        # Other credentials keep their own budget
+        self.scheduler.acquire("api.github.com", "b")
+        self.assertEqual(self.sleep.call_count, 1)  # type: ignore[attr-defined]
+
+        headers["X-RateLimit-Reset"] = str(int(self.now) + 3600)
+        self.scheduler.update("api.github.com", "a", _response(headers=headers))
+        with self.assertRaises(RateLimitError):
+            self.scheduler.acquire("api.github.com", "a")
+
+    def test_slowdown(self) -> None:
+        headers = {"X-RateLimit-Limit": "100", "X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "1700000050"}
+        self.scheduler.update("api.github.com", "a", _response(headers=headers))
+        self.scheduler.acquire("api.github.com", "a")
+        self.sleep.assert_called_once_with(10.0)  # type: ignore[attr-defined]
+        budget = self.scheduler.get_budget("api.github.com", "a")
+        assert budget is not None
+        self.assertEqual(budget.remaining, 4)
+
+    def test_rates(self) -> None:
+        scheduler = RateLimitScheduler(rates={"Slack.com": 1})
+        with mock.patch("pangea_multipass.rate_limit.TokenBucket.acquire") as acquire:
+            scheduler.acquire("slack.com", "a")
+            scheduler.acquire("other.com", "a")
+        acquire.assert_called_once()
@@ -0,0 +1,34 @@
+import unittest
+from typing import Any, List, Optional
+from unittest import mock
+
+from pangea_multipass import SlackMembershipIndex, SlackProcessor
+
+
+class TestSlackMembershipIndex(unittest.TestCase):
+    def test_default_index_shared_per_token(self) -> None:
+        indexes: List[Optional[SlackMembershipIndex]] = []
+        for token in ["token", "token", "other-token"]:
+            processor = SlackProcessor[dict[str, Any]](token, lambda node: node, user_email="user@example.com")
+            with mock.patch.object(processor._client, "get_user_id", lambda token, email: "U1"):
+                with mock.patch.object(SlackMembershipIndex, "refresh", lambda self, force=False: True):
+                    processor.get_filter()
+            indexes.append(processor._membership_index)
+
+        self.assertIsNotNone(indexes[0])
+        self.assertIs(indexes[0], indexes[1])
+        self.assertIsNot(indexes[0], indexes[2])
+        self.assertIs(SlackMembershipIndex.for_token("token"), indexes[0])
+
+    def test_given_index_used(self) -> None:
+        index = SlackMembershipIndex("token")
+        processor = SlackProcessor[dict[str, Any]](
+            "token", lambda node: node, user_email="user@example.com", membership_index=index
+        )
+        with mock.patch.object(processor._client, "get_user_id", lambda token, email: "U1"):
+            with mock.patch.object(index, "get_user_channels", lambda user_id: ["C1"]):
+                channel_filter = processor.get_filter()
+
+        self.assertEqual(channel_filter.value, ["C1"])
+        self.assertIs(processor._membership_index, index)
+        self.assertIsNot(SlackMembershipIndex.for_token("token"), index)
@@ -0,0 +1,43 @@
+import unittest
+from typing import Any
+from unittest import mock
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from pangea_multipass import HttpTransport, RateLimitScheduler
+from pangea_multipass.cache import credential_fingerprint
+from pangea_multipass.transport import _get_credential
+
+_URL = "https://example.atlassian.net/rest/api/3/search/jql"
+
+
+class TestRateLimitedTransport(unittest.TestCase):
+    def test_credentials(self) -> None:
+        self.assertEqual(_get_credential({"headers": {"authorization": "token a"}}), credential_fingerprint("token a"))
+        self.assertEqual(_get_credential({"auth": ("user", "a")}), credential_fingerprint("user", "a"))
+        self.assertEqual(_get_credential({"auth": HTTPBasicAuth("user", "a")}), credential_fingerprint("user", "a"))
+        self.assertEqual(_get_credential({"auth": HTTPBasicAuth(b"user", b"a")}), credential_fingerprint("user", "a"))
+        self.assertEqual(_get_credential({}), "")
+
+    def test_basic_auth_budgets(self) -> None:
+        scheduler = RateLimitScheduler()
+        transport = HttpTransport(rate_limiter=scheduler)
+        remaining = {"a": "10", "b": "20"}
+
+        def send(method: str, url: str, **kwargs: Any) -> requests.Response:
+            response = requests.Response()
+            response.status_code = 200
+            response.headers["X-RateLimit-Limit"] = "100"
+            response.headers["X-RateLimit-Remaining"] = remaining[kwargs["auth"].password]
+            return response
+
+        with mock.patch.object(transport, "_send", send):
+            transport.get(_URL, auth=HTTPBasicAuth("user@example.com", "a"))
+            transport.get(_URL, auth=HTTPBasicAuth("user@example.com", "b"))
+
+        budget_a = scheduler.get_budget("example.atlassian.net", credential_fingerprint("user@example.com", "a"))
+        budget_b = scheduler.get_budget("example.atlassian.net", credential_fingerprint("user@example.com", "b"))
+        assert budget_a is not None and budget_b is not None
+        self.assertEqual((budget_a.remaining, budget_b.remaining), (10, 20))
+        self.assertIsNone(scheduler.get_budget("example.atlassian.net", ""))
@@ -0,0 +1,133 @@
+import io
+import tarfile
+import threading
+import time
+import unittest
+from typing import Callable, List
+
+from pangea_multipass.utils import PathPrefixTrie, batched, iter_prefetched, iter_tar_files, path_matches
+
+
+def _tarball(files: dict[str, bytes], prefix: str = "repo-main/") -> io.BytesIO:
+    fileobj = io.BytesIO()
+    with tarfile.open(fileobj=fileobj, mode="w:gz") as archive:
+        directory = tarfile.TarInfo(prefix.rstrip("/"))
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for path, content in files.items():
+            info = tarfile.TarInfo(f"{prefix}{path}")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+    fileobj.seek(0)
+    return fileobj
+
+
+class TestBatched(unittest.TestCase):
+    def test_batched(self) -> None:
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
+        with self.assertRaises(ValueError):
+            list(batched([1], 0))
+
+
+class TestIterPrefetched(unittest.TestCase):
+    def test_order(self) -> None:
+        def task(i: int) -> Callable[[], int]:
+            def run() -> int:
+                # Later tasks finish first
+                time.sleep(0.01 * (5 - i))
+                return i
+
+            return run
+
+        self.assertEqual(list(iter_prefetched((task(i) for i in range(5)), prefetch=3)), [0, 1, 2, 3, 4])
+
+    def test_bounded(self) -> None:
+        lock = threading.Lock()
+        started: List[int] = []
+
+        def task(i: int) -> Callable[[], int]:
+            def run() -> int:
+                with lock:
+                    started.append(i)
+                return i
+
+            return run
+
+        results = iter_prefetched((task(i) for i in range(10)), prefetch=2)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.05)
+        # The consumed task is replaced before yielding, so at most `prefetch` tasks run ahead
+        self.assertLessEqual(len(started), 3)
+        self.assertEqual(list(results), list(range(1, 10)))
+
+    def test_exceptions(self) -> None:
+        def fail() -> int:
+            raise ValueError("failed")
+
+        tasks: List[Callable[[], int]] = [lambda: 1, fail, lambda: 3]
+        results = list(iter_prefetched(tasks, prefetch=2, return_exceptions=True))
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 3)
+
+        with self.assertRaises(ValueError):
+            list(iter_prefetched(tasks, prefetch=2))
+
+    def test_inline(self) -> None:
+        thread_ids: List[int] = []
+        tasks = [lambda: thread_ids.append(threading.get_ident())] * 2
+        list(iter_prefetched(tasks, prefetch=0))
+        self.assertEqual(thread_ids, [threading.get_ident()] * 2)
+
+
+class TestIterTarFiles(unittest.TestCase):
+    def test_iter_tar_files(self) -> None:
+        files = {"README.md": b"# Repo\n", "src/main.py": b"print('hi')\n", "src/big.bin": b"x" * 100}
+        self.assertEqual(list(iter_tar_files(_tarball(files))), list(files.items()))
+
+    def test_filters(self) -> None:
+        files = {"README.md": b"# Repo\n", "src/main.py": b"print('hi')\n", "src/big.py": b"x" * 100}
+        result = iter_tar_files(_tarball(files), include=["src/*"], exclude=["*/main.py"], max_file_size=50)
+        self.assertEqual(list(result), [])
+
+        result = iter_tar_files(_tarball(files), include=["*.py"], max_file_size=50)
+        self.assertEqual(list(result), [("src/main.py", b"print('hi')\n")])
+
+    def test_strip_components(self) -> None:
+        result = iter_tar_files(_tarball({"a/b.txt": b"b"}), strip_components=2)
+        self.assertEqual(list(result), [("b.txt", b"b")])
+
+    def test_path_matches(self) -> None:
+        self.assertTrue(path_matches("docs/a/b.md", include=["docs/*"]))
+        self.assertFalse(path_matches("src/a.py", include=["docs/*"]))
+        self.assertFalse(path_matches("docs/a.png", exclude=["*.png"]))
+        self.assertTrue(path_matches("anything"))
+
+
+class TestPathPrefixTrie(unittest.TestCase):
+    def test_matches(self) -> None:
+        trie = PathPrefixTrie(["/a", "/b/c/"])
+        self.assertTrue(trie.matches("/a"))
+        self.assertTrue(trie.matches("/a/x/y.txt"))
+        self.assertTrue(trie.matches("/b/c/d"))
+        self.assertFalse(trie.matches("/ab"))
+        self.assertFalse(trie.matches("/b"))
+        self.assertFalse(trie.matches("/b/cd"))
+        self.assertFalse(PathPrefixTrie().matches("/a"))
+        self.assertTrue(PathPrefixTrie(["/"]).matches("/anything"))
+
+    def test_roots(self) -> None:
+        trie = PathPrefixTrie(["/a/b", "/a", "/c/d", "/c/e"])
+        self.assertEqual(trie.roots(), ["/a", "/c/d", "/c/e"])
+
+    def test_remove(self) -> None:
+        trie = PathPrefixTrie(["/a", "/a/b"])
+        trie.remove("/a")
+        self.assertFalse(trie.matches("/a/c"))
+        self.assertTrue(trie.matches("/a/b/c"))
+
+        trie.remove("/a/b")
+        trie.remove("/missing")
+        self.assertFalse(trie)